@@ -0,0 +1,66 @@
+"""
+Compare the old per-word substring loop against WordMatcher.
+
+Run from the PizzaHat directory:  python -m benchmarks.banned_words
+"""
+
+import random
+import string
+import timeit
+
+from utils.automod import WordMatcher
+
+WORD_COUNT = 2000
+MESSAGE_COUNT = 5000
+HIT_RATE = 0.02
+
+
+def _make_words(rng: random.Random) -> list[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+        for _ in range(WORD_COUNT)
+    ]
+
+
+def _make_messages(rng: random.Random, words: list[str]) -> list[str]:
+    vocab = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 9)))
+        for _ in range(5000)
+    ]
+    messages = []
+    for _ in range(MESSAGE_COUNT):
+        tokens = rng.choices(vocab, k=rng.randint(3, 40))
+        if rng.random() < HIT_RATE:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(words))
+        messages.append(" ".join(tokens))
+    return messages
+
+
+def main() -> None:
+    rng = random.Random(0)
+    words = _make_words(rng)
+    messages = _make_messages(rng, words)
+
+    build = timeit.timeit(lambda: WordMatcher(words), number=5) / 5
+    matcher = WordMatcher(words)
+
+    def loop() -> int:
+        return sum(any(w in m for w in words) for m in messages)
+
+    def automaton() -> int:
+        return sum(matcher.search(m) for m in messages)
+
+    assert loop() == automaton(), "matchers disagree"
+
+    old = min(timeit.repeat(loop, number=1, repeat=3))
+    new = min(timeit.repeat(automaton, number=1, repeat=3))
+
+    print(f"{WORD_COUNT} words, {MESSAGE_COUNT} messages, {automaton()} hits")
+    print(f"build:      {build * 1000:8.2f} ms (once per list / guild)")
+    print(f"loop:       {old / MESSAGE_COUNT * 1e6:8.2f} us/message")
+    print(f"matcher:    {new / MESSAGE_COUNT * 1e6:8.2f} us/message")
+    print(f"speedup:    {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
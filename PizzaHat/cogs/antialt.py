@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import discord
-from async_lru import alru_cache
 from discord.ext import commands
 from discord.ext.commands import Context
 
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
 from utils.embed import ctx_embed, green_embed, orange_embed, red_embed
@@ -226,24 +226,18 @@ class AntiAlts(Cog, emoji=1268851128548724756):
         self.bot = bot
 
     def _clear_cache(self, guild_id: int) -> None:
+        cache.antialt.invalidate(guild_id)
         for cog_name in ("AntiAltsConfig", "AutoModConfig"):
             cog = self.bot.get_cog(cog_name)
             if cog and hasattr(cog, "clear_config_cache"):
                 cog.clear_config_cache(guild_id)  # type: ignore
 
-    @alru_cache()
     async def _get_data(self, guild_id: int) -> dict | None:
-        if not self.bot.db:
-            return None
-        row = await self.bot.db.fetchrow(
-            "SELECT enabled, min_age, restricted_role, level FROM antialt WHERE guild_id=$1",
-            guild_id,
-        )
-        return dict(row) if row else None
+        return await cache.antialt.get(self.bot.db, guild_id)
 
     async def _refresh_data(self, guild_id: int) -> dict | None:
         """Clear cache then re-fetch."""
-        self._get_data.cache_clear()
+        cache.antialt.invalidate(guild_id)
         return await self._get_data(guild_id)
 
     @commands.group(invoke_without_command=True)
@@ -9,8 +9,10 @@ from discord.ext.commands import Context
 
 from core.bot import PizzaHat, Tier
 from core.cog import Cog
-from utils.custom_checks import _tier_cache, premium
+from utils.custom_checks import get_guild_tier, premium
 from utils.embed import ctx_embed, green_embed, orange_embed, red_embed
+from utils.recurrence import Recurrence, RecurrenceError, validate_cron
+from utils.responders import TRIGGER_TYPES, validate_trigger
 
 TIER_LIMITS: dict[Tier, dict[str, int]] = {
     Tier.FREE: {"responders": 3, "schedules": 2, "join_roles": 1, "events": 2},
@@ -36,6 +38,8 @@ EVENT_ACTIONS: dict[str, str] = {
     "log": "Embed-log an event to a channel",
 }
 
+PREVIEW_RUNS = 3  # upcoming runs listed per schedule in `schedule`
+
 _DELAY_RE = re.compile(r"^(\d+)(m|h|d|w)$", re.IGNORECASE)
 
 _WEEKDAYS = {
@@ -62,16 +66,24 @@ def _parse_delay(text: str) -> datetime.timedelta | None:
     }.get(unit)
 
 
+def _upcoming_runs(row, count: int) -> list[datetime.datetime]:
+    """The stored next run of a schedule followed by the runs after it."""
+
+    next_run: datetime.datetime = row["next_run"]
+    if next_run.tzinfo is None:
+        next_run = next_run.replace(tzinfo=datetime.timezone.utc)
+    try:
+        recurrence = Recurrence.from_row(row)
+        if recurrence is None:
+            return [next_run]
+        return [next_run] + recurrence.upcoming(next_run, count - 1)
+    except RecurrenceError:
+        # Broken rows (unknown timezone, cron that never runs) still list
+        return [next_run]
+
+
 async def _guild_tier(bot: PizzaHat, guild_id: int) -> Tier:
-    cached = _tier_cache.get(guild_id)
-    if cached is not None:
-        return cached
-    if bot.db is None:
-        return Tier.FREE
-    row = await bot.db.fetchrow("SELECT tier FROM premium WHERE guild_id=$1", guild_id)
-    tier = Tier(row["tier"]) if row else Tier.FREE
-    _tier_cache[guild_id] = tier
-    return tier
+    return await get_guild_tier(bot.db, guild_id)
 
 
 def _event_action_line(action: dict) -> str:
@@ -101,6 +113,11 @@ class Automations(Cog, emoji=1504381117174644867):
         if cog and hasattr(cog, "clear_cache"):
             cog.clear_cache(guild_id)  # type: ignore
 
+    async def _schedule_changed(self, schedule_id: int) -> None:
+        cog = self.bot.get_cog("AutomationEvents")
+        if cog and hasattr(cog, "schedules"):
+            await cog.schedules.refresh(schedule_id)  # type: ignore
+
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # HUB
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -269,11 +286,12 @@ class Automations(Cog, emoji=1504381117174644867):
                 )
             )
 
-        trigger_lower = trigger.lower()
+        # Stored as typed so regex triggers keep their case; text triggers
+        # are matched case-insensitively either way.
         dupe = await self.bot.db.fetchval(
-            "SELECT id FROM auto_responders WHERE guild_id=$1 AND trigger_text=$2",
+            "SELECT id FROM auto_responders WHERE guild_id=$1 AND LOWER(trigger_text)=$2",
             ctx.guild.id,
-            trigger_lower,
+            trigger.lower(),
         )
         if dupe:
             return await ctx.send(
@@ -286,7 +304,7 @@ class Automations(Cog, emoji=1504381117174644867):
             "INSERT INTO auto_responders (guild_id, trigger_text, response, created_by) "
             "VALUES ($1,$2,$3,$4) RETURNING id",
             ctx.guild.id,
-            trigger_lower,
+            trigger,
             response,
             ctx.author.id,
         )
@@ -355,6 +373,64 @@ class Automations(Cog, emoji=1504381117174644867):
             )
         )
 
+    @responder.command(name="type")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def responder_type(self, ctx: Context, responder_id: int, trigger_type: str):
+        """Set how a responder's trigger is matched: contains, exact, startswith or regex."""
+        if not ctx.guild or not self.bot.db:
+            return
+
+        trigger_type = trigger_type.lower()
+        if trigger_type not in TRIGGER_TYPES:
+            return await ctx.send(
+                embed=red_embed(
+                    description=(
+                        f"{self.bot.no} Unknown trigger type `{trigger_type}`.\n"
+                        + "\n".join(f"`{t}` — {d}" for t, d in TRIGGER_TYPES.items())
+                    )
+                )
+            )
+
+        tier = await _guild_tier(self.bot, ctx.guild.id)
+        if trigger_type == "regex" and tier < Tier.BASIC:
+            return await ctx.send(
+                embed=red_embed(
+                    description=(
+                        f"{self.bot.no} Regex triggers require **Basic** tier.\n"
+                        f"[Upgrade](https://pizzahat.vercel.app/premium)"
+                    )
+                )
+            )
+
+        trigger = await self.bot.db.fetchval(
+            "SELECT trigger_text FROM auto_responders WHERE id=$1 AND guild_id=$2",
+            responder_id,
+            ctx.guild.id,
+        )
+        if trigger is None:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Responder `#{responder_id}` not found."
+                )
+            )
+
+        error = validate_trigger(trigger_type, trigger)
+        if error:
+            return await ctx.send(embed=red_embed(description=f"{self.bot.no} {error}"))
+
+        await self.bot.db.execute(
+            "UPDATE auto_responders SET trigger_type=$1 WHERE id=$2",
+            trigger_type,
+            responder_id,
+        )
+        self._bust_cache(ctx.guild.id)
+        await ctx.send(
+            embed=green_embed(
+                description=f"{self.bot.yes} Responder `#{responder_id}` (`{trigger}`) now matches as `{trigger_type}`."
+            )
+        )
+
     @responder.command(name="cooldown")
     @commands.guild_only()
     @commands.has_permissions(manage_guild=True)
@@ -454,8 +530,8 @@ class Automations(Cog, emoji=1504381117174644867):
             return
 
         rows = await self.bot.db.fetch(
-            "SELECT id, channel_id, message, schedule_type, interval_type, "
-            "next_run, enabled, run_count "
+            "SELECT id, channel_id, message, schedule_type, interval_type, cron, "
+            "timezone, next_run, enabled, run_count "
             "FROM scheduled_messages WHERE guild_id=$1 ORDER BY next_run",
             ctx.guild.id,
         )
@@ -470,7 +546,9 @@ class Automations(Cog, emoji=1504381117174644867):
                         f"No scheduled messages yet.\n\n"
                         f"**One-time:** `{p}automation schedule create #channel 1h <message>`\n"
                         f"**Daily (Basic+):** `{p}automation schedule daily #channel 09:00 <message>`\n"
-                        f"**Weekly (Basic+):** `{p}automation schedule weekly #channel monday 09:00 <message>`"
+                        f"**Weekly (Basic+):** `{p}automation schedule weekly #channel monday 09:00 <message>`\n"
+                        f"**Monthly (Basic+):** `{p}automation schedule monthly #channel 1 09:00 <message>`\n"
+                        f"**Cron (Basic+):** `{p}automation schedule cron #channel \"0 9 * * mon-fri\" <message>`"
                     )
                 )
             )
@@ -481,10 +559,14 @@ class Automations(Cog, emoji=1504381117174644867):
             status = "✅" if r["enabled"] else "❌"
             ch = f"<#{r['channel_id']}>"
             stype = r["interval_type"] or "once"
-            next_run: datetime.datetime = r["next_run"]
-            if next_run.tzinfo is None:
-                next_run = next_run.replace(tzinfo=datetime.timezone.utc)
-            ts = discord.utils.format_dt(next_run, "R")
+            if r["timezone"] and r["timezone"] != "UTC":
+                stype += f" ({r['timezone']})"
+            runs = _upcoming_runs(r, PREVIEW_RUNS if r["enabled"] else 1)
+            ts = discord.utils.format_dt(runs[0], "R")
+            if len(runs) > 1:
+                ts += ", then " + ", ".join(
+                    discord.utils.format_dt(run, "f") for run in runs[1:]
+                )
             preview = r["message"][:50].replace("\n", " ")
             lines.append(
                 f"{status} `#{r['id']}` {ch} · **{stype}** · next {ts} · {r['run_count']} sent\n"
@@ -552,6 +634,7 @@ class Automations(Cog, emoji=1504381117174644867):
             next_run,
             ctx.author.id,
         )
+        await self._schedule_changed(row["id"])
         await ctx.send(
             embed=green_embed(
                 description=(
@@ -562,42 +645,27 @@ class Automations(Cog, emoji=1504381117174644867):
             )
         )
 
-    @schedule.command(name="daily")
-    @commands.guild_only()
-    @commands.has_permissions(manage_guild=True)
-    @premium(tier=Tier.BASIC)
-    async def schedule_daily(
+    async def _create_recurring(
         self,
         ctx: Context,
         channel: discord.TextChannel,
-        time_str: str,
-        *,
         message: str,
-    ):
-        """Schedule a daily recurring message at HH:MM UTC. (Basic+)"""
-        if not ctx.guild or not self.bot.db:
-            return
+        interval: str,
+        recurrence: Recurrence,
+    ) -> tuple[int, datetime.datetime] | None:
+        """Insert a recurring schedule within the tier limit; (id, first run)."""
 
-        try:
-            t = datetime.time.fromisoformat(time_str)
-        except ValueError:
-            return await ctx.send(
-                embed=red_embed(
-                    description=f"{self.bot.no} Invalid time `{time_str}`. Use 24h HH:MM format (e.g. `09:00`)."
-                )
-            )
-
-        tier = await _guild_tier(self.bot, ctx.guild.id)
+        tier = await _guild_tier(self.bot, ctx.guild.id)  # type: ignore
         limit = TIER_LIMITS[tier]["schedules"]
         count = (
-            await self.bot.db.fetchval(
+            await self.bot.db.fetchval(  # type: ignore
                 "SELECT COUNT(*) FROM scheduled_messages WHERE guild_id=$1 AND enabled=TRUE",
-                ctx.guild.id,
+                ctx.guild.id,  # type: ignore
             )
             or 0
         )
         if count >= limit:
-            return await ctx.send(
+            await ctx.send(
                 embed=red_embed(
                     description=(
                         f"{self.bot.no} **{tier.name}** limit reached (**{limit}** active schedules).\n"
@@ -605,27 +673,63 @@ class Automations(Cog, emoji=1504381117174644867):
                     )
                 )
             )
+            return None
 
-        now = datetime.datetime.now(datetime.timezone.utc)
-        next_run = now.replace(hour=t.hour, minute=t.minute, second=0, microsecond=0)
-        if next_run <= now:
-            next_run += datetime.timedelta(days=1)
-
-        row = await self.bot.db.fetchrow(
+        next_run = recurrence.after(datetime.datetime.now(datetime.timezone.utc))
+        row = await self.bot.db.fetchrow(  # type: ignore
             "INSERT INTO scheduled_messages "
-            "(guild_id, channel_id, message, schedule_type, interval_type, next_run, created_by) "
-            "VALUES ($1,$2,$3,'recurring','daily',$4,$5) RETURNING id",
-            ctx.guild.id,
+            "(guild_id, channel_id, message, schedule_type, interval_type, cron, "
+            "timezone, next_run, created_by) "
+            "VALUES ($1,$2,$3,'recurring',$4,$5,$6,$7,$8) RETURNING id",
+            ctx.guild.id,  # type: ignore
             channel.id,
             message,
+            interval,
+            recurrence.expression,
+            recurrence.timezone,
             next_run,
             ctx.author.id,
         )
+        await self._schedule_changed(row["id"])
+        return row["id"], next_run
+
+    @schedule.command(name="daily")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @premium(tier=Tier.BASIC)
+    async def schedule_daily(
+        self,
+        ctx: Context,
+        channel: discord.TextChannel,
+        time_str: str,
+        *,
+        message: str,
+    ):
+        """Schedule a daily recurring message at HH:MM UTC. (Basic+)"""
+        if not ctx.guild or not self.bot.db:
+            return
+
+        try:
+            t = datetime.time.fromisoformat(time_str)
+        except ValueError:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Invalid time `{time_str}`. Use 24h HH:MM format (e.g. `09:00`)."
+                )
+            )
+
+        created = await self._create_recurring(
+            ctx, channel, message, "daily", Recurrence.daily(t)
+        )
+        if created is None:
+            return
+        schedule_id, next_run = created
         await ctx.send(
             embed=green_embed(
                 description=(
-                    f"{self.bot.yes} Daily message `#{row['id']}` set for `{time_str} UTC` every day!\n"
-                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}"
+                    f"{self.bot.yes} Daily message `#{schedule_id}` set for `{time_str} UTC` every day!\n"
+                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}\n"
+                    f"Change the timezone with `{ctx.prefix}automation schedule timezone {schedule_id} <zone>`."
                 )
             )
         )
@@ -667,53 +771,197 @@ class Automations(Cog, emoji=1504381117174644867):
                 )
             )
 
-        tier = await _guild_tier(self.bot, ctx.guild.id)
-        limit = TIER_LIMITS[tier]["schedules"]
-        count = (
-            await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM scheduled_messages WHERE guild_id=$1 AND enabled=TRUE",
-                ctx.guild.id,
+        created = await self._create_recurring(
+            ctx, channel, message, "weekly", Recurrence.weekly(day_num, t)
+        )
+        if created is None:
+            return
+        schedule_id, next_run = created
+        await ctx.send(
+            embed=green_embed(
+                description=(
+                    f"{self.bot.yes} Weekly message `#{schedule_id}` set for every "
+                    f"**{weekday.capitalize()}** at `{time_str} UTC`!\n"
+                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}"
+                )
             )
-            or 0
         )
-        if count >= limit:
+
+    @schedule.command(name="monthly")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @premium(tier=Tier.BASIC)
+    async def schedule_monthly(
+        self,
+        ctx: Context,
+        channel: discord.TextChannel,
+        day: int,
+        time_str: str,
+        *,
+        message: str,
+    ):
+        """Schedule a monthly message. Example: monthly #ch 1 09:00 <message> (Basic+)"""
+        if not ctx.guild or not self.bot.db:
+            return
+
+        if not 1 <= day <= 31:
             return await ctx.send(
                 embed=red_embed(
-                    description=(
-                        f"{self.bot.no} **{tier.name}** limit reached (**{limit}** active schedules).\n"
-                        f"[Upgrade to unlock more](https://pizzahat.vercel.app/premium)"
-                    )
+                    description=f"{self.bot.no} Day must be between `1` and `31`."
+                )
+            )
+        try:
+            t = datetime.time.fromisoformat(time_str)
+        except ValueError:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Invalid time `{time_str}`. Use HH:MM (e.g. `09:00`)."
                 )
             )
 
-        now = datetime.datetime.now(datetime.timezone.utc)
-        days_ahead = (day_num - now.weekday()) % 7
-        next_run = (now + datetime.timedelta(days=days_ahead)).replace(
-            hour=t.hour, minute=t.minute, second=0, microsecond=0
+        created = await self._create_recurring(
+            ctx, channel, message, "monthly", Recurrence.monthly(day, t)
+        )
+        if created is None:
+            return
+        schedule_id, next_run = created
+        note = " (or the last day of shorter months)" if day > 28 else ""
+        await ctx.send(
+            embed=green_embed(
+                description=(
+                    f"{self.bot.yes} Monthly message `#{schedule_id}` set for day "
+                    f"**{day}**{note} at `{time_str} UTC`!\n"
+                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}"
+                )
+            )
+        )
+
+    @schedule.command(name="cron")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @premium(tier=Tier.BASIC)
+    async def schedule_cron(
+        self,
+        ctx: Context,
+        channel: discord.TextChannel,
+        expression: str,
+        *,
+        message: str,
+    ):
+        """Schedule a message with a cron expression. Example: cron #ch "0 9 * * mon-fri" <message> (Basic+)"""
+        if not ctx.guild or not self.bot.db:
+            return
+
+        error = validate_cron(expression)
+        if error:
+            return await ctx.send(embed=red_embed(description=f"{self.bot.no} {error}"))
+
+        created = await self._create_recurring(
+            ctx, channel, message, "cron", Recurrence(expression)
+        )
+        if created is None:
+            return
+        schedule_id, next_run = created
+        await ctx.send(
+            embed=green_embed(
+                description=(
+                    f"{self.bot.yes} Message `#{schedule_id}` scheduled for `{expression}` (UTC)!\n"
+                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}"
+                )
+            )
         )
-        if next_run <= now:
-            next_run += datetime.timedelta(weeks=1)
+
+    @schedule.command(name="timezone", aliases=["tz"])
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def schedule_timezone(self, ctx: Context, schedule_id: int, timezone: str):
+        """Run a recurring schedule on another timezone's clock, e.g. `Europe/Berlin`."""
+        if not ctx.guild or not self.bot.db:
+            return
 
         row = await self.bot.db.fetchrow(
-            "INSERT INTO scheduled_messages "
-            "(guild_id, channel_id, message, schedule_type, interval_type, next_run, created_by) "
-            "VALUES ($1,$2,$3,'recurring','weekly',$4,$5) RETURNING id",
+            "SELECT schedule_type, interval_type, cron, timezone, next_run "
+            "FROM scheduled_messages WHERE id=$1 AND guild_id=$2",
+            schedule_id,
             ctx.guild.id,
-            channel.id,
-            message,
+        )
+        if not row or row["schedule_type"] != "recurring":
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Recurring schedule `#{schedule_id}` not found."
+                )
+            )
+
+        # Keep the wall-clock time and move it to the new zone: 09:00 UTC
+        # becomes 09:00 in `timezone`.
+        try:
+            old = Recurrence.from_row(row)
+            recurrence = Recurrence(
+                old.expression, timezone, clamp=old.clamp  # type: ignore
+            )
+        except RecurrenceError as e:
+            return await ctx.send(embed=red_embed(description=f"{self.bot.no} {e}"))
+
+        next_run = recurrence.after(datetime.datetime.now(datetime.timezone.utc))
+        await self.bot.db.execute(
+            "UPDATE scheduled_messages SET timezone=$1, cron=$2, next_run=$3 "
+            "WHERE id=$4 AND guild_id=$5",
+            recurrence.timezone,
+            recurrence.expression,
             next_run,
-            ctx.author.id,
+            schedule_id,
+            ctx.guild.id,
         )
+        await self._schedule_changed(schedule_id)
         await ctx.send(
             embed=green_embed(
                 description=(
-                    f"{self.bot.yes} Weekly message `#{row['id']}` set for every "
-                    f"**{weekday.capitalize()}** at `{time_str} UTC`!\n"
-                    f"Channel: {channel.mention} · First run: {discord.utils.format_dt(next_run, 'R')}"
+                    f"{self.bot.yes} Schedule `#{schedule_id}` now runs on `{timezone}` time.\n"
+                    f"Next run: {discord.utils.format_dt(next_run, 'F')}"
                 )
             )
         )
 
+    @schedule.command(name="preview", aliases=["next"])
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def schedule_preview(self, ctx: Context, schedule_id: int, count: int = 5):
+        """Show the next runs of a scheduled message (up to 10)."""
+        if not ctx.guild or not self.bot.db:
+            return
+
+        row = await self.bot.db.fetchrow(
+            "SELECT schedule_type, interval_type, cron, timezone, next_run, enabled "
+            "FROM scheduled_messages WHERE id=$1 AND guild_id=$2",
+            schedule_id,
+            ctx.guild.id,
+        )
+        if not row:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Schedule `#{schedule_id}` not found."
+                )
+            )
+
+        runs = _upcoming_runs(row, max(1, min(count, 10)))
+        if not runs:
+            return await ctx.send(
+                embed=orange_embed(
+                    description=f"Schedule `#{schedule_id}` has no upcoming runs."
+                )
+            )
+
+        lines = [
+            f"`{i}.` {discord.utils.format_dt(run, 'F')} ({discord.utils.format_dt(run, 'R')})"
+            for i, run in enumerate(runs, start=1)
+        ]
+        em = await ctx_embed(
+            ctx,
+            title=f"🕐  Schedule #{schedule_id} · next runs",
+            description="\n".join(lines),
+        )
+        await ctx.send(embed=em)
+
     @schedule.command(name="delete", aliases=["remove", "del"])
     @commands.guild_only()
     @commands.has_permissions(manage_guild=True)
@@ -733,6 +981,7 @@ class Automations(Cog, emoji=1504381117174644867):
                     description=f"{self.bot.no} Schedule `#{schedule_id}` not found."
                 )
             )
+        await self._schedule_changed(schedule_id)
         await ctx.send(
             embed=green_embed(
                 description=f"{self.bot.yes} Schedule `#{schedule_id}` deleted."
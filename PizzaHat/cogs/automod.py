@@ -9,6 +9,7 @@ from discord.ext.commands import Context
 
 from core.bot import PizzaHat, Tier
 from core.cog import Cog
+from utils.automod import MAX_CUSTOM_PATTERNS, validate_custom_pattern
 from utils.custom_checks import premium
 from utils.embed import ctx_embed, green_embed, orange_embed, red_embed
 
@@ -29,12 +30,15 @@ BASIC_MODULES = [
     "username_filter",
     "default_avatar",
     "join_rate",
+    "custom_regex",
 ]
 
 ALL_MODULES = FREE_MODULES + BASIC_MODULES
 
 PRO_ACTIONS = {"tempban", "role_add", "role_remove"}
 
+MAX_EXTRA_WORDS = 200
+
 MODULE_DESCRIPTIONS = {
     "banned_words": "Delete messages containing blacklisted words",
     "all_caps": "Delete messages exceeding the caps % threshold",
@@ -49,6 +53,7 @@ MODULE_DESCRIPTIONS = {
     "username_filter": "Kick members with banned words or staff impersonation  [Basic]",
     "default_avatar": "Act on members who join with no avatar  [Basic]",
     "join_rate": "Detect mass joins and trigger auto-lockdown  [Basic]",
+    "custom_regex": "Delete messages matching your own regex patterns  [Basic]",
 }
 
 
@@ -173,8 +178,8 @@ class ThresholdModal(discord.ui.Modal, title="Add Warn Threshold"):
         max_length=3,
     )
     duration = discord.ui.TextInput(
-        label="Duration in seconds (timeout / tempban only)",
-        placeholder="e.g. 3600  —  leave blank for kick / ban",
+        label="Duration in seconds (timeout / role add only)",
+        placeholder="e.g. 3600  —  leave blank to keep an added role",
         required=False,
         max_length=10,
     )
@@ -463,6 +468,8 @@ class AutoModeration(Cog, emoji=1268880500248936491):
                 f"`{ctx.prefix}automod thresholds` — warn thresholds  **[Basic: unlimited / Free: 1]**\n"
                 f"`{ctx.prefix}automod override #ch module on/off` — per-channel override  **[Basic]**\n"
                 f"`{ctx.prefix}automod settings module key value` — tweak settings  **[Basic]**\n"
+                f"`{ctx.prefix}automod words add/remove <word>` — extra banned words  **[Basic]**\n"
+                f"`{ctx.prefix}automod regex add/remove <pattern>` — custom patterns  **[Basic]**\n"
                 f"`{ctx.prefix}automod decay <days>` — warn decay  **[Pro]**"
             ),
             inline=False,
@@ -829,6 +836,163 @@ class AutoModeration(Cog, emoji=1268880500248936491):
             )
         )
 
+    @automod.command(name="words", aliases=["word"])
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @premium(Tier.BASIC)
+    async def automod_words(
+        self, ctx: Context, action: str | None = None, *, word: str | None = None
+    ):
+        """
+        Manage this server's extra banned words.  [Basic]
+        They are checked on top of the built-in list by `banned_words` and `username_filter`.
+
+        Examples:
+        `p!automod words`
+        `p!automod words add badword`
+        `p!automod words remove badword`
+        """
+
+        if not ctx.guild:
+            return
+
+        row = await self._get_row(ctx.guild.id)
+        cfg: dict = dict(row.get("config") or {})
+        entry = cfg.get("banned_words", {})
+        if not isinstance(entry, dict):
+            entry = {"enabled": bool(entry)}
+        words: list[str] = list(entry.get("extra_words", []))
+
+        if action is None:
+            return await ctx.send(
+                embed=await ctx_embed(
+                    ctx,
+                    title="Extra Banned Words",
+                    description=(
+                        ", ".join(f"||{w}||" for w in words)
+                        if words
+                        else f"None configured. Add one with `{ctx.prefix}automod words add <word>`."
+                    ),
+                )
+            )
+
+        action = action.lower()
+        if action not in ("add", "remove") or not word:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Usage: `{ctx.prefix}automod words add/remove <word>`."
+                )
+            )
+
+        word = word.lower().strip()
+        if action == "add":
+            if len(words) >= MAX_EXTRA_WORDS:
+                return await ctx.send(
+                    embed=red_embed(
+                        description=f"{self.bot.no} You can have at most **{MAX_EXTRA_WORDS}** extra words."
+                    )
+                )
+            if word not in words:
+                words.append(word)
+        elif word in words:
+            words.remove(word)
+        else:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} That word is not in the list."
+                )
+            )
+
+        entry["extra_words"] = words
+        cfg["banned_words"] = entry
+        await self._upsert_config(ctx.guild.id, cfg)
+        await ctx.send(
+            embed=green_embed(
+                description=f"{self.bot.yes} Word {'added' if action == 'add' else 'removed'} ({len(words)} extra word(s))."
+            )
+        )
+
+    @automod.command(name="regex", aliases=["pattern", "patterns"])
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @premium(Tier.BASIC)
+    async def automod_regex(
+        self, ctx: Context, action: str | None = None, *, pattern: str | None = None
+    ):
+        """
+        Manage the patterns checked by the `custom_regex` module.  [Basic]
+        Patterns are case-insensitive; enable the module with `automod enable custom_regex`.
+
+        Examples:
+        `p!automod regex`
+        `p!automod regex add fr[e3]{2} ?n[i1]tro`
+        `p!automod regex remove fr[e3]{2} ?n[i1]tro`
+        """
+
+        if not ctx.guild:
+            return
+
+        row = await self._get_row(ctx.guild.id)
+        cfg: dict = dict(row.get("config") or {})
+        entry = cfg.get("custom_regex", {})
+        if not isinstance(entry, dict):
+            entry = {"enabled": bool(entry)}
+        patterns: list[str] = list(entry.get("patterns", []))
+
+        if action is None:
+            return await ctx.send(
+                embed=await ctx_embed(
+                    ctx,
+                    title="Custom AutoMod Patterns",
+                    description=(
+                        "\n".join(f"`{i}.` `{p}`" for i, p in enumerate(patterns, 1))
+                        if patterns
+                        else f"None configured. Add one with `{ctx.prefix}automod regex add <pattern>`."
+                    ),
+                )
+            )
+
+        action = action.lower()
+        if action not in ("add", "remove") or not pattern:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} Usage: `{ctx.prefix}automod regex add/remove <pattern>`."
+                )
+            )
+
+        pattern = pattern.strip("` ")
+        if action == "add":
+            if len(patterns) >= MAX_CUSTOM_PATTERNS:
+                return await ctx.send(
+                    embed=red_embed(
+                        description=f"{self.bot.no} You can have at most **{MAX_CUSTOM_PATTERNS}** patterns."
+                    )
+                )
+            error = validate_custom_pattern(pattern)
+            if error:
+                return await ctx.send(
+                    embed=red_embed(description=f"{self.bot.no} {error}")
+                )
+            if pattern not in patterns:
+                patterns.append(pattern)
+        elif pattern in patterns:
+            patterns.remove(pattern)
+        else:
+            return await ctx.send(
+                embed=red_embed(
+                    description=f"{self.bot.no} That pattern is not in the list."
+                )
+            )
+
+        entry["patterns"] = patterns
+        cfg["custom_regex"] = entry
+        await self._upsert_config(ctx.guild.id, cfg)
+        await ctx.send(
+            embed=green_embed(
+                description=f"{self.bot.yes} Pattern {'added' if action == 'add' else 'removed'} ({len(patterns)} pattern(s))."
+            )
+        )
+
     @automod.command(name="decay")
     @commands.guild_only()
     @commands.has_permissions(manage_guild=True)
@@ -12,6 +12,7 @@ from discord.ext import commands
 from discord.ext.commands import Context
 
 from core.bot import INITIAL_EXTENSIONS, SUB_EXTENSIONS, PizzaHat
+from core.cache import cache_stats
 from core.cog import Cog
 from utils.embed import ctx_embed
 from utils.formats import TabularData, plural
@@ -211,6 +212,101 @@ class Dev(Cog, emoji=1268856867585658981):
         await self.bot.reload_extension("jishaku")
         await ctx.send("Reloaded all cogs!")
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def automodstats(self, ctx: Context):
+        """Show AutoMod analysis pool metrics."""
+
+        automod = self.bot.get_cog("AutoModConfig")
+        if not automod or not hasattr(automod, "analysis"):
+            return await ctx.send(f"{self.bot.no} AutoMod is not loaded.")
+
+        pool = automod.analysis  # type: ignore
+        stats = pool.stats()
+        await ctx.send(
+            f"```\nmode:         {pool.mode} (>= {pool.min_length} chars, queue {pool.queue_size})\n"
+            f"queue depth:  {stats['depth']} (max {stats['max_depth']})\n"
+            f"completed:    {stats['completed']}\n"
+            f"avg wait:     {stats['avg_wait_ms']:.2f}ms\n"
+            f"avg latency:  {stats['avg_latency_ms']:.2f}ms\n"
+            f"last latency: {stats['last_latency_ms']:.2f}ms\n"
+            f"plans sent:   {stats['plan_sends']}\n```"
+        )
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def cachestats(self, ctx: Context):
+        """Show guild config cache metrics."""
+
+        table = TabularData()
+        table.set_columns(
+            [
+                "cache",
+                "size",
+                "hits",
+                "misses",
+                "coalesced",
+                "evictions",
+                "fallbacks",
+                "hit rate",
+            ]
+        )
+        table.add_rows(
+            [
+                name,
+                f"{s['size']}/{s['maxsize']}",
+                s["hits"],
+                s["misses"],
+                s["coalesced"],
+                s["evictions"],
+                s["fallbacks"],
+                f"{s['hit_rate']:.1%}",
+            ]
+            for name, s in cache_stats().items()
+        )
+        await ctx.send(f"```\n{table.render()}\n```")
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def pipelinestats(self, ctx: Context):
+        """Show per-stage timings of the message pipeline."""
+
+        table = TabularData()
+        table.set_columns(["stage", "calls", "stops", "avg", "max"])
+        table.add_rows(
+            [
+                name,
+                s["calls"],
+                s["stops"],
+                f"{s['avg_ms']:.2f}ms",
+                f"{s['max_ms']:.2f}ms",
+            ]
+            for name, s in self.bot.pipeline.stats().items()
+        )
+        await ctx.send(f"```\n{table.render()}\n```")
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def dbstats(self, ctx: Context):
+        """Show database pool metrics and circuit breaker health."""
+
+        if not self.bot.db or not hasattr(self.bot.db, "stats"):
+            return await ctx.send(f"{self.bot.no} No metered database pool.")
+
+        stats = self.bot.db.stats()  # type: ignore
+        breaker = self.bot.db.breaker.stats()  # type: ignore
+        retry = f", retry in {breaker['retry_in']:.0f}s" if breaker["retry_in"] else ""
+        await ctx.send(
+            f"```\nconnections:  {stats['in_use']} in use / {stats['size']} open "
+            f"(min {stats['min_size']}, max {stats['max_size']})\n"
+            f"acquires:     {stats['acquires']}\n"
+            f"avg wait:     {stats['avg_wait_ms']:.2f}ms\n"
+            f"max wait:     {stats['max_wait_ms']:.2f}ms\n"
+            f"breaker:      {breaker['state']}{retry}\n"
+            f"failures:     {breaker['failures']} in a row, "
+            f"{breaker['trips']} trip(s), {breaker['rejected']} rejected\n```"
+        )
+
     @commands.command(hidden=True)
     @commands.is_owner()
     async def update_badwords(self, ctx: Context):
@@ -226,6 +322,14 @@ class Dev(Cog, emoji=1268856867585658981):
             return await ctx.send(f"{self.bot.no} Not a Python file.")
 
         await attachment.save(file_path)  # type: ignore
+
+        automod = self.bot.get_cog("AutoModConfig")
+        if automod and hasattr(automod, "reload_banned_words"):
+            count = automod.reload_banned_words()  # type: ignore
+            return await ctx.send(
+                f"{self.bot.yes} Bad words file updated successfully! ({plural(count):word} loaded)"
+            )
+
         await ctx.send(f"{self.bot.yes} Bad words file updated successfully!")
 
 
@@ -90,50 +90,21 @@ class Fun(Cog, emoji=802615573556363284):
         if not ctx.guild:
             return
 
-        data = (
-            await self.bot.db.fetchrow(
-                "SELECT reason FROM afk WHERE guild_id=$1 AND user_id=$2",
-                ctx.guild.id,
-                ctx.author.id,
+        current = self.bot.afk.reason(ctx.guild.id, ctx.author.id)
+        if current == reason:
+            return await ctx.send(
+                embed=red_embed("You are already AFK with the same reason.")
             )
-            if self.bot.db
-            else None
-        )
-
-        if data:
-            if data["reason"] == reason:
-                return await ctx.send(
-                    embed=red_embed("You are already AFK with the same reason.")
-                )
 
-            (
-                await self.bot.db.execute(
-                    "UPDATE afk SET reason=$1 WHERE guild_id=$2 AND user_id=$3",
-                    reason,
-                    ctx.guild.id,
-                    ctx.author.id,
-                )
-                if self.bot.db
-                else None
-            )
+        await self.bot.afk.set(ctx.guild.id, ctx.author.id, reason)
+        if current is not None:
             return await ctx.send(
                 embed=green_embed(f"{self.bot.yes} AFK status updated successfully.")
             )
 
-        else:
-            (
-                await self.bot.db.execute(
-                    "INSERT INTO afk (guild_id, user_id, reason) VALUES ($1, $2, $3)",
-                    ctx.guild.id,
-                    ctx.author.id,
-                    reason,
-                )
-                if self.bot.db and ctx.guild
-                else None
-            )
-            return await ctx.send(
-                embed=green_embed(f"{self.bot.yes} AFK status set successfully.")
-            )
+        return await ctx.send(
+            embed=green_embed(f"{self.bot.yes} AFK status set successfully.")
+        )
 
     @commands.command(name="credits")
     @commands.cooldown(1, 3, commands.BucketType.user)
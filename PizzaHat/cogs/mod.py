@@ -197,6 +197,7 @@ class Mod(Cog, emoji=1268851270136107048):
             except (discord.HTTPException, AttributeError):
                 pass
 
+            await self.bot.warns.flush()
             warning_count = (
                 await db.fetchval(
                     "SELECT COUNT(*) FROM warnlogs WHERE guild_id=$1", guild.id
@@ -1722,32 +1723,21 @@ class Mod(Cog, emoji=1268851270136107048):
             )
 
         full_reason = f"{reason}  [by {ctx.author} ({ctx.author.id})]"
-        await self.bot.db.execute(
-            "INSERT INTO warnlogs (guild_id, user_id, mod_id, reason) VALUES ($1,$2,$3,$4)",
-            ctx.guild.id,
-            member.id,
-            ctx.author.id,
-            full_reason,
-        )
-
-        warn_count: int = (
-            await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
-                member.id,
-                ctx.guild.id,
-            )
-            or 0
+        warn_count = await self.bot.warns.add(
+            ctx.guild.id, member.id, ctx.author.id, full_reason, buffered=False
         )
 
         automod_cog = self.bot.get_cog("AutoModConfig")
         thresholds: list[dict] = []
+        active_count = warn_count
 
         if automod_cog and hasattr(automod_cog, "_get_thresholds"):
             thresholds = await automod_cog._get_thresholds(ctx.guild.id)  # type: ignore[union-attr]
+            active_count = await automod_cog.active_warn_count(ctx.guild.id, member.id)  # type: ignore[union-attr]
 
         next_action_str = ""
         for t in sorted(thresholds, key=lambda x: x["warns"]):
-            if t["warns"] > warn_count:
+            if t["warns"] > active_count:
                 next_action_str = (
                     f"\n⚠️ Next action at **{t['warns']} warns**: "
                     f"{t['action'].replace('_', ' ').title()}"
@@ -1800,6 +1790,7 @@ class Mod(Cog, emoji=1268851270136107048):
         if not ctx.guild or not self.bot.db:
             return
 
+        await self.bot.warns.flush()
         records = await self.bot.db.fetch(
             "SELECT id, reason, mod_id, created_at FROM warnlogs "
             "WHERE user_id=$1 AND guild_id=$2 ORDER BY id DESC",
@@ -1816,15 +1807,18 @@ class Mod(Cog, emoji=1268851270136107048):
             em.set_thumbnail(url=member.display_avatar.url)
             return await ctx.send(embed=em)
 
+        total = len(records)
+        active_count = total
+
         automod_cog = self.bot.get_cog("AutoModConfig")
         thresholds: list[dict] = []
         if automod_cog and hasattr(automod_cog, "_get_thresholds"):
             thresholds = await automod_cog._get_thresholds(ctx.guild.id)  # type: ignore[union-attr]
+            active_count = await automod_cog.active_warn_count(ctx.guild.id, member.id)  # type: ignore[union-attr]
 
-        total = len(records)
         threshold_note = ""
         for t in sorted(thresholds, key=lambda x: x["warns"]):
-            if total >= t["warns"]:
+            if active_count >= t["warns"]:
                 threshold_note = (
                     f"\n⚠️ **{t['warns']}-warn threshold** reached → "
                     f"**{t['action'].replace('_', ' ').title()}**"
@@ -1876,12 +1870,14 @@ class Mod(Cog, emoji=1268851270136107048):
         if not ctx.guild or not self.bot.db:
             return
 
+        await self.bot.warns.flush()
         result = await self.bot.db.execute(
             "DELETE FROM warnlogs WHERE id=$1 AND user_id=$2 AND guild_id=$3",
             warn_id,
             member.id,
             ctx.guild.id,
         )
+        self.bot.warns.forget(ctx.guild.id, member.id)
 
         if result == "DELETE 0":
             return await ctx.send(
@@ -1906,14 +1902,7 @@ class Mod(Cog, emoji=1268851270136107048):
         if not ctx.guild or not self.bot.db:
             return
 
-        count: int = (
-            await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
-                member.id,
-                ctx.guild.id,
-            )
-            or 0
-        )
+        count = await self.bot.warns.count(ctx.guild.id, member.id)
 
         if count == 0:
             return await ctx.send(
@@ -1940,11 +1929,13 @@ class Mod(Cog, emoji=1268851270136107048):
                 view=None,
             )
 
+        await self.bot.warns.flush()
         await self.bot.db.execute(
             "DELETE FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
             member.id,
             ctx.guild.id,
         )
+        self.bot.warns.forget(ctx.guild.id, member.id)
         await msg.edit(
             embed=green_embed(
                 description=f"{self.bot.yes} Cleared **{count}** warning(s) for {member.mention}."
@@ -15,7 +15,7 @@ from cogs_hidden.role_menus import (
 )
 from core.bot import PizzaHat, Tier
 from core.cog import Cog
-from utils.custom_checks import _tier_cache, premium
+from utils.custom_checks import get_guild_tier, premium
 from utils.embed import ctx_embed, green_embed, orange_embed, red_embed
 
 TIER_LIMITS: dict[Tier, int] = {
@@ -29,15 +29,7 @@ VALID_MODES = {"single", "multi"}
 
 
 async def _guild_tier(bot: PizzaHat, guild_id: int) -> Tier:
-    cached = _tier_cache.get(guild_id)
-    if cached is not None:
-        return cached
-    if bot.db is None:
-        return Tier.FREE
-    row = await bot.db.fetchrow("SELECT tier FROM premium WHERE guild_id=$1", guild_id)
-    tier = Tier(row["tier"]) if row else Tier.FREE
-    _tier_cache[guild_id] = tier
-    return tier
+    return await get_guild_tier(bot.db, guild_id)
 
 
 async def _resolve_menu(ctx: Context, menu_id: int) -> Optional[dict]:
@@ -6,7 +6,7 @@ from discord.ext.commands import Context
 
 from core.bot import PizzaHat, Tier
 from core.cog import Cog
-from utils.custom_checks import _tier_cache
+from utils.custom_checks import get_guild_tier
 from utils.embed import ctx_embed, green_embed, red_embed
 from utils.ui import Paginator
 
@@ -98,7 +98,12 @@ class Tags(Cog, emoji=1268850578415681546):
                         )
                         em.add_field(
                             name="Uses",
-                            value=str(data["uses"]),
+                            value=str(
+                                data["uses"]
+                                + self.bot.counters.pending(
+                                    "tag_uses", (ctx.guild.id, data["tag_name"])
+                                )
+                            ),
                             inline=False,
                         )
 
@@ -110,11 +115,7 @@ class Tags(Cog, emoji=1268850578415681546):
                     paginator = Paginator(ctx, embeds)
                     await ctx.send(embed=embeds[0], view=paginator)
             else:
-                await self.bot.db.execute(
-                    "UPDATE tags SET uses = uses + 1 WHERE guild_id=$1 AND tag_name=$2",
-                    ctx.guild.id,
-                    tag_name,
-                )
+                self.bot.counters.bump("tag_uses", (ctx.guild.id, tag_name))
                 if len(content) > 2000:
                     chunks = self._chunk_text(content, 2000)
                     for chunk in chunks:
@@ -152,13 +153,7 @@ class Tags(Cog, emoji=1268850578415681546):
                     )
                 )
 
-            cached_tier = _tier_cache.get(ctx.guild.id)
-            if cached_tier is None:
-                tier_row = await self.bot.db.fetchrow(
-                    "SELECT tier FROM premium WHERE guild_id=$1", ctx.guild.id
-                )
-                cached_tier = Tier(tier_row["tier"]) if tier_row else Tier.FREE
-                _tier_cache[ctx.guild.id] = cached_tier
+            cached_tier = await get_guild_tier(self.bot.db, ctx.guild.id)
 
             limit = TAG_LIMITS[cached_tier]
             current_tags = await self.bot.db.fetchval(
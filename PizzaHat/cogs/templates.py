@@ -9,12 +9,13 @@ from discord.ext.commands import Context
 from core.bot import PizzaHat
 from core.cog import Cog
 from utils.embed import (
+    CompiledTemplate,
     ctx_embed,
     embed_from_data,
     green_embed,
+    invalidate_template,
     orange_embed,
     red_embed,
-    render_template_vars,
 )
 
 
@@ -179,6 +180,7 @@ class Templates(Cog, emoji=1497265635183431770):
                     description=f"{self.bot.no} Template `#{template_id}` not found."
                 )
             )
+        invalidate_template(template_id)
         await ctx.send(
             embed=green_embed(
                 description=f"{self.bot.yes} Template `#{template_id}` updated. Linked modules will use the new embed immediately."
@@ -204,6 +206,7 @@ class Templates(Cog, emoji=1497265635183431770):
                     description=f"{self.bot.no} Template `#{template_id}` not found."
                 )
             )
+        invalidate_template(template_id)
         await ctx.send(
             embed=green_embed(
                 description=(
@@ -234,7 +237,7 @@ class Templates(Cog, emoji=1497265635183431770):
             )
 
         try:
-            em = embed_from_data(dict(row["data"]))
+            template = CompiledTemplate(dict(row["data"]))
         except Exception as e:
             return await ctx.send(
                 embed=red_embed(
@@ -250,7 +253,7 @@ class Templates(Cog, emoji=1497265635183431770):
             "guild": ctx.guild.name,
             "guild.id": str(ctx.guild.id),
         }
-        render_template_vars(em, **preview_vars)
+        em = template.render(preview_vars)
 
         await ctx.send(
             content=f"Preview of template `#{template_id}` **{row['name']}** (vars filled with your info):",
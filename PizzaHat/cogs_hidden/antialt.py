@@ -2,12 +2,10 @@ from __future__ import annotations
 
 import datetime
 import time
-from typing import Optional
 
 import discord
-from async_lru import alru_cache
-from asyncpg import Record
 
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
 from utils.embed import orange_embed, red_embed
@@ -27,17 +25,14 @@ class AntiAltsConfig(Cog):
         self.bot = bot
 
     def clear_config_cache(self, guild_id: int | None = None) -> None:
-        self._get_logs_channel.cache_clear()
-        self._is_enabled.cache_clear()
+        cache.logs_channels.invalidate(guild_id)
+        cache.antialt.invalidate(guild_id)
 
-    @alru_cache()
     async def _get_logs_channel(self, guild_id: int) -> discord.TextChannel | None:
         if not self.bot.db:
             return None
 
-        channel_id = await self.bot.db.fetchval(
-            "SELECT channel_id FROM guild_logs WHERE guild_id=$1", guild_id
-        )
+        channel_id = await cache.logs_channels.get(self.bot.db, guild_id)
         if not channel_id:
             return None
 
@@ -48,15 +43,9 @@ class AntiAltsConfig(Cog):
         ch = guild.get_channel(channel_id) or await guild.fetch_channel(channel_id)
         return ch if isinstance(ch, discord.TextChannel) else None
 
-    @alru_cache()
     async def _is_enabled(self, guild_id: int) -> bool:
-        if not self.bot.db:
-            return False
-        return bool(
-            await self.bot.db.fetchval(
-                "SELECT enabled FROM antialt WHERE guild_id=$1", guild_id
-            )
-        )
+        data = await cache.antialt.get(self.bot.db, guild_id)
+        return bool(data and data["enabled"])
 
     @Cog.listener(name="on_member_join")
     async def antialt_member_join(self, member: discord.Member) -> None:
@@ -67,10 +56,7 @@ class AntiAltsConfig(Cog):
         if not self.bot.db:
             return
 
-        data: Optional[Record] = await self.bot.db.fetchrow(
-            "SELECT min_age, restricted_role, level FROM antialt WHERE guild_id=$1",
-            member.guild.id,
-        )
+        data = await cache.antialt.get(self.bot.db, member.guild.id)
         if not data:
             return
 
@@ -127,13 +113,12 @@ class AntiAltsConfig(Cog):
                     await member.kick(reason="PizzaHat Anti-Alt: Account too new")
                     action_label = "KICKED"
 
-                    await self.bot.db.execute(
-                        "INSERT INTO warnlogs (guild_id, user_id, mod_id, reason) "
-                        "VALUES ($1, $2, $3, $4)",
+                    await self.bot.warns.add(
                         member.guild.id,
                         member.id,
                         self.bot.user.id,  # type: ignore
                         "Anti-Alt: Kicked for new account (ban on rejoin active for 24h)",
+                        buffered=False,
                     )
 
             elif level >= 3:
@@ -154,9 +139,7 @@ class AntiAltsConfig(Cog):
 
         if level != 2:
             try:
-                await self.bot.db.execute(
-                    "INSERT INTO warnlogs (guild_id, user_id, mod_id, reason) "
-                    "VALUES ($1, $2, $3, $4)",
+                await self.bot.warns.add(
                     member.guild.id,
                     member.id,
                     self.bot.user.id,  # type: ignore
@@ -177,9 +160,7 @@ class AntiAltsConfig(Cog):
         if not await self._is_enabled(member.guild.id):
             return
 
-        data: Optional[Record] = await self.bot.db.fetchrow(
-            "SELECT level FROM antialt WHERE guild_id=$1", member.guild.id
-        )
+        data = await cache.antialt.get(self.bot.db, member.guild.id)
         if not data or data["level"] != 2:
             return
 
@@ -3,22 +3,28 @@ from __future__ import annotations
 import datetime
 import time
 
+import asyncpg
 import discord
-from async_lru import alru_cache
-from discord.ext import tasks
 
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
-from utils.embed import resolve_template, resolve_template_or_none
+from core.pipeline import MessageContext
+from core.schedules import ScheduleDispatcher
+from utils.embed import (
+    render_placeholders,
+    resolve_template,
+    resolve_template_or_none,
+)
+from utils.ratelimit import SlidingWindow
+from utils.responders import ResponderIndex
 
-# Per-user cooldown tracking: (guild_id, responder_id, user_id) → last-fired monotonic
-_cooldown_map: dict[tuple[int, int, int], float] = {}
+# Per-user cooldown tracking: (guild_id, responder_id, user_id) → last firing
+_cooldowns = SlidingWindow()
 
 
 def _render(text: str, **kwargs: str) -> str:
-    for k, v in kwargs.items():
-        text = text.replace(f"{{{k}}}", v)
-    return text
+    return render_placeholders(text, kwargs)
 
 
 def _tvars(
@@ -43,122 +49,100 @@ class AutomationEvents(Cog):
 
     def __init__(self, bot: PizzaHat):
         self.bot = bot
-        self._schedule_task.start()
+        # guild_id -> (cached responder rows, index compiled from them)
+        self._indexes: dict[int, tuple[list[dict], ResponderIndex]] = {}
+        self.schedules = ScheduleDispatcher(bot, self._send_scheduled)
+        self.schedules.start()
+        bot.pipeline.add_stage("responders", self.run_responders)
 
     def cog_unload(self) -> None:
-        self._schedule_task.cancel()
+        self.bot.pipeline.remove_stage("responders")
+        self.schedules.stop()
 
     # ── Cache management ──────────────────────────────────────────────────────
 
     def clear_cache(self, guild_id: int | None = None) -> None:
-        # guild_id parameter is accepted but alru_cache only supports full clear
-        self._fetch_responders.cache_clear()
-        self._fetch_join_config.cache_clear()
-        self._fetch_event_actions.cache_clear()
-
-    @alru_cache()
-    async def _fetch_responders(self, guild_id: int) -> list[dict]:
-        if not self.bot.db:
-            return []
-        rows = await self.bot.db.fetch(
-            "SELECT id, trigger_text, trigger_type, response, template_id, "
-            "channel_ids, role_ids, cooldown_seconds "
-            "FROM auto_responders WHERE guild_id=$1 AND enabled=TRUE ORDER BY id",
-            guild_id,
-        )
-        return [dict(r) for r in rows]
+        cache.responders.invalidate(guild_id)
+        cache.join_config.invalidate(guild_id)
+        cache.event_actions.invalidate(guild_id)
+        if guild_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(guild_id, None)
+
+    async def _get_index(self, ctx: MessageContext) -> ResponderIndex:
+        # Rebuilt only when the cached rows actually changed: a TTL reload
+        # (or any reload) of identical rows keeps the compiled index.
+        rows = await ctx.config(cache.responders)
+        entry = self._indexes.get(ctx.guild.id)  # type: ignore
+        if entry is not None and (entry[0] is rows or entry[0] == rows):
+            if entry[0] is not rows:
+                self._indexes[ctx.guild.id] = (rows, entry[1])  # type: ignore
+            return entry[1]
+
+        index = ResponderIndex(rows)
+        self._indexes[ctx.guild.id] = (rows, index)  # type: ignore
+        return index
 
-    @alru_cache()
     async def _fetch_join_config(self, guild_id: int) -> dict | None:
-        if not self.bot.db:
-            return None
-        row = await self.bot.db.fetchrow(
-            "SELECT auto_role_ids, welcome_channel_id, welcome_message, "
-            "welcome_template_id, welcome_dm, welcome_dm_template_id "
-            "FROM join_automation WHERE guild_id=$1 AND enabled=TRUE",
-            guild_id,
-        )
-        return dict(row) if row else None
+        return await cache.join_config.get(self.bot.db, guild_id)
 
-    @alru_cache()
     async def _fetch_event_actions(self, guild_id: int) -> list[dict]:
-        if not self.bot.db:
-            return []
-        rows = await self.bot.db.fetch(
-            "SELECT id, event_type, actions, template_id "
-            "FROM event_actions WHERE guild_id=$1 AND enabled=TRUE",
-            guild_id,
-        )
-        return [dict(r) for r in rows]
+        return await cache.event_actions.get(self.bot.db, guild_id)
 
     # ── Auto Responders ───────────────────────────────────────────────────────
 
-    @Cog.listener()
-    async def on_message(self, msg: discord.Message) -> None:
-        if msg.author.bot or not msg.guild or not msg.content:
-            return
-
-        responders = await self._fetch_responders(msg.guild.id)
-        if not responders:
-            return
+    async def run_responders(self, ctx: MessageContext) -> bool:
+        """Message pipeline stage; True once a responder replied."""
 
-        content_lower = msg.content.lower()
-        now = time.monotonic()
+        msg = ctx.message
+        if not msg.guild or not msg.content:
+            return False
 
-        for r in responders:
-            trigger: str = r["trigger_text"]
-            ttype: str = r["trigger_type"]
+        index = await self._get_index(ctx)
+        if not index:
+            return False
 
-            # Trigger match
-            if ttype == "exact":
-                if content_lower != trigger:
-                    continue
-            else:
-                if trigger not in content_lower:
-                    continue
+        now = time.monotonic()
+        member_roles: set[int] | None = None
 
+        for r in index.candidates(msg.content, ctx.content_lower):
             # Channel restriction (Basic+)
-            channel_ids: list[int] = list(r.get("channel_ids") or [])
-            if channel_ids and msg.channel.id not in channel_ids:
+            if r.channel_ids and msg.channel.id not in r.channel_ids:
                 continue
 
             # Role restriction (Basic+)
-            role_ids: list[int] = list(r.get("role_ids") or [])
-            if role_ids:
-                member_roles = {role.id for role in getattr(msg.author, "roles", [])}
-                if not member_roles.intersection(set(role_ids)):
+            if r.role_ids:
+                if member_roles is None:
+                    member_roles = {
+                        role.id for role in getattr(msg.author, "roles", [])
+                    }
+                if r.role_ids.isdisjoint(member_roles):
                     continue
 
             # Cooldown (Basic+)
-            cooldown: int = r.get("cooldown_seconds") or 0
-            if cooldown > 0:
-                key = (msg.guild.id, r["id"], msg.author.id)
-                last = _cooldown_map.get(key, 0.0)
-                if now - last < cooldown:
+            if r.cooldown > 0:
+                key = (msg.guild.id, r.id, msg.author.id)
+                if not _cooldowns.allow(key, 1, r.cooldown, now):
                     continue
-                _cooldown_map[key] = now
 
             try:
-                template_id: int | None = r.get("template_id")
-                if template_id:
+                if r.template_id:
                     tvars = _tvars(msg.guild, msg.author)
                     em = await resolve_template_or_none(
-                        self.bot.db, template_id, **tvars
+                        self.bot.db, r.template_id, **tvars
                     )
                     if em is not None:
                         await msg.channel.send(embed=em)
                     else:
-                        await msg.channel.send(r["response"])
+                        await msg.channel.send(r.response)
                 else:
-                    await msg.channel.send(r["response"])
-                if self.bot.db:
-                    await self.bot.db.execute(
-                        "UPDATE auto_responders SET use_count = use_count + 1 WHERE id=$1",
-                        r["id"],
-                    )
+                    await msg.channel.send(r.response)
+                self.bot.counters.bump("responder_uses", r.id)
             except discord.HTTPException:
                 pass
-            break  # only fire first match per message
+            return True  # only fire first match per message
+        return False
 
     # ── Join Automation ───────────────────────────────────────────────────────
 
@@ -249,11 +233,7 @@ class AutomationEvents(Cog):
                     )
                 except Exception:
                     pass
-            if self.bot.db:
-                await self.bot.db.execute(
-                    "UPDATE event_actions SET run_count = run_count + 1 WHERE id=$1",
-                    ea["id"],
-                )
+            self.bot.counters.bump("event_runs", ea["id"])
 
     async def _execute_action(
         self,
@@ -348,68 +328,27 @@ class AutomationEvents(Cog):
 
     # ── Scheduled Messages ────────────────────────────────────────────────────
 
-    @tasks.loop(minutes=1)
-    async def _schedule_task(self) -> None:
-        if not self.bot.db:
+    async def _send_scheduled(self, row: asyncpg.Record) -> None:
+        guild = self.bot.get_guild(row["guild_id"])
+        if not guild:
+            return
+        ch = guild.get_channel(row["channel_id"])
+        if not isinstance(ch, discord.TextChannel):
             return
 
-        now = datetime.datetime.now(datetime.timezone.utc)
-        rows = await self.bot.db.fetch(
-            "SELECT id, guild_id, channel_id, message, schedule_type, interval_type, template_id "
-            "FROM scheduled_messages WHERE enabled=TRUE AND next_run <= $1",
-            now,
-        )
-
-        for row in rows:
-            guild = self.bot.get_guild(row["guild_id"])
-            if guild:
-                ch = guild.get_channel(row["channel_id"])
-                if isinstance(ch, discord.TextChannel):
-                    try:
-                        template_id = row.get("template_id")
-                        if template_id:
-                            tvars = _tvars(guild)
-                            em = await resolve_template_or_none(
-                                self.bot.db, template_id, **tvars
-                            )
-                            if em is not None:
-                                await ch.send(embed=em)
-                            else:
-                                await ch.send(row["message"])
-                        else:
-                            await ch.send(row["message"])
-                    except discord.HTTPException:
-                        pass
-
-            if row["schedule_type"] == "recurring":
-                interval = row["interval_type"]
-                if interval == "daily":
-                    next_run = now + datetime.timedelta(days=1)
-                elif interval == "weekly":
-                    next_run = now + datetime.timedelta(weeks=1)
-                elif interval == "monthly":
-                    next_run = now + datetime.timedelta(days=30)
+        try:
+            template_id = row.get("template_id")
+            if template_id:
+                tvars = _tvars(guild)
+                em = await resolve_template_or_none(self.bot.db, template_id, **tvars)
+                if em is not None:
+                    await ch.send(embed=em)
                 else:
-                    next_run = now + datetime.timedelta(days=1)
-
-                await self.bot.db.execute(
-                    "UPDATE scheduled_messages "
-                    "SET next_run=$1, last_run=$2, run_count=run_count+1 WHERE id=$3",
-                    next_run,
-                    now,
-                    row["id"],
-                )
+                    await ch.send(row["message"])
             else:
-                await self.bot.db.execute(
-                    "UPDATE scheduled_messages "
-                    "SET enabled=FALSE, last_run=$1, run_count=run_count+1 WHERE id=$2",
-                    now,
-                    row["id"],
-                )
-
-    @_schedule_task.before_loop
-    async def _before_schedule(self) -> None:
-        await self.bot.wait_until_ready()
+                await ch.send(row["message"])
+        except discord.HTTPException:
+            pass
 
 
 async def setup(bot: PizzaHat) -> None:
@@ -2,45 +2,50 @@ from __future__ import annotations
 
 import asyncio
 import datetime
-import re
+import importlib
 import time
-from collections import defaultdict
-from difflib import SequenceMatcher
-from urllib import parse
 
 import discord
-import emojis
-from async_lru import alru_cache
 
+import utils.bad_words
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
-from utils.bad_words import BANNED_WORDS
+from core.pipeline import MessageContext
+from utils.automod import (
+    INVITE_REGEX,
+    AnalysisPool,
+    PatternCache,
+    RulePlan,
+    StaffNameIndex,
+    WordMatcher,
+    best_staff_match,
+    module_config,
+    module_enabled,
+)
+from utils.config import AUTOMOD_EXECUTOR, AUTOMOD_QUEUE_SIZE, AUTOMOD_WORKERS
 from utils.embed import green_embed, red_embed
+from utils.ratelimit import SlidingWindow
 
-SCAM_PATTERNS = re.compile(
-    r"(discord[\-\.]gift|nitro[\-\.]free|free[\-\.]nitro|"
-    r"discord[\-\.]com[\-\.]gift|steamcommunity\.ru|"
-    r"discordapp\.io|discord[\-\.]giveaway)",
-    re.IGNORECASE,
-)
-INVITE_REGEX = re.compile(
-    r"((http(s|):\/\/|)(discord)(\.(gg|io|me)\/|app\.com\/invite\/)([0-z]+))"
-)
-ZALGO_REGEX = re.compile(r"%CC%", re.MULTILINE)
-CUSTOM_EMOJI_REGEX = re.compile(r"<a?:[^:]+:\d+>")
+# Reply sent after deleting a message caught by a pure content check.
+CONTENT_VIOLATIONS = {
+    "banned_words": "Watch your language.",
+    "scam_links": "Scam/phishing links are not allowed.",
+    "all_caps": "Please don't use excessive caps.",
+    "emoji_spam": "Don't spam emojis.",
+    "zalgo_text": "Zalgo/corrupted text is not allowed.",
+    "newline_spam": "Excessive line breaks are not allowed.",
+    "repeated_chars": "Please don't repeat characters excessively.",
+    "custom_regex": "That message matches a blocked pattern.",
+}
 
 
-def _has_mod_perms(m: discord.Message) -> bool:
-    if not isinstance(m.author, discord.Member):
-        return False
-    p = m.author.guild_permissions
-    return bool(
-        p.kick_members
-        or p.ban_members
-        or p.manage_guild
-        or p.administrator
-        or m.author == m.guild.owner  # type: ignore
-    )
+# Above this many name comparisons the impersonation check runs in a thread.
+OFFLOAD_CANDIDATES = 2000
+
+
+def _is_staff_role(role: discord.Role) -> bool:
+    return role.permissions.kick_members or role.permissions.manage_guild
 
 
 def _account_age_days(member: discord.Member) -> float:
@@ -49,33 +54,174 @@ def _account_age_days(member: discord.Member) -> float:
     ).total_seconds() / 86400
 
 
+class InviteResolver:
+    """
+    Resolves invite codes to guild ids with as little HTTP as possible.
+
+    Lookups are cached with a TTL (NotFound is cached too, for less time),
+    concurrent lookups of one code share a single request, and each guild's
+    own invite/vanity codes are kept so self-invites never hit the API. The
+    own-codes list is refreshed at most once at a time per guild, and only
+    for codes not already in the lookup cache.
+    """
+
+    FOUND_TTL = 6 * 3600
+    NOT_FOUND_TTL = 15 * 60
+    OWN_CODES_TTL = 3600
+    MAX_CODES = 10_000
+
+    def __init__(self, bot: PizzaHat):
+        self.bot = bot
+        # code -> (expires at, guild id or None when the invite doesn't exist)
+        self._codes: dict[str, tuple[float, int | None]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        # guild_id -> (expires at, codes pointing at that guild)
+        self._own: dict[int, tuple[float, set[str]]] = {}
+        self._own_inflight: dict[int, asyncio.Task] = {}
+
+    def _store(self, code: str, guild_id: int | None, ttl: float) -> None:
+        if len(self._codes) >= self.MAX_CODES:
+            # dicts keep insertion order, so this drops the oldest lookup
+            self._codes.pop(next(iter(self._codes)))
+        self._codes[code] = (time.monotonic() + ttl, guild_id)
+
+    async def is_own(self, guild: discord.Guild, code: str) -> bool:
+        if guild.vanity_url_code and code.lower() == guild.vanity_url_code.lower():
+            return True
+
+        # A code looked up before answers without listing the guild's invites
+        cached = self._codes.get(code)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1] == guild.id
+
+        entry = self._own.get(guild.id)
+        if entry is None or entry[0] < time.monotonic():
+            task = self._own_inflight.get(guild.id)
+            if task is None:
+                task = asyncio.create_task(self._fetch_own(guild))
+                self._own_inflight[guild.id] = task
+                task.add_done_callback(
+                    lambda _: self._own_inflight.pop(guild.id, None)
+                )
+            entry = await asyncio.shield(task)
+
+        return code in entry[1]
+
+    async def _fetch_own(self, guild: discord.Guild) -> tuple[float, set[str]]:
+        codes: set[str] = set()
+        if guild.me.guild_permissions.manage_guild:
+            try:
+                codes = {i.code for i in await guild.invites()}
+            except discord.HTTPException:
+                pass
+
+        entry = (time.monotonic() + self.OWN_CODES_TTL, codes)
+        self._own[guild.id] = entry
+        return entry
+
+    def add_own(self, guild_id: int, code: str) -> None:
+        entry = self._own.get(guild_id)
+        if entry is not None:
+            entry[1].add(code)
+        self._store(code, guild_id, self.FOUND_TTL)
+
+    def remove_own(self, guild_id: int, code: str) -> None:
+        entry = self._own.get(guild_id)
+        if entry is not None:
+            entry[1].discard(code)
+        self._codes.pop(code, None)
+
+    async def resolve(self, code: str) -> int | None:
+        """Guild id an invite code points to, or None if it can't be resolved."""
+
+        cached = self._codes.get(code)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._inflight.get(code)
+        if task is None:
+            task = asyncio.create_task(self._fetch(code))
+            self._inflight[code] = task
+            task.add_done_callback(lambda _: self._inflight.pop(code, None))
+
+        return await asyncio.shield(task)
+
+    async def _fetch(self, code: str) -> int | None:
+        try:
+            invite = await self.bot.fetch_invite(code, with_counts=False)
+        except discord.NotFound:
+            self._store(code, None, self.NOT_FOUND_TTL)
+            return None
+        except discord.HTTPException:
+            return None
+
+        guild_id = invite.guild.id if invite.guild else None
+        self._store(code, guild_id, self.FOUND_TTL)
+        return guild_id
+
+
 class AutoModConfig(Cog):
     """AutoMod event listener and enforcement engine."""
 
-    _spam_buckets: dict[int, dict[int, list[float]]] = defaultdict(
-        lambda: defaultdict(list)
-    )
-    _join_buckets: dict[int, list[float]] = defaultdict(list)
     _raid_locked: dict[int, bool] = {}
 
     def __init__(self, bot: PizzaHat):
         self.bot = bot
         self._mentions = bot.allowed_mentions
+        self._spam_window = SlidingWindow()  # (guild_id, user_id)
+        self._join_window = SlidingWindow()  # guild_id
+        self._invites_cache = InviteResolver(bot)
+        self._staff: dict[int, StaffNameIndex] = {}
+        self.analysis = AnalysisPool(
+            AUTOMOD_EXECUTOR, workers=AUTOMOD_WORKERS, queue_size=AUTOMOD_QUEUE_SIZE
+        )
+        # guild_id -> {channel_id (0 = no override): compiled plan}
+        self._plans: dict[int, dict[int, RulePlan]] = {}
+        self._words = WordMatcher(utils.bad_words.BANNED_WORDS)
+        self._guild_words: dict[int, WordMatcher] = {}
+        self._patterns = PatternCache()
+        self._deferred_handlers = {
+            "message_spam": self._message_spam,
+            "invites": self._invites,
+            "mass_mentions": self._mass_mentions,
+        }
+        bot.pipeline.add_stage("automod", self.check_message)
+
+    def cog_unload(self) -> None:
+        self.bot.pipeline.remove_stage("automod")
+        self.analysis.shutdown()
 
     def clear_config_cache(self, guild_id: int | None = None) -> None:
-        self._get_logs_channel.cache_clear()
-        self._is_enabled.cache_clear()
-        self._get_config.cache_clear()
-        self._get_thresholds.cache_clear()
+        cache.logs_channels.invalidate(guild_id or None)
+        cache.automod.invalidate(guild_id or None)
+        if guild_id:
+            self._plans.pop(guild_id, None)
+            self._guild_words.pop(guild_id, None)
+            self._patterns.invalidate(guild_id)
+        else:
+            self._plans.clear()
+            self._guild_words.clear()
+            self._patterns.invalidate()
+
+    @Cog.listener()
+    async def on_config_change(self, table: str, guild_id: int) -> None:
+        if table == "automod":
+            self.clear_config_cache(guild_id)
+
+    def reload_banned_words(self) -> int:
+        """Re-import utils.bad_words and rebuild the matcher. Returns the word count."""
+
+        module = importlib.reload(utils.bad_words)
+        self._words = WordMatcher(module.BANNED_WORDS)
+        self._plans.clear()
+        self._guild_words.clear()
+        return len(self._words.words)
 
-    @alru_cache()
     async def _get_logs_channel(self, guild_id: int) -> discord.TextChannel | None:
         if not self.bot.db:
             return None
 
-        channel_id = await self.bot.db.fetchval(
-            "SELECT channel_id FROM guild_logs WHERE guild_id=$1", guild_id
-        )
+        channel_id = await cache.logs_channels.get(self.bot.db, guild_id)
         if not channel_id:
             return None
 
@@ -86,35 +232,26 @@ class AutoModConfig(Cog):
         ch = guild.get_channel(channel_id) or await guild.fetch_channel(channel_id)
         return ch if isinstance(ch, discord.TextChannel) else None
 
-    @alru_cache()
     async def _is_enabled(self, guild_id: int) -> bool:
-        if not self.bot.db:
-            return False
-        return bool(
-            await self.bot.db.fetchval(
-                "SELECT enabled FROM automod WHERE guild_id=$1", guild_id
-            )
-        )
+        row = await cache.automod.get(self.bot.db, guild_id)
+        return bool(row and row["enabled"])
 
-    @alru_cache()
     async def _get_config(self, guild_id: int) -> dict:
         """
         Returns merged JSONB config. Falls back to legacy TEXT[] modules column
         and legacy warn_action / warn_threshold columns gracefully.
         """
 
-        if not self.bot.db:
-            return {}
-
-        row = await self.bot.db.fetchrow(
-            "SELECT config, modules, warn_action, warn_threshold "
-            "FROM automod WHERE guild_id=$1",
-            guild_id,
-        )
+        row = await cache.automod.get(self.bot.db, guild_id)
         if not row:
             return {}
 
-        cfg: dict = dict(row["config"]) if row["config"] else {}
+        # Merged once per cache fill and kept on the cached row
+        cfg = row.get("merged")
+        if cfg is not None:
+            return cfg
+
+        cfg = dict(row["config"]) if row["config"] else {}
 
         if not cfg and row["modules"]:
             for mod in row["modules"]:
@@ -126,24 +263,53 @@ class AutoModConfig(Cog):
             if wa and wa != "none" and wt and wt > 0:
                 cfg["thresholds"] = [{"warns": wt, "action": wa}]
 
+        row["merged"] = cfg
         return cfg
 
-    @alru_cache()
     async def _get_thresholds(self, guild_id: int) -> list[dict]:
         cfg = await self._get_config(guild_id)
         return sorted(cfg.get("thresholds", []), key=lambda t: t["warns"])
 
+    async def _get_plan(self, guild_id: int, channel_id: int) -> RulePlan:
+        """Compiled rule plan for a channel; channels without overrides share one."""
+
+        plans = self._plans.setdefault(guild_id, {})
+        plan = plans.get(channel_id)
+        if plan is not None:
+            return plan
+
+        cfg = await self._get_config(guild_id)
+        overrides: dict = cfg.get("overrides", {})
+        key = channel_id if str(channel_id) in overrides else 0
+
+        plan = plans.get(key)
+        if plan is None:
+            plan = RulePlan(
+                cfg,
+                overrides.get(str(key)),
+                words=self._get_word_matcher(guild_id, cfg),
+                compiler=self._patterns.compiler(guild_id),
+            )
+            plans[key] = plan
+
+        plans[channel_id] = plan
+        return plan
+
+    def _get_word_matcher(self, guild_id: int, cfg: dict) -> WordMatcher:
+        """Global banned words plus the guild's own `banned_words.extra_words`."""
+
+        matcher = self._guild_words.get(guild_id)
+        if matcher is None:
+            extra = self._mod_cfg(cfg, "banned_words").get("extra_words", [])
+            matcher = self._words.extend(extra)
+            self._guild_words[guild_id] = matcher
+        return matcher
+
     def _mod_enabled(self, cfg: dict, module: str) -> bool:
-        val = cfg.get(module, {})
-        if isinstance(val, bool):
-            return val
-        if isinstance(val, dict):
-            return bool(val.get("enabled", False))
-        return False
+        return module_enabled(cfg.get(module, {}))
 
     def _mod_cfg(self, cfg: dict, module: str) -> dict:
-        val = cfg.get(module, {})
-        return val if isinstance(val, dict) else {}
+        return module_config(cfg, module)
 
     async def _log(
         self,
@@ -193,6 +359,14 @@ class AutoModConfig(Cog):
 
         await self.bot.send_log(ch, embed=em)
 
+    async def active_warn_count(self, guild_id: int, user_id: int) -> int:
+        """Warns that count toward thresholds, honouring `warn_decay_days`."""
+
+        cfg = await self._get_config(guild_id)
+        return await self.bot.warns.count(
+            guild_id, user_id, decay_days=cfg.get("warn_decay_days")
+        )
+
     async def check_warn_threshold(self, user_id: int, guild_id: int) -> None:
         """
         Called after every warn (manual or automod-issued).
@@ -206,14 +380,7 @@ class AutoModConfig(Cog):
         if not thresholds:
             return
 
-        warn_count: int = (
-            await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
-                user_id,
-                guild_id,
-            )
-            or 0
-        )
+        warn_count = await self.active_warn_count(guild_id, user_id)
 
         action_cfg: dict | None = None
         for t in thresholds:
@@ -254,18 +421,12 @@ class AutoModConfig(Cog):
                 if guild.me.guild_permissions.ban_members:
                     await member.ban(reason=reason, delete_message_days=0)
                     executed = True
-
-                    async def _unban():
-                        await asyncio.sleep(unban_days * 86400)
-                        try:
-                            await guild.unban(
-                                discord.Object(id=user_id),
-                                reason="AutoMod: Temp-ban expired",
-                            )
-                        except discord.HTTPException:
-                            pass
-
-                    asyncio.create_task(_unban())
+                    await self.bot.timers.schedule(
+                        guild_id,
+                        "unban",
+                        discord.utils.utcnow() + datetime.timedelta(days=unban_days),
+                        target_id=user_id,
+                    )
 
             elif action == "ban":
                 if guild.me.guild_permissions.ban_members:
@@ -277,6 +438,15 @@ class AutoModConfig(Cog):
                 if role:
                     await member.add_roles(role, reason=reason)
                     executed = True
+                    if "duration" in action_cfg:
+                        await self.bot.timers.schedule(
+                            guild_id,
+                            "role_remove",
+                            discord.utils.utcnow()
+                            + datetime.timedelta(seconds=duration_secs),
+                            target_id=user_id,
+                            data={"role_id": role.id},
+                        )
 
             elif action == "role_remove":
                 role = guild.get_role(action_cfg.get("role_id", 0))
@@ -322,70 +492,54 @@ class AutoModConfig(Cog):
             ],
         )
 
-    @Cog.listener()
-    async def on_message(self, msg: discord.Message) -> None:
-        if msg.author.bot or not msg.guild or not msg.content or _has_mod_perms(msg):
-            return
-        if not await self._is_enabled(msg.guild.id):
-            return
+    async def check_message(self, ctx: MessageContext) -> bool:
+        """Message pipeline stage; True once a violation was acted on."""
 
-        cfg = await self._get_config(msg.guild.id)
-        overrides: dict = cfg.get("overrides", {})
-        ch_override: dict = overrides.get(str(msg.channel.id), {})
+        msg = ctx.message
+        if not msg.guild or not msg.content or ctx.is_mod:
+            return False
+        row = await ctx.config(cache.automod)
+        if not (row and row["enabled"]):
+            return False
+
+        plan = await self._get_plan(msg.guild.id, msg.channel.id)
+        if not plan:
+            return False
 
-        def _active(module: str) -> bool:
-            """Channel override wins; fall back to global cfg."""
-            if module in ch_override:
-                v = ch_override[module]
-                return bool(v) if isinstance(v, bool) else bool(v.get("enabled", False))
-            return self._mod_enabled(cfg, module)
+        if self.analysis.offloads(msg.content):
+            hits = await self.analysis.analyze(plan, msg.content)
+        else:
+            hits = plan.scan(msg.content)
 
         # Ordered checks — first match wins and issues a warn
-        checks = [
-            ("banned_words", self._banned_words),
-            ("scam_links", self._scam_links),
-            ("all_caps", self._all_caps),
-            ("message_spam", self._message_spam),
-            ("invites", self._invites),
-            ("mass_mentions", self._mass_mentions),
-            ("emoji_spam", self._emoji_spam),
-            ("zalgo_text", self._zalgo_text),
-            ("newline_spam", self._newline_spam),
-            ("repeated_chars", self._repeated_chars),
-        ]
-
-        for mod_name, handler in checks:
-            if not _active(mod_name):
+        for mod_name in hits:
+            handler = self._deferred_handlers.get(mod_name)
+            if handler is None:
+                await self._delete(msg)
+                await self._send(
+                    msg.channel, f"{msg.author.mention} {CONTENT_VIOLATIONS[mod_name]}"
+                )
+            elif not await handler(msg, plan.settings[mod_name]):
                 continue
-            mod_cfg = self._mod_cfg(cfg, mod_name)
-            if await handler(msg, mod_cfg):
-                await self._issue_automod_warn(msg, mod_name)
-                return
+
+            await self._issue_automod_warn(msg, mod_name)
+            return True
+        return False
 
     async def _issue_automod_warn(self, msg: discord.Message, module: str) -> None:
-        """Insert an automatic warn row, log it, then check thresholds."""
+        """Buffer an automatic warn, log it, then check thresholds."""
 
         if not msg.guild or not self.bot.db:
             return
 
         reason = f"AutoMod: {module.replace('_', ' ').title()}"
-        await self.bot.db.execute(
-            "INSERT INTO warnlogs (guild_id, user_id, mod_id, reason) VALUES ($1,$2,$3,$4)",
+        warn_count = await self.bot.warns.add(
             msg.guild.id,
             msg.author.id,
             self.bot.user.id,  # type: ignore
             reason,
         )
 
-        warn_count: int = (
-            await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
-                msg.author.id,
-                msg.guild.id,
-            )
-            or 0
-        )
-
         preview = (msg.content[:300] + "…") if len(msg.content) > 300 else msg.content
 
         await self._log(
@@ -416,58 +570,13 @@ class AutoModConfig(Cog):
         except discord.HTTPException:
             pass
 
-    async def _banned_words(self, msg: discord.Message, cfg: dict) -> bool:
-        content = msg.content.lower()
-        for word in BANNED_WORDS:
-            if word in content:
-                await self._delete(msg)
-                await self._send(
-                    msg.channel, f"{msg.author.mention} Watch your language."
-                )
-                return True
-        return False
-
-    async def _scam_links(self, msg: discord.Message, cfg: dict) -> bool:
-        if SCAM_PATTERNS.search(msg.content):
-            await self._delete(msg)
-            await self._send(
-                msg.channel,
-                f"{msg.author.mention} Scam/phishing links are not allowed.",
-            )
-            return True
-        return False
-
-    async def _all_caps(self, msg: discord.Message, cfg: dict) -> bool:
-        threshold = cfg.get("threshold", 70)
-        min_length = cfg.get("min_length", 8)
-        content = msg.content
-
-        if len(content) < min_length:
-            return False
-
-        alpha = sum(1 for c in content if c.isalpha())
-        if not alpha:
-            return False
-
-        if (sum(1 for c in content if c.isupper()) / alpha) * 100 >= threshold:
-            await self._delete(msg)
-            await self._send(
-                msg.channel, f"{msg.author.mention} Please don't use excessive caps."
-            )
-            return True
-        return False
-
     async def _message_spam(self, msg: discord.Message, cfg: dict) -> bool:
         threshold = cfg.get("threshold", 5)
         window = cfg.get("window_seconds", 6)
 
-        bucket = self._spam_buckets[msg.guild.id][msg.author.id]  # type: ignore
-        now = time.monotonic()
-        bucket[:] = [t for t in bucket if now - t < window]
-        bucket.append(now)
-
-        if len(bucket) >= threshold:
-            bucket.clear()
+        key = (msg.guild.id, msg.author.id)  # type: ignore
+        if self._spam_window.hit(key, window) >= threshold:
+            self._spam_window.reset(key)
 
             def _check(m: discord.Message) -> bool:
                 return m.author.id == msg.author.id
@@ -497,15 +606,13 @@ class AutoModConfig(Cog):
         if not matches or not msg.guild:
             return False
 
-        for match in matches:
-            code = match[-1]
+        for code in dict.fromkeys(match[-1] for match in matches):
             if any(code in w or w in code for w in whitelist):
                 continue
-            try:
-                invite = await self.bot.fetch_invite(code)
-            except discord.NotFound:
+            if await self._invites_cache.is_own(msg.guild, code):
                 continue
-            if invite.guild and invite.guild.id != msg.guild.id:
+            guild_id = await self._invites_cache.resolve(code)
+            if guild_id and guild_id != msg.guild.id:
                 await self._delete(msg)
                 await self._send(
                     msg.channel,
@@ -522,49 +629,85 @@ class AutoModConfig(Cog):
             return True
         return False
 
-    async def _emoji_spam(self, msg: discord.Message, cfg: dict) -> bool:
-        threshold = cfg.get("threshold", 10)
-        emoji_count = emojis.count(msg.content) + len(
-            CUSTOM_EMOJI_REGEX.findall(msg.content)
-        )
-        if emoji_count > threshold:
-            await self._delete(msg)
-            await self._send(msg.channel, f"{msg.author.mention} Don't spam emojis.")
-            return True
-        return False
+    def _get_staff_index(self, guild: discord.Guild) -> StaffNameIndex:
+        # Built once per guild in a single pass over the members (each
+        # `role.members` is a pass of its own); kept up to date incrementally.
+        index = self._staff.get(guild.id)
+        if index is None:
+            index = StaffNameIndex()
+            staff_roles = {r.id for r in guild.roles if _is_staff_role(r)}
+            if staff_roles:
+                for m in guild.members:
+                    if any(r.id in staff_roles for r in m.roles):
+                        index.set(m.id, m.display_name.lower())
+            self._staff[guild.id] = index
+        return index
+
+    def _update_role_holders(self, role: discord.Role) -> None:
+        # Only the holders of a role can change staff status with it
+        if role.guild.id not in self._staff:
+            return
+        for member in role.members:
+            self._update_staff_member(member)
 
-    async def _zalgo_text(self, msg: discord.Message, cfg: dict) -> bool:
-        if ZALGO_REGEX.search(parse.quote(msg.content.encode("utf-8"))):
-            await self._delete(msg)
-            await self._send(
-                msg.channel,
-                f"{msg.author.mention} Zalgo/corrupted text is not allowed.",
-            )
-            return True
-        return False
+    def _update_staff_member(self, member: discord.Member) -> None:
+        index = self._staff.get(member.guild.id)
+        if index is None:
+            return
+        if any(_is_staff_role(r) for r in member.roles):
+            index.set(member.id, member.display_name.lower())
+        else:
+            index.discard(member.id)
 
-    async def _newline_spam(self, msg: discord.Message, cfg: dict) -> bool:
-        threshold = cfg.get("threshold", 10)
-        if msg.content.count("\n") >= threshold:
-            await self._delete(msg)
-            await self._send(
-                msg.channel,
-                f"{msg.author.mention} Excessive line breaks are not allowed.",
-            )
-            return True
-        return False
+    @Cog.listener()
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        if before.roles != after.roles or before.display_name != after.display_name:
+            self._update_staff_member(after)
 
-    async def _repeated_chars(self, msg: discord.Message, cfg: dict) -> bool:
-        threshold = cfg.get("threshold", 15)
-        pattern = re.compile(r"(.)\1{" + str(threshold - 1) + r",}", re.UNICODE)
-        if pattern.search(msg.content):
-            await self._delete(msg)
-            await self._send(
-                msg.channel,
-                f"{msg.author.mention} Please don't repeat characters excessively.",
-            )
-            return True
-        return False
+    @Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        if before.display_name == after.display_name:
+            return
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member:
+                self._update_staff_member(member)
+
+    @Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        index = self._staff.get(member.guild.id)
+        if index is not None:
+            index.discard(member.id)
+
+    @Cog.listener()
+    async def on_guild_role_update(
+        self, before: discord.Role, after: discord.Role
+    ) -> None:
+        if _is_staff_role(before) != _is_staff_role(after):
+            self._update_role_holders(after)
+
+    @Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        # Members still list the deleted role's id, but `member.roles` no
+        # longer includes it, so its holders are re-checked correctly.
+        if _is_staff_role(role):
+            self._update_role_holders(role)
+
+    @Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self._staff.pop(guild.id, None)
+
+    @Cog.listener()
+    async def on_invite_create(self, invite: discord.Invite) -> None:
+        if invite.guild:
+            self._invites_cache.add_own(invite.guild.id, invite.code)
+
+    @Cog.listener()
+    async def on_invite_delete(self, invite: discord.Invite) -> None:
+        if invite.guild:
+            self._invites_cache.remove_own(invite.guild.id, invite.code)
 
     @Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -587,61 +730,66 @@ class AutoModConfig(Cog):
         name = (member.display_name or member.name).lower()
 
         # Banned word in display name
-        for word in BANNED_WORDS:
-            if word in name:
-                try:
-                    await member.kick(reason="AutoMod: Banned word in username")
-                    await self._log(
-                        member.guild.id,
-                        title="Username Filter — Kicked",
-                        description=f"{member.mention} was kicked for having a banned word in their username.",
-                        member=member,
-                        color=0xED4245,
-                        fields=[
-                            (
-                                "Username",
-                                discord.utils.escape_markdown(str(member)),
-                                False,
-                            )
-                        ],
-                    )
-                except discord.HTTPException:
-                    pass
-                return
+        if self._get_word_matcher(member.guild.id, cfg).search(name):
+            try:
+                await member.kick(reason="AutoMod: Banned word in username")
+                await self._log(
+                    member.guild.id,
+                    title="Username Filter — Kicked",
+                    description=f"{member.mention} was kicked for having a banned word in their username.",
+                    member=member,
+                    color=0xED4245,
+                    fields=[
+                        (
+                            "Username",
+                            discord.utils.escape_markdown(str(member)),
+                            False,
+                        )
+                    ],
+                )
+            except discord.HTTPException:
+                pass
+            return
 
         # Staff impersonation
         mod_cfg = self._mod_cfg(cfg, "username_filter")
         if not mod_cfg.get("impersonation_check", True):
             return
 
-        for m in member.guild.members:
-            if m == member:
-                continue
-            if not any(
-                r.permissions.kick_members or r.permissions.manage_guild
-                for r in m.roles
-            ):
-                continue
-            similarity = SequenceMatcher(
-                None, member.display_name.lower(), m.display_name.lower()
-            ).ratio()
-            if similarity >= 0.85:
-                try:
-                    await member.kick(reason="AutoMod: Possible staff impersonation")
-                    await self._log(
-                        member.guild.id,
-                        title="Impersonation Detected — Kicked",
-                        description=(
-                            f"{member.mention} has a suspiciously similar name to "
-                            f"staff member **{discord.utils.escape_markdown(str(m))}** "
-                            f"(similarity `{similarity:.0%}`)."
-                        ),
-                        member=member,
-                        color=0xED4245,
-                    )
-                except discord.HTTPException:
-                    pass
-                return
+        index = self._get_staff_index(member.guild)
+        candidates = [c for c in index.candidates(name) if c[0] != member.id]
+        if not candidates:
+            return
+
+        # Big staff lists on big guilds: keep the comparisons off the event loop.
+        if len(candidates) > OFFLOAD_CANDIDATES:
+            match = await asyncio.to_thread(best_staff_match, name, candidates)
+        else:
+            match = best_staff_match(name, candidates)
+        if match is None:
+            return
+
+        staff_id, similarity = match
+        m = member.guild.get_member(staff_id)
+        if m is None:
+            index.discard(staff_id)
+            return
+
+        try:
+            await member.kick(reason="AutoMod: Possible staff impersonation")
+            await self._log(
+                member.guild.id,
+                title="Impersonation Detected — Kicked",
+                description=(
+                    f"{member.mention} has a suspiciously similar name to "
+                    f"staff member **{discord.utils.escape_markdown(str(m))}** "
+                    f"(similarity `{similarity:.0%}`)."
+                ),
+                member=member,
+                color=0xED4245,
+            )
+        except discord.HTTPException:
+            pass
 
     async def _check_default_avatar(self, member: discord.Member, cfg: dict) -> None:
         if not self._mod_enabled(cfg, "default_avatar"):
@@ -684,7 +832,9 @@ class AutoModConfig(Cog):
             return
 
         guild_id = member.guild.id
-        if self._raid_locked.get(guild_id):
+        if self._raid_locked.get(guild_id) or self.bot.timers.has_pending(
+            guild_id, "lockdown_restore"
+        ):
             return
 
         mod_cfg = self._mod_cfg(cfg, "join_rate")
@@ -692,16 +842,11 @@ class AutoModConfig(Cog):
         window = mod_cfg.get("window_seconds", 30)
         lockdown_minutes = mod_cfg.get("lockdown_minutes", 15)
 
-        bucket = self._join_buckets[guild_id]
-        now = time.monotonic()
-        bucket[:] = [t for t in bucket if now - t < window]
-        bucket.append(now)
-
-        if len(bucket) < threshold:
+        if self._join_window.hit(guild_id, window) < threshold:
             return
 
         self._raid_locked[guild_id] = True
-        bucket.clear()
+        self._join_window.reset(guild_id)
         guild = member.guild
 
         original_level: discord.VerificationLevel | None = None
@@ -729,29 +874,75 @@ class AutoModConfig(Cog):
             em.set_footer(text=guild.name)
             await self.bot.send_log(ch, embed=em)
 
-        # Schedule restore
-        async def _restore() -> None:
-            await asyncio.sleep(lockdown_minutes * 60)
-            try:
-                if original_level is not None:
-                    await guild.edit(
-                        verification_level=original_level,
-                        reason="AutoMod: Raid lockdown expired",
-                    )
-                self._raid_locked[guild_id] = False
-                if ch:
-                    await self.bot.send_log(
-                        ch,
-                        embed=green_embed(
-                            title="Lockdown Lifted",
-                            description="Verification level has been restored to its original setting.",
-                            timestamp=True,
-                        ),
-                    )
-            except discord.HTTPException:
-                pass
+        await self.bot.timers.schedule(
+            guild_id,
+            "lockdown_restore",
+            discord.utils.utcnow() + datetime.timedelta(minutes=lockdown_minutes),
+            data={
+                "verification_level": (
+                    original_level.value if original_level is not None else None
+                )
+            },
+        )
+
+    @Cog.listener()
+    async def on_unban_timer_complete(
+        self, guild_id: int, user_id: int, data: dict
+    ) -> None:
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        try:
+            await guild.unban(
+                discord.Object(id=user_id), reason="AutoMod: Temp-ban expired"
+            )
+        except discord.HTTPException:
+            pass
+
+    @Cog.listener()
+    async def on_role_remove_timer_complete(
+        self, guild_id: int, user_id: int, data: dict
+    ) -> None:
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        member = guild.get_member(user_id)
+        role = guild.get_role(data.get("role_id", 0))
+        if not member or not role:
+            return
+        try:
+            await member.remove_roles(role, reason="AutoMod: Timed role expired")
+        except discord.HTTPException:
+            pass
+
+    @Cog.listener()
+    async def on_lockdown_restore_timer_complete(
+        self, guild_id: int, target_id: int | None, data: dict
+    ) -> None:
+        self._raid_locked[guild_id] = False
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
 
-        asyncio.create_task(_restore())
+        try:
+            level = data.get("verification_level")
+            if level is not None:
+                await guild.edit(
+                    verification_level=discord.VerificationLevel(level),
+                    reason="AutoMod: Raid lockdown expired",
+                )
+            ch = await self._get_logs_channel(guild_id)
+            if ch:
+                await self.bot.send_log(
+                    ch,
+                    embed=green_embed(
+                        title="Lockdown Lifted",
+                        description="Verification level has been restored to its original setting.",
+                        timestamp=True,
+                    ),
+                )
+        except discord.HTTPException:
+            pass
 
 
 async def setup(bot: PizzaHat) -> None:
@@ -2,15 +2,12 @@ import asyncio
 
 import discord
 from core.bot import PizzaHat
+from core.cache import invalidate_guild
 from core.cog import Cog
-from core.database import get_prefix
+from core.database import DB_ERRORS, get_prefix
+from core.pipeline import MessageContext
 from utils.config import LOGS_CHANNEL
-from utils.embed import (
-    green_embed,
-    guild_embed,
-    invalidate_theme_cache,
-    red_embed,
-)
+from utils.embed import green_embed, guild_embed, red_embed
 
 
 class Events(Cog):
@@ -19,8 +16,14 @@ class Events(Cog):
     def __init__(self, bot: PizzaHat):
         self.bot: PizzaHat = bot
         self._auto_left: set[int] = set()
+        bot.pipeline.add_stage("afk", self.member_ping_in_afk)
+        bot.pipeline.add_stage("mention", self.bot_mention, guild_only=False)
         # bot.loop.create_task(self.update_stats())
 
+    def cog_unload(self) -> None:
+        self.bot.pipeline.remove_stage("afk")
+        self.bot.pipeline.remove_stage("mention")
+
     async def _get_bot_logs_channel(self) -> discord.TextChannel | None:
         channel = self.bot.get_channel(LOGS_CHANNEL)
 
@@ -74,17 +77,11 @@ class Events(Cog):
 
     # ====== BOT PING MSG ======
 
-    @Cog.listener()
-    async def on_message(self, msg: discord.Message):
+    async def bot_mention(self, ctx: MessageContext) -> None:
+        msg = ctx.message
         if self.bot and self.bot.user is not None:
             bot_id = self.bot.user.id
 
-            if msg.author.bot:
-                return
-
-            if self.bot.user == msg.author:
-                return
-
             if msg.content in {f"<@{bot_id}>", f"<@!{bot_id}>"}:
                 prefix = (
                     await get_prefix(self.bot.db, msg.guild.id if msg.guild else 0)
@@ -175,7 +172,7 @@ class Events(Cog):
             if callable(clear_cache):
                 clear_cache(guild.id)
 
-        invalidate_theme_cache(guild.id)
+        invalidate_guild(guild.id)
         leave_reason, was_auto_left = self._get_leave_reason(guild)
 
         em = red_embed(
@@ -205,51 +202,31 @@ class Events(Cog):
 
     # ====== MEMBER PING - AFK EVENT ======
 
-    @Cog.listener(name="on_message")
-    async def member_ping_in_afk(self, msg: discord.Message):
-        if msg.author.bot or not msg.guild:
+    async def member_ping_in_afk(self, ctx: MessageContext) -> None:
+        msg = ctx.message
+        if not msg.guild:
             return
 
-        data = (
-            await self.bot.db.fetchrow(
-                "SELECT reason FROM afk WHERE guild_id=$1 AND user_id=$2",
-                msg.guild.id,
-                msg.author.id,
-            )
-            if self.bot.db
-            else None
-        )
-
-        if data:
-            (
-                await self.bot.db.execute(
-                    "DELETE FROM afk WHERE user_id=$1 AND guild_id=$2",
-                    msg.author.id,
-                    msg.guild.id,
-                )
-                if self.bot.db
-                else None
-            )
-            return await msg.channel.send(
+        afk = self.bot.afk
+        if afk.reason(msg.guild.id, msg.author.id) is not None:
+            try:
+                await afk.remove(msg.guild.id, msg.author.id)
+            except DB_ERRORS:
+                pass  # cleared in memory; only a restart would bring the row back
+            await msg.channel.send(
                 f"Welcome back {msg.author.mention}.\nI have removed your AFK status."
             )
+            return
 
         if msg.mentions:
+            away = afk.among(msg.guild.id, (m.id for m in msg.mentions))
             for mention in msg.mentions:
-                d2 = (
-                    await self.bot.db.fetchrow(
-                        "SELECT reason FROM afk WHERE guild_id=$1 AND user_id=$2",
-                        msg.guild.id,
-                        mention.id,
-                    )
-                    if self.bot.db
-                    else None
-                )
+                reason = away.get(mention.id)
 
-                if d2 and mention.id != msg.author.id:
+                if reason is not None and mention.id != msg.author.id:
                     em = discord.Embed(
                         title="💤 Member is AFK",
-                        description=f"{mention.mention} is currently away.\n**Reason:** {d2['reason']}",
+                        description=f"{mention.mention} is currently away.\n**Reason:** {reason}",
                         color=0x456DD4,
                         timestamp=msg.created_at,
                     )
@@ -4,11 +4,11 @@ from collections import defaultdict
 from typing import List, Union
 
 import discord
-from async_lru import alru_cache
 from discord.utils import escape_markdown
 from humanfriendly import format_timespan
 
 from cogs.utility import format_date
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
 from utils.embed import green_embed, guild_embed, orange_embed, red_embed
@@ -23,15 +23,12 @@ class GuildLogs(Cog):
         self.lock = asyncio.Lock()
 
     def clear_config_cache(self, guild_id: int | None = None) -> None:
-        self.get_logs_channel.cache_clear()
-        self.check_log_enabled.cache_clear()
+        cache.logs_channels.invalidate(guild_id)
+        cache.log_modules.invalidate(guild_id)
 
-    @alru_cache()
     async def get_logs_channel(self, guild_id: int) -> Union[discord.TextChannel, None]:
         if self.bot.db is not None:
-            data = await self.bot.db.fetchval(
-                "SELECT channel_id FROM guild_logs WHERE guild_id=$1", guild_id
-            )
+            data = await cache.logs_channels.get(self.bot.db, guild_id)
             guild = self.bot.get_guild(guild_id)
 
             if not guild or not data:
@@ -43,12 +40,9 @@ class GuildLogs(Cog):
             )
             return channel
 
-    @alru_cache()
     async def check_log_enabled(self, guild_id: int, module_type: str) -> bool:
         if self.bot.db is not None:
-            modules = await self.bot.db.fetchval(
-                "SELECT module FROM logs_config WHERE guild_id=$1", guild_id
-            )
+            modules = await cache.log_modules.get(self.bot.db, guild_id)
 
             if modules:
                 if "all" in modules:
@@ -2,10 +2,11 @@ import datetime
 from typing import Union
 
 import discord
-from async_lru import alru_cache
 
+from core import cache
 from core.bot import PizzaHat
 from core.cog import Cog
+from core.database import prepared_fetchval
 
 
 def create_starboard_embed(message: discord.Message) -> discord.Embed:
@@ -45,28 +46,10 @@ class StarboardEvents(Cog):
         self.bot: PizzaHat = bot
 
     def clear_config_cache(self, guild_id: int | None = None) -> None:
-        self.get_starboard_config.cache_clear()
+        cache.star_config.invalidate(guild_id)
 
-    @alru_cache()
     async def get_starboard_config(self, guild_id: int) -> Union[dict, None]:
-        data = (
-            await self.bot.db.fetchrow(
-                "SELECT channel_id, star_count, self_star FROM star_config WHERE guild_id=$1",
-                guild_id,
-            )
-            if self.bot.db
-            else None
-        )
-
-        return (
-            {
-                "channel_id": data["channel_id"],
-                "star_count": data["star_count"],
-                "self_star": data["self_star"],
-            }
-            if data
-            else None
-        )
+        return await cache.star_config.get(self.bot.db, guild_id)
 
     @Cog.listener(name="on_raw_reaction_add")
     async def starboard_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -104,8 +87,9 @@ class StarboardEvents(Cog):
 
                     try:
                         em_id = (
-                            await self.bot.db.fetchval(
-                                "SELECT bot_msg_id FROM star_info WHERE guild_id=$1 AND user_msg_id=$2",
+                            await prepared_fetchval(
+                                self.bot.db,
+                                "star_message",
                                 guild.id,
                                 payload.message_id,
                             )
@@ -157,10 +141,8 @@ class StarboardEvents(Cog):
             return
 
         em_id = (
-            await self.bot.db.fetchval(
-                "SELECT bot_msg_id FROM star_info WHERE guild_id=$1 AND user_msg_id=$2",
-                guild.id,
-                payload.message_id,
+            await prepared_fetchval(
+                self.bot.db, "star_message", guild.id, payload.message_id
             )
             if self.bot.db
             else None
@@ -234,10 +216,8 @@ class StarboardEvents(Cog):
             if star_info is not None:
                 try:
                     em_id = (
-                        await self.bot.db.fetchval(
-                            "SELECT bot_msg_id FROM star_info WHERE guild_id=$1 AND user_msg_id=$2",
-                            guild.id,
-                            msg.id,
+                        await prepared_fetchval(
+                            self.bot.db, "star_message", guild.id, msg.id
                         )
                         if self.bot.db
                         else None
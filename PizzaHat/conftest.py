@@ -0,0 +1,2 @@
+# Puts the PizzaHat directory on sys.path, so tests import `core`, `utils`
+# and friends the same way the bot does when run from here.
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+from typing import Iterable, Union
+
+import asyncpg
+
+logger = logging.getLogger("bot")
+
+
+class AfkIndex:
+    """
+    Every AFK member and their reason, held in memory per guild.
+
+    Loaded once at startup and kept in step with the `afk` table by `set` and
+    `remove`, so checking a message author or its mentions never touches the
+    DB. A guild always lives on one shard process, so each process only needs
+    its own writes to stay accurate.
+    """
+
+    def __init__(self, pool: Union[asyncpg.pool.Pool, None]):
+        self.pool = pool
+        # guild_id -> {user_id: reason}
+        self._members: dict[int, dict[int, str]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(members) for members in self._members.values())
+
+    async def load(self) -> None:
+        if self.pool is None:
+            return
+
+        rows = await self.pool.fetch("SELECT guild_id, user_id, reason FROM afk")
+        self._members.clear()
+        for r in rows:
+            self._members.setdefault(r["guild_id"], {})[r["user_id"]] = (
+                r["reason"] or ""
+            )
+        logger.info(f"Loaded {len(rows)} AFK member(s)")
+
+    def reason(self, guild_id: int, user_id: int) -> str | None:
+        """The member's AFK reason, or None when they are not AFK."""
+
+        members = self._members.get(guild_id)
+        return members.get(user_id) if members else None
+
+    def among(self, guild_id: int, user_ids: Iterable[int]) -> dict[int, str]:
+        """The AFK members among `user_ids`, with their reasons."""
+
+        members = self._members.get(guild_id)
+        if not members:
+            return {}
+        return {uid: members[uid] for uid in members.keys() & set(user_ids)}
+
+    async def set(self, guild_id: int, user_id: int, reason: str) -> None:
+        if self.pool is not None:
+            await self.pool.execute(
+                "INSERT INTO afk (guild_id, user_id, reason) VALUES ($1, $2, $3) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET reason = $3",
+                guild_id,
+                user_id,
+                reason,
+            )
+        self._members.setdefault(guild_id, {})[user_id] = reason
+
+    async def remove(self, guild_id: int, user_id: int) -> None:
+        members = self._members.get(guild_id)
+        if members is not None:
+            members.pop(user_id, None)
+            if not members:
+                del self._members[guild_id]
+
+        if self.pool is not None:
+            await self.pool.execute(
+                "DELETE FROM afk WHERE user_id=$1 AND guild_id=$2", user_id, guild_id
+            )
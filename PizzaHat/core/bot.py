@@ -1,5 +1,8 @@
+import asyncio
 import datetime
+import logging
 import sys
+import time
 import traceback
 from enum import IntEnum
 from importlib import import_module
@@ -11,8 +14,20 @@ from discord.ext import commands
 from discord.ext.commands import CommandError, Context
 from discord.ext.commands.errors import ExtensionAlreadyLoaded
 
-from core.database import bootstrap_database, create_db_pool, get_prefix
-from utils.config import DEFAULT_PREFIX, REPO_LINK
+from core.afk import AfkIndex
+from core.cache import warm_up
+from core.counters import UsageCounters
+from core.database import (
+    ConfigListener,
+    DatabaseUnavailable,
+    create_db_pool,
+    get_prefix,
+)
+from core.migrations import migrate
+from core.pipeline import MessagePipeline
+from core.timers import TimerScheduler
+from core.warns import WarnLedger
+from utils.config import CACHE_WARMUP, DEFAULT_PREFIX, REPO_LINK
 from utils.embed import golden_embed
 
 INITIAL_EXTENSIONS = [
@@ -103,6 +118,9 @@ I'm also open source. You can see my code on [GitHub]({REPO_LINK})
 """
 
 
+logger = logging.getLogger("bot")
+
+
 class PizzaHat(commands.Bot):
     def __init__(self):
         allowed_mentions = discord.AllowedMentions(
@@ -140,6 +158,7 @@ class PizzaHat(commands.Bot):
         self.no = "<:no:1268859614129295514>"
         self.color = 0x456DD4
         self.logging_webhooks: dict[int, discord.Webhook] = {}
+        self._warmup_task: asyncio.Task | None = None
 
     async def get_custom_prefix(
         self, bot: "PizzaHat", message: discord.Message
@@ -158,7 +177,29 @@ class PizzaHat(commands.Bot):
 
         # Create DB connection
         self.db = await create_db_pool()
-        await bootstrap_database(self.db)
+        applied = await migrate(self.db)
+        if applied:
+            logger.info(f"Applied schema migrations: {applied}")
+
+        # Invalidate config caches on writes from other processes
+        self.config_listener = ConfigListener(self)
+        self.config_listener.start()
+
+        # Shared warn counters with batched warnlogs inserts
+        self.warns = WarnLedger(self.db)
+        self.warns.start()
+
+        # Responder / event action / tag usage counts, written in batches
+        self.counters = UsageCounters(self.db)
+        self.counters.start()
+
+        # AFK members, checked on every message without a query
+        self.afk = AfkIndex(self.db)
+        await self.afk.load()
+
+        # One on_message listener running every cog's message stage in order
+        self.pipeline = MessagePipeline(self)
+        self.add_listener(self.pipeline.on_message, "on_message")
 
         # Create aiohttp session
         self.session = aiohttp.ClientSession()
@@ -198,6 +239,14 @@ class PizzaHat(commands.Bot):
         except ExtensionAlreadyLoaded:
             pass
 
+        if CACHE_WARMUP and self.db:
+            self._warmup_task = asyncio.create_task(self._warm_caches())
+            self._warmup_task.add_done_callback(self._warm_caches_done)
+
+        # Restart-safe timed actions; started after cogs so their listeners exist
+        self.timers = TimerScheduler(self)
+        self.timers.start()
+
         print(
             f"Loaded all cogs.\nSuccess: {success}, Fail: {fail}\nDone! ({success + fail}/{total})"
         )
@@ -205,7 +254,42 @@ class PizzaHat(commands.Bot):
         print(f"Logged in as {self.user}")
         print("=========================")
 
+    async def _warm_caches(self) -> None:
+        await self.wait_until_ready()
+
+        guild_ids = [g.id for g in self.guilds]
+        start = time.perf_counter()
+        timings = await warm_up(self.db, guild_ids)
+        for name, seconds in timings.items():
+            logger.info(f"Warmed {name} cache in {seconds * 1000:.1f}ms")
+        logger.info(
+            f"Warmed config caches for {len(guild_ids)} guilds in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+    def _warm_caches_done(self, task: asyncio.Task) -> None:
+        self._warmup_task = None
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            # Caches fill on first use instead; nothing else depends on this
+            logger.warning(
+                "Config cache warm-up failed",
+                exc_info=(type(e), e, e.__traceback__),
+            )
+
     async def close(self) -> None:
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+        if hasattr(self, "timers"):
+            self.timers.stop()
+        if hasattr(self, "warns"):
+            await self.warns.close()
+        if hasattr(self, "counters"):
+            await self.counters.close()
+        if hasattr(self, "config_listener"):
+            await self.config_listener.close()
         if hasattr(self, "session") and not self.session.closed:
             await self.session.close()
         await super().close()
@@ -333,7 +417,14 @@ class PizzaHat(commands.Bot):
 
         elif isinstance(error, commands.CommandInvokeError):
             original = error.original
-            if not isinstance(original, discord.HTTPException):
+            if isinstance(original, DatabaseUnavailable):
+                await ctx.send(
+                    embed=discord.Embed(
+                        description="The database is having trouble right now. Please try again in a minute.",
+                        color=0xFAA61A,
+                    )
+                )
+            elif not isinstance(original, discord.HTTPException):
                 if ctx.command is not None:
                     print(f"In {ctx.command.qualified_name}:", file=sys.stderr)
                     traceback.print_tb(original.__traceback__)
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from utils.config import CONFIG_CACHE_SIZE, CONFIG_CACHE_TTL
+
+V = TypeVar("V")
+
+# Guild ids per ANY($1) query when warming caches
+WARMUP_BATCH = 5000
+
+# Postgres channel carrying "<table>:<guild_id>" for every config row change
+NOTIFY_CHANNEL = "config_changed"
+
+Loader = Callable[[Any, int], Awaitable[V]]
+BulkLoader = Callable[[Any, list[int]], Awaitable[dict[int, V]]]
+
+# name -> cache, so invalidation and metrics can reach every guild config cache
+_registry: dict[str, GuildCache] = {}
+
+
+class SingleFlight(Generic[V]):
+    """
+    Runs at most one load per key at a time; concurrent callers for the same
+    key await the load already in flight instead of starting their own.
+
+    The load runs as its own task, so a caller being cancelled does not cancel
+    it for the others. `forget` detaches a key so the next caller starts a
+    fresh load, e.g. after the data it was reading changed.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task[V]] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[V]]) -> V:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(load())
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def forget(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._calls.clear()
+        else:
+            self._calls.pop(key, None)
+
+
+class GuildCache(Generic[V]):
+    """
+    Bounded per-guild cache in front of one config table.
+
+    Entries are kept in LRU order, capped at `maxsize` and expire after `ttl`
+    seconds. `loader(pool, guild_id)` fetches a value on a miss; `None` results
+    are cached too, so guilds without a row do not hit the DB every time.
+    Invalidation is per guild, and a load that races an invalidation is not
+    stored. Concurrent misses for one guild share a single load. If the
+    loader cannot reach the database, the expired value (or `default`) is
+    returned instead. `bulk_loader(pool, guild_ids)` fetches many guilds at once for
+    `warm_up`; guilds missing from its result get the `default`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Loader[V],
+        *,
+        tables: Iterable[str],
+        bulk_loader: BulkLoader[V] | None = None,
+        default: V = None,  # type: ignore[assignment]
+        maxsize: int = CONFIG_CACHE_SIZE,
+        ttl: float | None = CONFIG_CACHE_TTL,
+    ):
+        self.name = name
+        self.loader = loader
+        self.bulk_loader = bulk_loader
+        self.tables = tuple(tables)
+        self.default = default
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        # guild_id -> (expires at, value)
+        self._entries: OrderedDict[int, tuple[float, V]] = OrderedDict()
+        self._generation = 0
+        self._loads: SingleFlight[V] = SingleFlight()
+        self.hits = self.misses = self.evictions = self.fallbacks = 0
+
+        _registry[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, pool, guild_id: int) -> V:
+        entry = self._entries.get(guild_id)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(guild_id)
+                self.hits += 1
+                return entry[1]
+            # Expired: kept until the reload below replaces it
+
+        self.misses += 1
+        if pool is None:
+            return self.default
+
+        generation = self._generation
+        return await self._loads.do(
+            guild_id, lambda: self._load(pool, guild_id, generation, entry)
+        )
+
+    async def _load(
+        self, pool, guild_id: int, generation: int, stale: tuple[float, V] | None
+    ) -> V:
+        try:
+            value = await self.loader(pool, guild_id)
+        except (OSError, asyncio.TimeoutError):
+            # Database down or its circuit breaker open: keep serving what we
+            # had, without storing it, so the next call retries.
+            self.fallbacks += 1
+            return stale[1] if stale is not None else self.default
+        if generation == self._generation:
+            self.set(guild_id, value)
+        return value
+
+    def set(self, guild_id: int, value: V) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else float("inf")
+        self._entries[guild_id] = (expires, value)
+        self._entries.move_to_end(guild_id)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def warm(self, pool, guild_ids: list[int]) -> None:
+        if self.bulk_loader is None:
+            return
+
+        # Warming more guilds than fit would only evict the first batches
+        guild_ids = guild_ids[: self.maxsize]
+        for i in range(0, len(guild_ids), WARMUP_BATCH):
+            batch = guild_ids[i : i + WARMUP_BATCH]
+            generation = self._generation
+            found = await self.bulk_loader(pool, batch)
+            if generation != self._generation:
+                continue
+            for guild_id in batch:
+                self.set(guild_id, found.get(guild_id, self.default))
+
+    def invalidate(self, guild_id: int | None = None) -> None:
+        self._generation += 1
+        self._loads.forget(guild_id)
+        if guild_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(guild_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "fallbacks": self.fallbacks,
+            "coalesced": self._loads.shared,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def invalidate_guild(guild_id: int | None, *, table: str | None = None) -> None:
+    """Drop a guild (or everything) from every cache, or only those built on `table`."""
+
+    for cache in _registry.values():
+        if table is None or table in cache.tables:
+            cache.invalidate(guild_id)
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+async def warm_up(pool, guild_ids: list[int]) -> dict[str, float]:
+    """Fill every cache that has a bulk loader. Returns seconds taken per cache."""
+
+    timings: dict[str, float] = {}
+    for name, cache in list(_registry.items()):
+        if cache.bulk_loader is None:
+            continue
+        start = time.perf_counter()
+        await cache.warm(pool, guild_ids)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+# Loaders, one per config table
+
+
+async def _load_theme(pool, guild_id: int) -> int | None:
+    return await pool.fetchval(
+        "SELECT accent_color FROM guild_themes WHERE guild_id=$1", guild_id
+    )
+
+
+async def _load_tier(pool, guild_id: int) -> int | None:
+    return await pool.fetchval("SELECT tier FROM premium WHERE guild_id=$1", guild_id)
+
+
+async def _load_logs_channel(pool, guild_id: int) -> int | None:
+    return await pool.fetchval(
+        "SELECT channel_id FROM guild_logs WHERE guild_id=$1", guild_id
+    )
+
+
+async def _load_log_modules(pool, guild_id: int) -> frozenset[str]:
+    modules = await pool.fetchval(
+        "SELECT module FROM logs_config WHERE guild_id=$1", guild_id
+    )
+    return frozenset(modules or ())
+
+
+async def _load_automod(pool, guild_id: int) -> dict | None:
+    row = await pool.fetchrow(
+        "SELECT enabled, config, modules, warn_action, warn_threshold "
+        "FROM automod WHERE guild_id=$1",
+        guild_id,
+    )
+    return dict(row) if row else None
+
+
+async def _load_antialt(pool, guild_id: int) -> dict | None:
+    row = await pool.fetchrow(
+        "SELECT enabled, min_age, restricted_role, level FROM antialt WHERE guild_id=$1",
+        guild_id,
+    )
+    return dict(row) if row else None
+
+
+async def _load_star_config(pool, guild_id: int) -> dict | None:
+    row = await pool.fetchrow(
+        "SELECT channel_id, star_count, self_star FROM star_config WHERE guild_id=$1",
+        guild_id,
+    )
+    return dict(row) if row else None
+
+
+async def _load_responders(pool, guild_id: int) -> list[dict]:
+    rows = await pool.fetch(
+        "SELECT id, trigger_text, trigger_type, response, template_id, "
+        "channel_ids, role_ids, cooldown_seconds "
+        "FROM auto_responders WHERE guild_id=$1 AND enabled=TRUE ORDER BY id",
+        guild_id,
+    )
+    return [dict(r) for r in rows]
+
+
+async def _load_join_config(pool, guild_id: int) -> dict | None:
+    row = await pool.fetchrow(
+        "SELECT auto_role_ids, welcome_channel_id, welcome_message, "
+        "welcome_template_id, welcome_dm, welcome_dm_template_id "
+        "FROM join_automation WHERE guild_id=$1 AND enabled=TRUE",
+        guild_id,
+    )
+    return dict(row) if row else None
+
+
+async def _load_event_actions(pool, guild_id: int) -> list[dict]:
+    rows = await pool.fetch(
+        "SELECT id, event_type, actions, template_id "
+        "FROM event_actions WHERE guild_id=$1 AND enabled=TRUE",
+        guild_id,
+    )
+    return [dict(r) for r in rows]
+
+
+# Bulk loaders for warm-up: same columns, keyed by guild_id
+
+
+def bulk_value(query: str) -> BulkLoader:
+    async def load(pool, guild_ids: list[int]) -> dict[int, Any]:
+        return {r[0]: r[1] for r in await pool.fetch(query, guild_ids)}
+
+    return load
+
+
+def _bulk_row(query: str) -> BulkLoader:
+    async def load(pool, guild_ids: list[int]) -> dict[int, dict]:
+        out = {}
+        for r in await pool.fetch(query, guild_ids):
+            row = dict(r)
+            out[row.pop("guild_id")] = row
+        return out
+
+    return load
+
+
+def _bulk_rows(query: str) -> BulkLoader:
+    async def load(pool, guild_ids: list[int]) -> dict[int, list[dict]]:
+        out: dict[int, list[dict]] = {}
+        for r in await pool.fetch(query, guild_ids):
+            row = dict(r)
+            out.setdefault(row.pop("guild_id"), []).append(row)
+        return out
+
+    return load
+
+
+async def _bulk_log_modules(pool, guild_ids: list[int]) -> dict[int, frozenset[str]]:
+    rows = await pool.fetch(
+        "SELECT guild_id, module FROM logs_config WHERE guild_id = ANY($1::BIGINT[])",
+        guild_ids,
+    )
+    return {r["guild_id"]: frozenset(r["module"] or ()) for r in rows}
+
+
+themes: GuildCache[int | None] = GuildCache(
+    "theme",
+    _load_theme,
+    tables=["guild_themes"],
+    bulk_loader=bulk_value(
+        "SELECT guild_id, accent_color FROM guild_themes "
+        "WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+tiers: GuildCache[int | None] = GuildCache(
+    "tier",
+    _load_tier,
+    tables=["premium"],
+    bulk_loader=bulk_value(
+        "SELECT guild_id, tier FROM premium WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+logs_channels: GuildCache[int | None] = GuildCache(
+    "logs_channel",
+    _load_logs_channel,
+    tables=["guild_logs"],
+    bulk_loader=bulk_value(
+        "SELECT guild_id, channel_id FROM guild_logs WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+log_modules: GuildCache[frozenset[str]] = GuildCache(
+    "log_modules",
+    _load_log_modules,
+    tables=["logs_config"],
+    bulk_loader=_bulk_log_modules,
+    default=frozenset(),
+)
+automod: GuildCache[dict | None] = GuildCache(
+    "automod",
+    _load_automod,
+    tables=["automod"],
+    bulk_loader=_bulk_row(
+        "SELECT guild_id, enabled, config, modules, warn_action, warn_threshold "
+        "FROM automod WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+antialt: GuildCache[dict | None] = GuildCache(
+    "antialt",
+    _load_antialt,
+    tables=["antialt"],
+    bulk_loader=_bulk_row(
+        "SELECT guild_id, enabled, min_age, restricted_role, level FROM antialt "
+        "WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+star_config: GuildCache[dict | None] = GuildCache(
+    "star_config",
+    _load_star_config,
+    tables=["star_config"],
+    bulk_loader=_bulk_row(
+        "SELECT guild_id, channel_id, star_count, self_star FROM star_config "
+        "WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+responders: GuildCache[list[dict]] = GuildCache(
+    "responders",
+    _load_responders,
+    tables=["auto_responders"],
+    bulk_loader=_bulk_rows(
+        "SELECT guild_id, id, trigger_text, trigger_type, response, template_id, "
+        "channel_ids, role_ids, cooldown_seconds FROM auto_responders "
+        "WHERE guild_id = ANY($1::BIGINT[]) AND enabled=TRUE ORDER BY id"
+    ),
+    default=[],
+)
+join_config: GuildCache[dict | None] = GuildCache(
+    "join_config",
+    _load_join_config,
+    tables=["join_automation"],
+    bulk_loader=_bulk_row(
+        "SELECT guild_id, auto_role_ids, welcome_channel_id, welcome_message, "
+        "welcome_template_id, welcome_dm, welcome_dm_template_id "
+        "FROM join_automation WHERE guild_id = ANY($1::BIGINT[]) AND enabled=TRUE"
+    ),
+)
+event_actions: GuildCache[list[dict]] = GuildCache(
+    "event_actions",
+    _load_event_actions,
+    tables=["event_actions"],
+    bulk_loader=_bulk_rows(
+        "SELECT guild_id, id, event_type, actions, template_id FROM event_actions "
+        "WHERE guild_id = ANY($1::BIGINT[]) AND enabled=TRUE"
+    ),
+    default=[],
+)
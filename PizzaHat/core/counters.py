@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Hashable, Union
+
+import asyncpg
+
+logger = logging.getLogger("bot")
+
+FLUSH_INTERVAL = 30.0  # seconds between background flushes
+
+# counter -> UPDATE applying every pending delta in one statement. The key
+# columns come first, as parallel arrays, followed by the deltas. The counter
+# columns are left out of the config_changed triggers (migration 4), so a
+# flush never invalidates the responder or event action caches.
+COUNTERS: dict[str, str] = {
+    "responder_uses": (
+        "UPDATE auto_responders AS t SET use_count = t.use_count + d.delta "
+        "FROM unnest($1::INT[], $2::INT[]) AS d(id, delta) WHERE t.id = d.id"
+    ),
+    "event_runs": (
+        "UPDATE event_actions AS t SET run_count = t.run_count + d.delta "
+        "FROM unnest($1::INT[], $2::INT[]) AS d(id, delta) WHERE t.id = d.id"
+    ),
+    "tag_uses": (
+        "UPDATE tags AS t SET uses = t.uses + d.delta "
+        "FROM unnest($1::BIGINT[], $2::TEXT[], $3::INT[]) "
+        "AS d(guild_id, tag_name, delta) "
+        "WHERE t.guild_id = d.guild_id AND t.tag_name = d.tag_name"
+    ),
+}
+
+
+class UsageCounters:
+    """
+    Write-behind usage counters (responder uses, event action runs, tag uses).
+
+    `bump` only adds to an in-memory delta; every FLUSH_INTERVAL seconds, and
+    on close, each counter's deltas are written with one UPDATE ... FROM
+    unnest(...). Stored counts therefore lag by up to one interval; add
+    `pending()` when showing a count that must be exact. Deltas that fail to
+    flush are kept for the next attempt.
+    """
+
+    def __init__(self, pool: Union[asyncpg.pool.Pool, None]):
+        self.pool = pool
+        self._deltas: dict[str, Counter] = {name: Counter() for name in COUNTERS}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.pool is not None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def bump(self, counter: str, key: Hashable, amount: int = 1) -> None:
+        """Add to a counter; `key` is the row id, or a tuple for composite keys."""
+
+        if self.pool is not None:
+            self._deltas[counter][key] += amount
+
+    def pending(self, counter: str, key: Hashable) -> int:
+        return self._deltas[counter][key]
+
+    async def flush(self) -> int:
+        """Write every pending delta. Returns the number of rows updated."""
+
+        if self.pool is None:
+            return 0
+
+        written = 0
+        async with self._lock:
+            for counter, query in COUNTERS.items():
+                deltas = self._deltas[counter]
+                if not deltas:
+                    continue
+
+                # Swap before awaiting so bumps made during the write start a
+                # new batch; sorted keys make every process lock rows in the
+                # same order.
+                self._deltas[counter] = Counter()
+                items = sorted(deltas.items())
+                keys = [k if isinstance(k, tuple) else (k,) for k, _ in items]
+                columns = [list(col) for col in zip(*keys)]
+
+                try:
+                    await self.pool.execute(
+                        query, *columns, [delta for _, delta in items]
+                    )
+                except (asyncpg.PostgresError, OSError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Failed to flush {len(items)} {counter}: {e}")
+                    self._deltas[counter].update(deltas)
+                    continue
+
+                written += len(items)
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
@@ -1,26 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+import logging
 import ssl
-from typing import Union
+import time
+from typing import TYPE_CHECKING, Any, Union
 
 import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
 
-from utils.config import DEFAULT_PREFIX, PG_URL
+from core.cache import NOTIFY_CHANNEL, GuildCache, bulk_value, invalidate_guild
+from utils.config import (
+    DB_ACQUIRE_TIMEOUT,
+    DB_BREAKER_COOLDOWN,
+    DB_BREAKER_THRESHOLD,
+    DB_COMMAND_TIMEOUT,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    DEFAULT_PREFIX,
+    PG_URL,
+)
 
-_prefix_cache: dict[int, str] = {}
+if TYPE_CHECKING:
+    from core.bot import PizzaHat
 
+logger = logging.getLogger("bot")
 
-async def get_prefix(pool, guild_id: int) -> str:
-    if guild_id in _prefix_cache:
-        return _prefix_cache[guild_id]
+# Hot statements, prepared once on every pooled connection. Run them by name
+# with `prepared_fetchval` / `prepared_fetchrow` / `prepared_execute`.
+QUERIES: dict[str, str] = {
+    "prefix": "SELECT prefix FROM prefix WHERE guild_id=$1",
+    "warn_count": "SELECT COUNT(*) FROM warnlogs WHERE user_id=$1 AND guild_id=$2",
+    "star_message": "SELECT bot_msg_id FROM star_info WHERE guild_id=$1 AND user_msg_id=$2",
+}
 
-    if pool is None:
-        return DEFAULT_PREFIX
 
-    prefix = await pool.fetchval(
-        "SELECT prefix FROM prefix WHERE guild_id = $1", guild_id
-    )
-    result = prefix if prefix else DEFAULT_PREFIX
-    _prefix_cache[guild_id] = result
-    return result
+class PreparedConnection(asyncpg.Connection):
+    """Pool connection keeping its own prepared copy of every QUERIES entry."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: dict[str, PreparedStatement] = {}
+
+    async def prepared_statement(self, name: str) -> PreparedStatement:
+        stmt = self.prepared.get(name)
+        if stmt is None:
+            stmt = self.prepared[name] = await self.prepare(QUERIES[name])
+        return stmt
+
+
+class DatabaseUnavailable(ConnectionError):
+    """Raised instead of waiting on the pool while the circuit breaker is open."""
+
+
+# Failures that mean the database is unreachable or overloaded, as opposed to
+# a bad query. DatabaseUnavailable is an OSError, so it is included.
+DB_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.ConnectionDoesNotExistError)
+
+
+class CircuitBreaker:
+    """
+    Stops callers from queueing on a database that keeps timing out.
+
+    After `threshold` consecutive failures the breaker opens and every acquire
+    fails fast with DatabaseUnavailable for `cooldown` seconds. Then it goes
+    half-open and admits a single probe query while still rejecting everyone
+    else: the probe's success closes it, its failure opens it for another
+    cooldown. A probe that never reports back is replaced after `cooldown`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        threshold: int = DB_BREAKER_THRESHOLD,
+        cooldown: float = DB_BREAKER_COOLDOWN,
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_at: float | None = None
+        self.trips = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        if self.state == self.CLOSED:
+            return
+
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self.probe_at = None
+            logger.info("Database circuit breaker half-open, probing the database")
+
+        if self.state == self.HALF_OPEN and (
+            self.probe_at is None or now - self.probe_at >= self.cooldown
+        ):
+            self.probe_at = now
+            return
+
+        self.rejected += 1
+        raise DatabaseUnavailable(f"database circuit breaker is {self.state}")
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.warning("Database circuit breaker closed, database recovered")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_at = None
+
+    def record_failure(self) -> None:
+        if self.state == self.OPEN:
+            return
+
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_at = None
+            self.trips += 1
+            logger.warning(
+                f"Database circuit breaker open after {self.failures} failure(s); "
+                f"serving cached/default values for {self.cooldown:.0f}s"
+            )
+
+    def stats(self) -> dict[str, Any]:
+        retry_in = (
+            max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            if self.state == self.OPEN
+            else 0.0
+        )
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in": retry_in,
+        }
+
+
+class _Acquire:
+    """`MeteredPool.acquire()`: usable with `async with` or plain `await`."""
+
+    __slots__ = ("pool", "timeout", "conn")
+
+    def __init__(self, pool: MeteredPool, timeout: float | None):
+        self.pool = pool
+        self.timeout = timeout
+        self.conn: PreparedConnection | None = None
+
+    def __await__(self):
+        return self.pool._acquire(self.timeout).__await__()
+
+    async def __aenter__(self) -> PreparedConnection:
+        self.conn = await self.pool._acquire(self.timeout)
+        return self.conn
+
+    async def __aexit__(self, *exc) -> None:
+        conn, self.conn = self.conn, None
+        await self.pool.release(conn)  # type: ignore
+
+
+class MeteredPool:
+    """
+    Wraps an asyncpg pool to record how long callers wait to get a connection
+    and to guard every acquire with a CircuitBreaker.
+
+    Only the public pool API is used: the query methods run on a connection
+    from our own `acquire()`, and anything else (`close`, `get_size`, ...) is
+    passed through to the wrapped pool.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+        self.acquires = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.breaker = CircuitBreaker()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_pool":
+            raise AttributeError(name)
+        return getattr(self._pool, name)
+
+    def acquire(self, *, timeout: float | None = None) -> _Acquire:
+        # Every path (pool.fetch*, `async with pool.acquire()`, `await
+        # pool.acquire()`) goes through here. Outcomes, including a failed
+        # acquire, are recorded once, by `guard`.
+        return _Acquire(self, timeout)
+
+    async def _acquire(self, timeout: float | None) -> PreparedConnection:
+        self.breaker.check()
+
+        start = time.perf_counter()
+        conn = await self._pool.acquire(timeout=timeout or DB_ACQUIRE_TIMEOUT)
+        waited = time.perf_counter() - start
+
+        self.acquires += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return conn
+
+    async def release(self, conn: PreparedConnection) -> None:
+        await self._pool.release(conn)
+
+    async def guard(self, coro) -> Any:
+        """Await a query, feeding its outcome to the circuit breaker."""
+
+        try:
+            result = await coro
+        except DatabaseUnavailable:
+            raise
+        except DB_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except asyncpg.PostgresError:
+            # The server answered; the query itself was at fault
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _query(self, method: str, *args, **kwargs) -> Any:
+        async with self.acquire() as conn:
+            return await getattr(conn, method)(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await self.guard(self._query("execute", *args, **kwargs))
+
+    async def executemany(self, *args, **kwargs):
+        return await self.guard(self._query("executemany", *args, **kwargs))
+
+    async def fetch(self, *args, **kwargs):
+        return await self.guard(self._query("fetch", *args, **kwargs))
+
+    async def fetchval(self, *args, **kwargs):
+        return await self.guard(self._query("fetchval", *args, **kwargs))
+
+    async def fetchrow(self, *args, **kwargs):
+        return await self.guard(self._query("fetchrow", *args, **kwargs))
+
+    def stats(self) -> dict[str, Any]:
+        size = self._pool.get_size()
+        return {
+            "size": size,
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+            "in_use": size - self._pool.get_idle_size(),
+            "acquires": self.acquires,
+            "avg_wait_ms": (
+                self.wait_total / self.acquires * 1000 if self.acquires else 0.0
+            ),
+            "max_wait_ms": self.wait_max * 1000,
+        }
+
+
+async def _init_connection(conn: PreparedConnection) -> None:
+    for name in QUERIES:
+        try:
+            await conn.prepared_statement(name)
+        except asyncpg.UndefinedTableError:
+            pass  # fresh database; prepared on first use after bootstrap
+
+
+async def _run_prepared(pool, name: str, method: str, *args) -> Any:
+    if isinstance(pool, MeteredPool):
+        return await pool.guard(_call_prepared(pool, name, method, *args))
+    return await _call_prepared(pool, name, method, *args)
+
+
+async def _call_prepared(pool, name: str, method: str, *args) -> Any:
+    async with pool.acquire() as conn:
+        stmt = await conn.prepared_statement(name)
+        try:
+            return await getattr(stmt, method)(*args)
+        except asyncpg.InvalidCachedStatementError:
+            # The table changed under the prepared plan; prepare it again.
+            conn.prepared.pop(name, None)
+            stmt = await conn.prepared_statement(name)
+            return await getattr(stmt, method)(*args)
+
+
+async def prepared_fetchval(pool, name: str, *args) -> Any:
+    return await _run_prepared(pool, name, "fetchval", *args)
+
+
+async def prepared_fetchrow(pool, name: str, *args) -> asyncpg.Record | None:
+    return await _run_prepared(pool, name, "fetchrow", *args)
+
+
+async def prepared_execute(pool, name: str, *args) -> None:
+    await _run_prepared(pool, name, "fetch", *args)
+
+
+async def _load_prefix(pool, guild_id: int) -> str | None:
+    return await prepared_fetchval(pool, "prefix", guild_id)
+
+
+prefixes: GuildCache[str | None] = GuildCache(
+    "prefix",
+    _load_prefix,
+    tables=["prefix"],
+    bulk_loader=bulk_value(
+        "SELECT guild_id, prefix FROM prefix WHERE guild_id = ANY($1::BIGINT[])"
+    ),
+)
+
+
+async def get_prefix(pool, guild_id: int) -> str:
+    return await prefixes.get(pool, guild_id) or DEFAULT_PREFIX
 
 
 async def set_prefix(pool, guild_id: int, prefix: str) -> None:
@@ -31,109 +324,92 @@ async def set_prefix(pool, guild_id: int, prefix: str) -> None:
             prefix,
         )
 
-    _prefix_cache[guild_id] = prefix
+    prefixes.set(guild_id, prefix)
 
 
 async def invalidate_prefix_cache(guild_id: int) -> None:
     """Remove a guild's prefix from cache, e.g. when the prefix row is deleted."""
-    _prefix_cache.pop(guild_id, None)
+    prefixes.invalidate(guild_id)
 
 
-async def create_db_pool() -> Union[asyncpg.pool.Pool, None]:
+def _ssl_context() -> ssl.SSLContext:
     ssl_object = ssl.create_default_context()
     ssl_object.check_hostname = False
     ssl_object.verify_mode = ssl.CERT_NONE
+    return ssl_object
+
+
+async def create_db_pool() -> Union[MeteredPool, None]:
+    pool = await asyncpg.create_pool(
+        PG_URL,
+        ssl=_ssl_context(),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        max_queries=50000,
+        max_inactive_connection_lifetime=300.0,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=_init_connection,
+        connection_class=PreparedConnection,
+    )
+    return MeteredPool(pool) if pool is not None else None
+
+
+class ConfigListener:
+    """
+    Dedicated LISTEN connection that keeps this process's config caches in
+    sync with writes made anywhere else (other shard processes, the website).
+
+    Triggers on every cached table send `<table>:<guild_id>` on
+    NOTIFY_CHANNEL; each notification drops that guild from the caches built
+    on the table and dispatches `on_config_change(table, guild_id)` for cogs
+    holding derived state. If the connection drops, everything is invalidated
+    after reconnecting since notifications may have been missed.
+    """
+
+    RECONNECT_DELAY = 5.0
+
+    def __init__(self, bot: PizzaHat):
+        self.bot = bot
+        self._conn: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.bot.db is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                self._conn = await asyncpg.connect(PG_URL, ssl=_ssl_context())
+                await self._conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                if connected_before:
+                    invalidate_guild(None)
+                connected_before = True
+
+                while not self._conn.is_closed():
+                    await asyncio.sleep(self.RECONNECT_DELAY)
+
+            except (asyncpg.PostgresError, OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"Config listener disconnected: {e}")
+
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        table, _, guild_id = payload.partition(":")
+        try:
+            gid = int(guild_id)
+        except ValueError:
+            return
 
-    return await asyncpg.create_pool(PG_URL, ssl=ssl_object)
-
-
-async def bootstrap_database(pool: Union[asyncpg.pool.Pool, None]) -> None:
-    if pool is None:
-        return
-
-    statements = [
-        # EMBED_TEMPLATES
-        """CREATE TABLE IF NOT EXISTS embed_templates
-        (id SERIAL PRIMARY KEY, guild_id BIGINT, name TEXT, data JSONB, created_by BIGINT, created_at TIMESTAMP DEFAULT NOW())""",
-        # PREMIUM
-        """CREATE TABLE IF NOT EXISTS premium
-        (guild_id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL, polar_subscription_id TEXT NOT NULL UNIQUE, polar_customer_id TEXT NOT NULL, tier INT DEFAULT 1, status TEXT DEFAULT 'active', current_period_start TIMESTAMP, current_period_end TIMESTAMP, cancel_at_period_end BOOL DEFAULT FALSE, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW())""",
-        # PREFIX
-        """CREATE TABLE IF NOT EXISTS prefix
-        (guild_id BIGINT PRIMARY KEY, prefix TEXT DEFAULT 'p!')""",
-        # AFK
-        """CREATE TABLE IF NOT EXISTS afk
-        (guild_id BIGINT, user_id BIGINT, reason TEXT, UNIQUE (guild_id, user_id))""",
-        # WARNLOGS
-        """CREATE TABLE IF NOT EXISTS warnlogs
-        (id SERIAL PRIMARY KEY, guild_id BIGINT, user_id BIGINT, mod_id BIGINT, reason TEXT, created_at TIMESTAMP DEFAULT NOW())""",
-        # LOGS_CONFIG
-        """CREATE TABLE IF NOT EXISTS logs_config
-        (guild_id BIGINT PRIMARY KEY, module TEXT[] DEFAULT ARRAY['all'])""",
-        # GUILD_LOGS
-        """CREATE TABLE IF NOT EXISTS guild_logs
-        (guild_id BIGINT PRIMARY KEY, channel_id BIGINT)""",
-        # AUTOMOD
-        """CREATE TABLE IF NOT EXISTS automod
-        (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT false, modules TEXT[] DEFAULT ARRAY['banned_words', 'all_caps', 'message_spam', 'invites', 'mass_mentions', 'emoji_spam', 'zalgo_text'], warn_action TEXT DEFAULT 'none', warn_threshold INT DEFAULT 0, config JSONB DEFAULT '{}')""",
-        # ANTIALT
-        """CREATE TABLE IF NOT EXISTS antialt
-        (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT false, min_age INT, restricted_role BIGINT, level INT)""",
-        # TAGS
-        """CREATE TABLE IF NOT EXISTS tags
-        (guild_id BIGINT, tag_name TEXT, content TEXT, creator BIGINT, uses INT DEFAULT 0, PRIMARY KEY (guild_id, tag_name))""",
-        # STAR_CONFIG
-        """CREATE TABLE IF NOT EXISTS star_config
-        (guild_id BIGINT PRIMARY KEY, channel_id BIGINT, star_count INT DEFAULT 5, self_star BOOL DEFAULT true)""",
-        # STAR_INFO
-        """CREATE TABLE IF NOT EXISTS star_info
-        (guild_id BIGINT, user_msg_id BIGINT PRIMARY KEY, bot_msg_id BIGINT)""",
-        # USER_TIMEZONE
-        """CREATE TABLE IF NOT EXISTS user_timezone
-        (user_id BIGINT PRIMARY KEY, timezone TEXT)""",
-        # TICKET_PANEL
-        """CREATE TABLE IF NOT EXISTS ticket_panels
-        (id SERIAL PRIMARY KEY, guild_id BIGINT, channel_id BIGINT, message_id BIGINT, name TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, button_label TEXT DEFAULT 'Create Ticket', button_emoji TEXT, support_role_id BIGINT, enabled BOOL DEFAULT TRUE)""",
-        # TICKET_LOGS
-        """CREATE TABLE IF NOT EXISTS ticket_logs
-        (guild_id BIGINT, thread_id BIGINT PRIMARY KEY, creator_id BIGINT, opened_at TIMESTAMP DEFAULT NOW(), closed_at TIMESTAMP, closed_by BIGINT)""",
-        # GUILD_THEMES
-        """CREATE TABLE IF NOT EXISTS guild_themes
-        (guild_id BIGINT PRIMARY KEY, accent_color TEXT)""",
-        # AUTO_RESPONDERS
-        """CREATE TABLE IF NOT EXISTS auto_responders
-        (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, trigger_text TEXT NOT NULL, trigger_type TEXT DEFAULT 'contains', response TEXT NOT NULL, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, channel_ids BIGINT[] DEFAULT '{}', role_ids BIGINT[] DEFAULT '{}', cooldown_seconds INT DEFAULT 0, enabled BOOL DEFAULT TRUE, use_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
-        # SCHEDULED_MESSAGES
-        """CREATE TABLE IF NOT EXISTS scheduled_messages
-        (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, channel_id BIGINT NOT NULL, message TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, schedule_type TEXT DEFAULT 'once', interval_type TEXT, next_run TIMESTAMPTZ NOT NULL, timezone TEXT DEFAULT 'UTC', enabled BOOL DEFAULT TRUE, last_run TIMESTAMPTZ, run_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
-        # JOIN_AUTOMATION
-        """CREATE TABLE IF NOT EXISTS join_automation
-        (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT TRUE, auto_role_ids BIGINT[] DEFAULT '{}', welcome_channel_id BIGINT, welcome_message TEXT, welcome_template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, welcome_dm TEXT, welcome_dm_template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, created_at TIMESTAMP DEFAULT NOW())""",
-        # EVENT_ACTIONS
-        """CREATE TABLE IF NOT EXISTS event_actions
-        (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, name TEXT NOT NULL, event_type TEXT NOT NULL, actions JSONB DEFAULT '[]', template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, enabled BOOL DEFAULT TRUE, run_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
-        # ROLE_MENUS
-        """CREATE TABLE IF NOT EXISTS role_menus
-        (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, channel_id BIGINT, message_id BIGINT, name TEXT NOT NULL, title TEXT, description TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, type TEXT NOT NULL DEFAULT 'button', mode TEXT NOT NULL DEFAULT 'multi', max_selections INT, required_role_id BIGINT, enabled BOOL DEFAULT TRUE, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT)""",
-        # ROLE_MENU_ITEMS
-        """CREATE TABLE IF NOT EXISTS role_menu_items
-        (menu_id INT NOT NULL REFERENCES role_menus(id) ON DELETE CASCADE, role_id BIGINT NOT NULL, label TEXT, emoji TEXT, description TEXT, position INT DEFAULT 0, PRIMARY KEY (menu_id, role_id))""",
-    ]
-
-    for statement in statements:
-        await pool.execute(statement)
-
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS warnlogs_guild_user_idx ON warnlogs (guild_id, user_id)",
-        "CREATE INDEX IF NOT EXISTS warnlogs_created_at_idx ON warnlogs (guild_id, user_id, created_at DESC)",
-        "CREATE INDEX IF NOT EXISTS star_info_guild_id_idx ON star_info (guild_id)",
-        "CREATE INDEX IF NOT EXISTS star_info_bot_msg_id_idx ON star_info (bot_msg_id)",
-        "CREATE INDEX IF NOT EXISTS auto_responders_guild_id_idx ON auto_responders (guild_id)",
-        "CREATE INDEX IF NOT EXISTS scheduled_messages_guild_id_idx ON scheduled_messages (guild_id)",
-        "CREATE INDEX IF NOT EXISTS scheduled_messages_next_run_idx ON scheduled_messages (next_run) WHERE enabled = TRUE",
-        "CREATE INDEX IF NOT EXISTS event_actions_guild_id_idx ON event_actions (guild_id)",
-        "CREATE INDEX IF NOT EXISTS role_menus_guild_id_idx ON role_menus (guild_id)",
-    ]
-
-    for index in indexes:
-        await pool.execute(index)
+        invalidate_guild(gid, table=table)
+        self.bot.dispatch("config_change", table, gid)
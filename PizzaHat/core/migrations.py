@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from typing import NamedTuple, Union
+
+import asyncpg
+
+from core.cache import NOTIFY_CHANNEL
+
+# pg_advisory_xact_lock key so only one process migrates at a time
+MIGRATION_LOCK = 0x50495A5A
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: list[str]
+
+
+def _notify_trigger(table: str) -> str:
+    return (
+        f"DROP TRIGGER IF EXISTS {table}_notify ON {table};\n"
+        f"CREATE TRIGGER {table}_notify AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        "FOR EACH ROW EXECUTE FUNCTION notify_config_change()"
+    )
+
+
+def _notify_triggers(table: str, columns: tuple[str, ...] = ()) -> str:
+    # Updates only notify when a row really changed, and with `columns` only
+    # when one of those is set, so counter bumps stay silent.
+    of = f" OF {', '.join(columns)}" if columns else ""
+    return (
+        f"DROP TRIGGER IF EXISTS {table}_notify ON {table};\n"
+        f"CREATE TRIGGER {table}_notify AFTER INSERT OR DELETE ON {table} "
+        "FOR EACH ROW EXECUTE FUNCTION notify_config_change();\n"
+        f"DROP TRIGGER IF EXISTS {table}_notify_update ON {table};\n"
+        f"CREATE TRIGGER {table}_notify_update AFTER UPDATE{of} ON {table} "
+        "FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) "
+        "EXECUTE FUNCTION notify_config_change()"
+    )
+
+
+# Append new migrations with the next version; never edit one that shipped.
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "baseline schema",
+        [
+            # EMBED_TEMPLATES
+            """CREATE TABLE IF NOT EXISTS embed_templates
+            (id SERIAL PRIMARY KEY, guild_id BIGINT, name TEXT, data JSONB, created_by BIGINT, created_at TIMESTAMP DEFAULT NOW())""",
+            # PREMIUM
+            """CREATE TABLE IF NOT EXISTS premium
+            (guild_id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL, polar_subscription_id TEXT NOT NULL UNIQUE, polar_customer_id TEXT NOT NULL, tier INT DEFAULT 1, status TEXT DEFAULT 'active', current_period_start TIMESTAMP, current_period_end TIMESTAMP, cancel_at_period_end BOOL DEFAULT FALSE, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW())""",
+            # PREFIX
+            """CREATE TABLE IF NOT EXISTS prefix
+            (guild_id BIGINT PRIMARY KEY, prefix TEXT DEFAULT 'p!')""",
+            # AFK
+            """CREATE TABLE IF NOT EXISTS afk
+            (guild_id BIGINT, user_id BIGINT, reason TEXT, UNIQUE (guild_id, user_id))""",
+            # WARNLOGS
+            """CREATE TABLE IF NOT EXISTS warnlogs
+            (id SERIAL PRIMARY KEY, guild_id BIGINT, user_id BIGINT, mod_id BIGINT, reason TEXT, created_at TIMESTAMP DEFAULT NOW())""",
+            # LOGS_CONFIG
+            """CREATE TABLE IF NOT EXISTS logs_config
+            (guild_id BIGINT PRIMARY KEY, module TEXT[] DEFAULT ARRAY['all'])""",
+            # GUILD_LOGS
+            """CREATE TABLE IF NOT EXISTS guild_logs
+            (guild_id BIGINT PRIMARY KEY, channel_id BIGINT)""",
+            # AUTOMOD
+            """CREATE TABLE IF NOT EXISTS automod
+            (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT false, modules TEXT[] DEFAULT ARRAY['banned_words', 'all_caps', 'message_spam', 'invites', 'mass_mentions', 'emoji_spam', 'zalgo_text'], warn_action TEXT DEFAULT 'none', warn_threshold INT DEFAULT 0, config JSONB DEFAULT '{}')""",
+            # ANTIALT
+            """CREATE TABLE IF NOT EXISTS antialt
+            (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT false, min_age INT, restricted_role BIGINT, level INT)""",
+            # TAGS
+            """CREATE TABLE IF NOT EXISTS tags
+            (guild_id BIGINT, tag_name TEXT, content TEXT, creator BIGINT, uses INT DEFAULT 0, PRIMARY KEY (guild_id, tag_name))""",
+            # STAR_CONFIG
+            """CREATE TABLE IF NOT EXISTS star_config
+            (guild_id BIGINT PRIMARY KEY, channel_id BIGINT, star_count INT DEFAULT 5, self_star BOOL DEFAULT true)""",
+            # STAR_INFO
+            """CREATE TABLE IF NOT EXISTS star_info
+            (guild_id BIGINT, user_msg_id BIGINT PRIMARY KEY, bot_msg_id BIGINT)""",
+            # USER_TIMEZONE
+            """CREATE TABLE IF NOT EXISTS user_timezone
+            (user_id BIGINT PRIMARY KEY, timezone TEXT)""",
+            # TICKET_PANEL
+            """CREATE TABLE IF NOT EXISTS ticket_panels
+            (id SERIAL PRIMARY KEY, guild_id BIGINT, channel_id BIGINT, message_id BIGINT, name TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, button_label TEXT DEFAULT 'Create Ticket', button_emoji TEXT, support_role_id BIGINT, enabled BOOL DEFAULT TRUE)""",
+            # TICKET_LOGS
+            """CREATE TABLE IF NOT EXISTS ticket_logs
+            (guild_id BIGINT, thread_id BIGINT PRIMARY KEY, creator_id BIGINT, opened_at TIMESTAMP DEFAULT NOW(), closed_at TIMESTAMP, closed_by BIGINT)""",
+            # GUILD_THEMES
+            """CREATE TABLE IF NOT EXISTS guild_themes
+            (guild_id BIGINT PRIMARY KEY, accent_color TEXT)""",
+            # AUTO_RESPONDERS
+            """CREATE TABLE IF NOT EXISTS auto_responders
+            (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, trigger_text TEXT NOT NULL, trigger_type TEXT DEFAULT 'contains', response TEXT NOT NULL, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, channel_ids BIGINT[] DEFAULT '{}', role_ids BIGINT[] DEFAULT '{}', cooldown_seconds INT DEFAULT 0, enabled BOOL DEFAULT TRUE, use_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
+            # SCHEDULED_MESSAGES
+            """CREATE TABLE IF NOT EXISTS scheduled_messages
+            (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, channel_id BIGINT NOT NULL, message TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, schedule_type TEXT DEFAULT 'once', interval_type TEXT, next_run TIMESTAMPTZ NOT NULL, timezone TEXT DEFAULT 'UTC', enabled BOOL DEFAULT TRUE, last_run TIMESTAMPTZ, run_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
+            # JOIN_AUTOMATION
+            """CREATE TABLE IF NOT EXISTS join_automation
+            (guild_id BIGINT PRIMARY KEY, enabled BOOL DEFAULT TRUE, auto_role_ids BIGINT[] DEFAULT '{}', welcome_channel_id BIGINT, welcome_message TEXT, welcome_template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, welcome_dm TEXT, welcome_dm_template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, created_at TIMESTAMP DEFAULT NOW())""",
+            # EVENT_ACTIONS
+            """CREATE TABLE IF NOT EXISTS event_actions
+            (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, name TEXT NOT NULL, event_type TEXT NOT NULL, actions JSONB DEFAULT '[]', template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, enabled BOOL DEFAULT TRUE, run_count INT DEFAULT 0, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT NOT NULL)""",
+            # ROLE_MENUS
+            """CREATE TABLE IF NOT EXISTS role_menus
+            (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, channel_id BIGINT, message_id BIGINT, name TEXT NOT NULL, title TEXT, description TEXT, template_id INT REFERENCES embed_templates(id) ON DELETE SET NULL, type TEXT NOT NULL DEFAULT 'button', mode TEXT NOT NULL DEFAULT 'multi', max_selections INT, required_role_id BIGINT, enabled BOOL DEFAULT TRUE, created_at TIMESTAMP DEFAULT NOW(), created_by BIGINT)""",
+            # ROLE_MENU_ITEMS
+            """CREATE TABLE IF NOT EXISTS role_menu_items
+            (menu_id INT NOT NULL REFERENCES role_menus(id) ON DELETE CASCADE, role_id BIGINT NOT NULL, label TEXT, emoji TEXT, description TEXT, position INT DEFAULT 0, PRIMARY KEY (menu_id, role_id))""",
+            # TIMED_ACTIONS
+            """CREATE TABLE IF NOT EXISTS timed_actions
+            (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, action TEXT NOT NULL, target_id BIGINT, data JSONB DEFAULT '{}', due_at TIMESTAMPTZ NOT NULL, created_at TIMESTAMP DEFAULT NOW())""",
+            "CREATE INDEX IF NOT EXISTS warnlogs_guild_user_idx ON warnlogs (guild_id, user_id)",
+            "CREATE INDEX IF NOT EXISTS warnlogs_created_at_idx ON warnlogs (guild_id, user_id, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS star_info_guild_id_idx ON star_info (guild_id)",
+            "CREATE INDEX IF NOT EXISTS star_info_bot_msg_id_idx ON star_info (bot_msg_id)",
+            "CREATE INDEX IF NOT EXISTS auto_responders_guild_id_idx ON auto_responders (guild_id)",
+            "CREATE INDEX IF NOT EXISTS scheduled_messages_guild_id_idx ON scheduled_messages (guild_id)",
+            "CREATE INDEX IF NOT EXISTS scheduled_messages_next_run_idx ON scheduled_messages (next_run) WHERE enabled = TRUE",
+            "CREATE INDEX IF NOT EXISTS event_actions_guild_id_idx ON event_actions (guild_id)",
+            "CREATE INDEX IF NOT EXISTS role_menus_guild_id_idx ON role_menus (guild_id)",
+            "CREATE INDEX IF NOT EXISTS timed_actions_guild_action_idx ON timed_actions (guild_id, action)",
+            # Notify every process when a cached config row changes (core/cache.py)
+            f"""CREATE OR REPLACE FUNCTION notify_config_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{NOTIFY_CHANNEL}', TG_TABLE_NAME || ':' ||
+                    CASE TG_OP WHEN 'DELETE' THEN OLD.guild_id ELSE NEW.guild_id END);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql""",
+            *(
+                _notify_trigger(table)
+                for table in (
+                    "antialt",
+                    "auto_responders",
+                    "automod",
+                    "event_actions",
+                    "guild_logs",
+                    "guild_themes",
+                    "join_automation",
+                    "logs_config",
+                    "prefix",
+                    "premium",
+                    "star_config",
+                )
+            ),
+        ],
+    ),
+    Migration(
+        2,
+        "hot-path indexes",
+        [
+            # Ticket stats in `serverstats` (cogs/mod.py)
+            "CREATE INDEX IF NOT EXISTS ticket_logs_guild_id_idx ON ticket_logs (guild_id)",
+            # Top moderators: GROUP BY mod_id within a guild, answered from the index
+            "CREATE INDEX IF NOT EXISTS warnlogs_guild_mod_idx ON warnlogs (guild_id, mod_id)",
+            # Ticket button clicks resolve the panel by its message (utils/ui.py)
+            "CREATE INDEX IF NOT EXISTS ticket_panels_message_id_idx ON ticket_panels (message_id)",
+            "CREATE INDEX IF NOT EXISTS role_menus_message_id_idx ON role_menus (message_id)",
+            # Template list and autocomplete per guild
+            "CREATE INDEX IF NOT EXISTS embed_templates_guild_id_idx ON embed_templates (guild_id)",
+        ],
+    ),
+    Migration(
+        3,
+        "schedule recurrence expressions",
+        [
+            # Cron-like expression read in `timezone` (utils/recurrence.py);
+            # NULL on older rows, which derive it from interval_type.
+            "ALTER TABLE scheduled_messages ADD COLUMN IF NOT EXISTS cron TEXT",
+        ],
+    ),
+    Migration(
+        4,
+        "quiet config notifications",
+        [
+            # use_count / run_count are bumped by core/counters.py and are not
+            # cached, so they must not invalidate every process's caches.
+            _notify_triggers(
+                "auto_responders",
+                (
+                    "guild_id",
+                    "trigger_text",
+                    "trigger_type",
+                    "response",
+                    "template_id",
+                    "channel_ids",
+                    "role_ids",
+                    "cooldown_seconds",
+                    "enabled",
+                ),
+            ),
+            _notify_triggers(
+                "event_actions",
+                ("guild_id", "event_type", "actions", "template_id", "enabled"),
+            ),
+            *(
+                _notify_triggers(table)
+                for table in (
+                    "antialt",
+                    "automod",
+                    "guild_logs",
+                    "guild_themes",
+                    "join_automation",
+                    "logs_config",
+                    "prefix",
+                    "premium",
+                    "star_config",
+                )
+            ),
+        ],
+    ),
+    Migration(
+        5,
+        "warn timestamps with time zone",
+        [
+            # core/warns.py writes and compares aware UTC times; existing
+            # rows were stored as naive UTC.
+            "ALTER TABLE warnlogs ALTER COLUMN created_at TYPE TIMESTAMPTZ "
+            "USING created_at AT TIME ZONE 'UTC'",
+        ],
+    ),
+]
+
+
+async def migrate(pool: Union[asyncpg.pool.Pool, None]) -> list[int]:
+    """
+    Apply pending migrations in a single transaction and return their versions.
+
+    A warm start costs one query: the current `schema_version` is already the
+    latest, so nothing else runs.
+    """
+
+    if pool is None:
+        return []
+
+    latest = MIGRATIONS[-1].version
+    async with pool.acquire() as conn:
+        try:
+            current = await conn.fetchval("SELECT MAX(version) FROM schema_version")
+        except asyncpg.UndefinedTableError:
+            current = None
+        if (current or 0) >= latest:
+            return []
+
+        applied: list[int] = []
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK)
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_version "
+                "(version INT PRIMARY KEY, description TEXT, applied_at TIMESTAMP DEFAULT NOW())"
+            )
+            # Another process may have migrated while we waited for the lock
+            current = (
+                await conn.fetchval("SELECT MAX(version) FROM schema_version") or 0
+            )
+
+            for migration in MIGRATIONS:
+                if migration.version <= current:
+                    continue
+                await conn.execute(";\n".join(migration.statements))
+                await conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES ($1, $2)",
+                    migration.version,
+                    migration.description,
+                )
+                applied.append(migration.version)
+
+        return applied
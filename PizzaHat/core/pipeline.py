@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, NamedTuple, TypeVar
+
+import discord
+
+from core.cache import GuildCache
+
+if TYPE_CHECKING:
+    from core.bot import PizzaHat
+
+logger = logging.getLogger("bot")
+
+V = TypeVar("V")
+
+# Stages run in this order; unknown names run after these, in registration order.
+# AutoMod goes first so a deleted message never reaches the later stages.
+STAGE_ORDER = ("automod", "afk", "responders", "mention")
+
+
+class MessageContext:
+    """
+    Everything the message stages share about one message, computed once.
+
+    Guild config is read through `config(cache)`, which memoizes per message,
+    so stages asking for the same table cost a single cache lookup.
+    """
+
+    __slots__ = (
+        "bot",
+        "message",
+        "guild",
+        "author",
+        "content_lower",
+        "is_mod",
+        "_config",
+    )
+
+    def __init__(self, bot: PizzaHat, message: discord.Message):
+        self.bot = bot
+        self.message = message
+        self.guild = message.guild
+        self.author = message.author
+        self.content_lower = message.content.lower()
+        self.is_mod = _has_mod_perms(message)
+        self._config: dict[str, Any] = {}
+
+    async def config(self, cache: GuildCache[V]) -> V:
+        if cache.name not in self._config:
+            self._config[cache.name] = await cache.get(
+                self.bot.db, self.guild.id if self.guild else 0
+            )
+        return self._config[cache.name]
+
+
+def _has_mod_perms(m: discord.Message) -> bool:
+    if not isinstance(m.author, discord.Member):
+        return False
+    p = m.author.guild_permissions
+    return bool(
+        p.kick_members
+        or p.ban_members
+        or p.manage_guild
+        or p.administrator
+        or m.author == m.guild.owner  # type: ignore
+    )
+
+
+# A stage returns True once it has dealt with the message, stopping the rest.
+Stage = Callable[[MessageContext], Awaitable["bool | None"]]
+
+
+class _Registered(NamedTuple):
+    name: str
+    stage: Stage
+    guild_only: bool
+
+
+class MessagePipeline:
+    """
+    The bot's single `on_message` listener for non-bot messages.
+
+    Cogs register named stages with `add_stage` (and drop them in
+    `cog_unload`). Each message gets one MessageContext, then the stages run
+    one after another in STAGE_ORDER until one returns True. A stage that
+    raises is logged and skipped; the rest still run. Time spent per stage
+    is recorded for `stats()`.
+    """
+
+    def __init__(self, bot: PizzaHat):
+        self.bot = bot
+        self._stages: list[_Registered] = []
+        # name -> [calls, stops, total seconds, max seconds]
+        self._timings: dict[str, list] = {}
+
+    def add_stage(self, name: str, stage: Stage, *, guild_only: bool = True) -> None:
+        self.remove_stage(name)
+        self._stages.append(_Registered(name, stage, guild_only))
+        self._stages.sort(
+            key=lambda s: (
+                STAGE_ORDER.index(s.name) if s.name in STAGE_ORDER else len(STAGE_ORDER)
+            )
+        )
+        self._timings.setdefault(name, [0, 0, 0.0, 0.0])
+
+    def remove_stage(self, name: str) -> None:
+        self._stages = [s for s in self._stages if s.name != name]
+
+    async def on_message(self, message: discord.Message) -> None:
+        if message.author.bot or not self._stages:
+            return
+
+        ctx = MessageContext(self.bot, message)
+        for registered in self._stages:
+            if registered.guild_only and ctx.guild is None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                stop = await registered.stage(ctx)
+            except Exception:
+                logger.exception(f"Message stage {registered.name!r} failed")
+                stop = False
+            elapsed = time.perf_counter() - start
+
+            timing = self._timings[registered.name]
+            timing[0] += 1
+            timing[2] += elapsed
+            timing[3] = max(timing[3], elapsed)
+            if stop:
+                timing[1] += 1
+                return
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "calls": calls,
+                "stops": stops,
+                "avg_ms": total / calls * 1000 if calls else 0.0,
+                "max_ms": peak * 1000,
+            }
+            for name, (calls, stops, total, peak) in self._timings.items()
+        }
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import asyncpg
+
+from utils.recurrence import Recurrence, RecurrenceError
+
+if TYPE_CHECKING:
+    from core.bot import PizzaHat
+
+logger = logging.getLogger("bot")
+
+SEND_WORKERS = 8  # scheduled messages sent at the same time, bot-wide
+RETRY_DELAY = 60.0  # seconds before retrying after a failed load or batch
+
+_FIELDS = (
+    "id, guild_id, channel_id, message, schedule_type, interval_type, "
+    "template_id, next_run, timezone, cron"
+)
+
+# One statement per due batch: recurring rows move to their next run, one-time
+# rows are disabled.
+_ADVANCE = (
+    "UPDATE scheduled_messages AS s "
+    "SET next_run = d.next_run, enabled = d.enabled, last_run = $4, "
+    "run_count = s.run_count + 1 "
+    "FROM unnest($1::INT[], $2::TIMESTAMPTZ[], $3::BOOL[]) "
+    "AS d(id, next_run, enabled) WHERE s.id = d.id"
+)
+
+Sender = Callable[[asyncpg.Record], Awaitable[Any]]
+
+
+def next_occurrence(
+    row: asyncpg.Record | dict, now: datetime.datetime
+) -> datetime.datetime | None:
+    """
+    When a schedule runs next after firing at `now`; None for one-time ones.
+
+    The next run follows the run that was due, not the time it was picked up,
+    so a recurring schedule never drifts. Runs missed while the bot was down
+    are skipped; the late message that just fired is the only catch-up.
+    """
+
+    recurrence = Recurrence.from_row(row)
+    if recurrence is None:
+        return None
+
+    next_run = recurrence.after(row["next_run"])
+    if next_run <= now:
+        next_run = recurrence.after(now)
+    return next_run
+
+
+class ScheduleDispatcher:
+    """
+    Delivers `scheduled_messages` on time.
+
+    Enabled schedules of this process's guilds sit in a min-heap of
+    (next_run, id); one loop sleeps until the earliest is due and wakes early
+    when `refresh` reports a created, changed or deleted schedule. Everything
+    due is fetched in one query, advanced in one UPDATE (before sending, so a
+    crash never repeats a message) and handed to `send` on background tasks,
+    at most SEND_WORKERS at a time, so a slow channel holds up nobody else.
+    """
+
+    def __init__(self, bot: PizzaHat, send: Sender):
+        self.bot = bot
+        self.send = send
+        self._heap: list[tuple[datetime.datetime, int]] = []
+        # id -> next_run; heap entries that disagree are stale and skipped
+        self._due: dict[int, datetime.datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._workers = asyncio.Semaphore(SEND_WORKERS)
+        self._sending: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def start(self) -> None:
+        if self._task is None and self.bot.db is not None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def refresh(self, schedule_id: int) -> None:
+        """Re-read one schedule after it was created, edited or deleted."""
+
+        if not self.bot.db:
+            return
+
+        row = await self.bot.db.fetchrow(
+            "SELECT guild_id, next_run FROM scheduled_messages "
+            "WHERE id=$1 AND enabled=TRUE",
+            schedule_id,
+        )
+        if row is None or self.bot.get_guild(row["guild_id"]) is None:
+            self._due.pop(schedule_id, None)
+        else:
+            self._push(schedule_id, row["next_run"])
+        self._wakeup.set()
+
+    def _push(self, schedule_id: int, next_run: datetime.datetime) -> None:
+        if next_run.tzinfo is None:
+            next_run = next_run.replace(tzinfo=datetime.timezone.utc)
+        self._due[schedule_id] = next_run
+        heapq.heappush(self._heap, (next_run, schedule_id))
+
+    def _pop_due(self, now: datetime.datetime) -> list[int]:
+        ids: list[int] = []
+        while self._heap and self._heap[0][0] <= now:
+            next_run, schedule_id = heapq.heappop(self._heap)
+            if self._due.get(schedule_id) == next_run:
+                del self._due[schedule_id]
+                ids.append(schedule_id)
+        return ids
+
+    async def _load(self) -> None:
+        # Walks scheduled_messages_next_run_idx (next_run WHERE enabled)
+        rows = await self.bot.db.fetch(  # type: ignore
+            "SELECT id, guild_id, next_run FROM scheduled_messages "
+            "WHERE enabled=TRUE ORDER BY next_run"
+        )
+        for r in rows:
+            if self.bot.get_guild(r["guild_id"]) is not None:
+                self._push(r["id"], r["next_run"])
+
+    async def _run(self) -> None:
+        # Guild lookups need the cache, and anything missed while offline is
+        # due right away.
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self._load()
+                break
+            except Exception as e:
+                logger.warning(f"Loading scheduled messages failed: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+        # One bad iteration must not end delivery for the whole process
+        while True:
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.exception("Schedule dispatcher iteration failed")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _tick(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)  # stale entry
+
+        if not self._heap:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        delay = (self._heap[0][0] - now).total_seconds()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            return
+
+        ids = self._pop_due(now)
+        try:
+            await self._dispatch(ids, now)
+        except Exception as e:
+            # Nothing was sent yet; keep the batch for another try
+            logger.warning(f"Scheduled message batch failed: {e}")
+            retry = now + datetime.timedelta(seconds=RETRY_DELAY)
+            for schedule_id in ids:
+                self._due.setdefault(schedule_id, retry)
+                if self._due[schedule_id] == retry:
+                    heapq.heappush(self._heap, (retry, schedule_id))
+
+    async def _dispatch(self, ids: list[int], now: datetime.datetime) -> None:
+        if not ids:
+            return
+
+        rows = await self.bot.db.fetch(  # type: ignore
+            f"SELECT {_FIELDS} FROM scheduled_messages "
+            "WHERE id = ANY($1::INT[]) AND enabled=TRUE",
+            ids,
+        )
+
+        advanced: list[tuple[int, datetime.datetime, bool]] = []
+        for row in rows:
+            try:
+                next_run = next_occurrence(row, now)
+            except RecurrenceError as e:
+                logger.warning(f"Schedule {row['id']} disabled: {e}")
+                next_run = None
+            if next_run is None:
+                advanced.append((row["id"], row["next_run"], False))
+            else:
+                advanced.append((row["id"], next_run, True))
+
+        if advanced:
+            await self.bot.db.execute(  # type: ignore
+                _ADVANCE,
+                [a[0] for a in advanced],
+                [a[1] for a in advanced],
+                [a[2] for a in advanced],
+                now,
+            )
+        for schedule_id, next_run, enabled in advanced:
+            if enabled:
+                self._push(schedule_id, next_run)
+
+        for row in rows:
+            task = asyncio.create_task(self._send(row))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, row: asyncpg.Record) -> None:
+        async with self._workers:
+            try:
+                await self.send(row)
+            except Exception as e:
+                logger.warning(f"Scheduled message {row['id']} failed: {e}")
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import json
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from core.bot import PizzaHat
+
+logger = logging.getLogger("bot")
+
+RETRY_DELAY = 60.0  # seconds before retrying a timer whose row couldn't be claimed
+
+
+class TimedAction(NamedTuple):
+    due_at: datetime.datetime
+    id: int
+    guild_id: int
+    action: str
+    target_id: int | None
+
+
+class TimerScheduler:
+    """
+    Restart-safe scheduler for delayed actions (unbans, lockdown restores,
+    timed role removals) backed by the `timed_actions` table.
+
+    Once the bot is ready, pending rows of this process's guilds are loaded
+    into a min-heap and one loop sleeps until the earliest is due, waking
+    early whenever something sooner is added. Rows of guilds this process
+    does not hold are left alone for the process that does. When an action
+    is due its row is deleted and `on_<action>_timer_complete` is dispatched
+    with the guild id, target id and stored data, so the cog that scheduled
+    it carries it out. A timer whose row could not be claimed is retried
+    after RETRY_DELAY.
+    """
+
+    def __init__(self, bot: PizzaHat):
+        self.bot = bot
+        self._heap: list[TimedAction] = []
+        # id -> timer; heap entries missing here were cancelled and are skipped
+        self._timers: dict[int, TimedAction] = {}
+        # (guild, action, target) and (guild, action) -> pending timers
+        self._keys: Counter[tuple] = Counter()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.bot.db is not None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def has_pending(
+        self, guild_id: int, action: str, target_id: int | None = None
+    ) -> bool:
+        if target_id is None:
+            return self._keys[(guild_id, action)] > 0
+        return self._keys[(guild_id, action, target_id)] > 0
+
+    def _push(self, timer: TimedAction) -> None:
+        if timer.id in self._timers:
+            self._forget(timer.id)
+        self._timers[timer.id] = timer
+        self._keys[(timer.guild_id, timer.action)] += 1
+        self._keys[(timer.guild_id, timer.action, timer.target_id)] += 1
+        heapq.heappush(self._heap, timer)
+        if self._heap[0] is timer:
+            self._wakeup.set()
+
+    def _forget(self, timer_id: int) -> None:
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return
+        for key in (
+            (timer.guild_id, timer.action),
+            (timer.guild_id, timer.action, timer.target_id),
+        ):
+            self._keys[key] -= 1
+            if self._keys[key] <= 0:
+                del self._keys[key]
+
+    async def schedule(
+        self,
+        guild_id: int,
+        action: str,
+        due_at: datetime.datetime,
+        *,
+        target_id: int | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> int | None:
+        """Persist a timed action and return its id."""
+
+        if not self.bot.db:
+            return None
+
+        action_id: int = await self.bot.db.fetchval(
+            "INSERT INTO timed_actions (guild_id, action, target_id, data, due_at) "
+            "VALUES ($1,$2,$3,$4,$5) RETURNING id",
+            guild_id,
+            action,
+            target_id,
+            json.dumps(data or {}),
+            due_at,
+        )
+
+        self._push(TimedAction(due_at, action_id, guild_id, action, target_id))
+        return action_id
+
+    async def cancel(
+        self, guild_id: int, action: str, target_id: int | None = None
+    ) -> None:
+        """Drop pending actions for a guild, optionally only for one target."""
+
+        if not self.bot.db:
+            return
+
+        await self.bot.db.execute(
+            "DELETE FROM timed_actions WHERE guild_id=$1 AND action=$2 "
+            "AND ($3::BIGINT IS NULL OR target_id=$3)",
+            guild_id,
+            action,
+            target_id,
+        )
+        if not self.has_pending(guild_id, action, target_id):
+            return
+        for t in list(self._timers.values()):
+            if (
+                t.guild_id == guild_id
+                and t.action == action
+                and (target_id is None or t.target_id == target_id)
+            ):
+                self._forget(t.id)
+
+    async def _load(self) -> None:
+        rows = await self.bot.db.fetch(  # type: ignore
+            "SELECT id, guild_id, action, target_id, due_at FROM timed_actions"
+        )
+        for r in rows:
+            if self.bot.get_guild(r["guild_id"]) is not None:
+                self._push(
+                    TimedAction(
+                        r["due_at"], r["id"], r["guild_id"], r["action"], r["target_id"]
+                    )
+                )
+
+    async def _run(self) -> None:
+        # Only guilds in the cache are ours, and anything that came due while
+        # we were offline fires right away.
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self._load()
+                break
+            except Exception as e:
+                logger.warning(f"Loading timed actions failed: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+        while True:
+            while self._heap and self._timers.get(self._heap[0].id) is not (
+                self._heap[0]
+            ):
+                heapq.heappop(self._heap)  # cancelled or rescheduled
+
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            now = datetime.datetime.now(datetime.timezone.utc)
+            delay = (self._heap[0].due_at - now).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            timer = heapq.heappop(self._heap)
+            self._forget(timer.id)
+            try:
+                await self._fire(timer)
+            except Exception as e:
+                # The row is only deleted on success, so it is still there
+                logger.warning(f"Timed action {timer.id} ({timer.action}) failed: {e}")
+                self._push(
+                    timer._replace(
+                        due_at=now + datetime.timedelta(seconds=RETRY_DELAY)
+                    )
+                )
+
+    async def _fire(self, timer: TimedAction) -> None:
+        if self.bot.get_guild(timer.guild_id) is None:
+            return  # left the guild, or it moved to another process
+
+        row = await self.bot.db.fetchrow(  # type: ignore
+            "DELETE FROM timed_actions WHERE id=$1 RETURNING data", timer.id
+        )
+        if row is None:
+            return  # cancelled
+
+        data = row["data"]
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        self.bot.dispatch(
+            f"{timer.action}_timer_complete",
+            timer.guild_id,
+            timer.target_id,
+            data or {},
+        )
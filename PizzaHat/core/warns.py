@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Hashable, Union
+
+import asyncpg
+
+from core.database import prepared_fetchval
+from utils.config import WARN_CACHE_SIZE
+
+logger = logging.getLogger("bot")
+
+FLUSH_INTERVAL = 5.0  # seconds between background flushes
+FLUSH_BATCH = 50  # flush early once this many warns are buffered
+MAX_PENDING = 5000  # buffered warns kept while the DB is unreachable
+
+# Failures worth retrying the batch for; any other PostgresError means the
+# DB rejected a row, which retrying would never fix.
+_TRANSIENT = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InsufficientResourcesError,
+    asyncpg.OperatorInterventionError,
+)
+
+_INSERT = (
+    "INSERT INTO warnlogs (guild_id, user_id, mod_id, reason, created_at) "
+    "VALUES ($1,$2,$3,$4,$5)"
+)
+
+# (guild_id, user_id, mod_id, reason, created_at)
+PendingWarn = tuple[int, int, int, str, datetime.datetime]
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class WarnLedger:
+    """
+    In-memory warn counts per (guild, user) with write-behind inserts.
+
+    Counts are seeded lazily from `warnlogs` the first time a member is seen and
+    then kept up to date in memory. AutoMod warns are buffered and written with
+    one `executemany` per batch; anything that reads or deletes warn rows must
+    call `flush()` first and `forget()` the member afterwards.
+
+    Guilds with warn decay additionally get a rolling window per member: the
+    timestamps of the warns still inside the window, seeded with one indexed
+    range query and then pruned from the front as they age out.
+
+    Both are LRUs of at most `maxsize` members; an evicted member re-seeds on
+    next use like one that was never seen. Times are aware UTC throughout.
+    """
+
+    def __init__(
+        self, pool: Union[asyncpg.pool.Pool, None], maxsize: int = WARN_CACHE_SIZE
+    ):
+        self.pool = pool
+        self.maxsize = maxsize
+        self._counts: OrderedDict[tuple[int, int], int] = OrderedDict()
+        # (guild, user) -> (decay days, created_at of warns inside the window)
+        self._windows: OrderedDict[tuple[int, int], tuple[int, deque]] = OrderedDict()
+        self._pending: list[PendingWarn] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.pool is not None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _remember(self, entries: OrderedDict, key: Hashable, value: Any) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    async def count(
+        self, guild_id: int, user_id: int, *, decay_days: int | None = None
+    ) -> int:
+        """
+        Current warn count for a member, seeding it from the DB on first use.
+        With `decay_days`, only warns newer than that many days are counted.
+        """
+
+        if decay_days:
+            return await self._window_count(guild_id, user_id, decay_days)
+
+        key = (guild_id, user_id)
+        if key in self._counts:
+            self._counts.move_to_end(key)
+            return self._counts[key]
+
+        if self.pool is None:
+            return 0
+
+        # Seeding under the flush lock means a batch is never half in the DB
+        # and half in the buffer while we count.
+        async with self._lock:
+            if key in self._counts:
+                return self._counts[key]
+
+            stored: int = (
+                await prepared_fetchval(self.pool, "warn_count", user_id, guild_id)
+                or 0
+            )
+            buffered = sum(
+                1 for w in self._pending if w[0] == guild_id and w[1] == user_id
+            )
+            self._remember(self._counts, key, stored + buffered)
+            return stored + buffered
+
+    async def _window_count(self, guild_id: int, user_id: int, decay_days: int) -> int:
+        key = (guild_id, user_id)
+        cutoff = _now() - datetime.timedelta(days=decay_days)
+
+        entry = self._windows.get(key)
+        if entry is None or entry[0] != decay_days:
+            if self.pool is None:
+                return 0
+
+            async with self._lock:
+                # Range scan on warnlogs_created_at_idx (guild_id, user_id, created_at DESC)
+                rows = await self.pool.fetch(
+                    "SELECT created_at FROM warnlogs "
+                    "WHERE guild_id=$1 AND user_id=$2 AND created_at > $3 "
+                    "ORDER BY created_at",
+                    guild_id,
+                    user_id,
+                    cutoff,
+                )
+                stamps = [r["created_at"] for r in rows] + [
+                    w[4] for w in self._pending if w[0] == guild_id and w[1] == user_id
+                ]
+                entry = (decay_days, deque(sorted(stamps)))
+                self._remember(self._windows, key, entry)
+        else:
+            self._windows.move_to_end(key)
+
+        window = entry[1]
+        while window and window[0] <= cutoff:
+            window.popleft()
+        return len(window)
+
+    async def add(
+        self,
+        guild_id: int,
+        user_id: int,
+        mod_id: int,
+        reason: str,
+        *,
+        buffered: bool = True,
+    ) -> int:
+        """
+        Record a warn and return the member's new count.
+
+        Buffered warns reach the DB on the next flush; pass `buffered=False`
+        when the row has to exist as soon as this returns (manual warns).
+        """
+
+        if self.pool is None:
+            return 0
+
+        created_at = _now()
+        key = (guild_id, user_id)
+
+        if not buffered:
+            await self.pool.execute(
+                _INSERT, guild_id, user_id, mod_id, reason, created_at
+            )
+            if key in self._counts:
+                self._counts[key] += 1
+            if key in self._windows:
+                self._windows[key][1].append(created_at)
+            return await self.count(guild_id, user_id)
+
+        count = await self.count(guild_id, user_id)
+        self._pending.append((guild_id, user_id, mod_id, reason, created_at))
+        self._remember(self._counts, key, count + 1)
+        if key in self._windows:
+            self._windows[key][1].append(created_at)
+
+        if len(self._pending) >= FLUSH_BATCH:
+            self._wakeup.set()
+        return count + 1
+
+    def forget(self, guild_id: int, user_id: int | None = None) -> None:
+        """Drop cached counts after warn rows were deleted; they re-seed on next use."""
+
+        if user_id is not None:
+            self._counts.pop((guild_id, user_id), None)
+            self._windows.pop((guild_id, user_id), None)
+            return
+
+        for key in [k for k in self._counts if k[0] == guild_id]:
+            del self._counts[key]
+        for key in [k for k in self._windows if k[0] == guild_id]:
+            del self._windows[key]
+
+    def _trim(self) -> None:
+        # Only under the flush lock: flush() deletes its batch by position
+        overflow = len(self._pending) - MAX_PENDING
+        if overflow > 0:
+            del self._pending[:overflow]
+            logger.warning(f"Warn buffer full; dropped the {overflow} oldest warn(s)")
+
+    async def flush(self) -> int:
+        """
+        Write every buffered warn in one batch. Returns the number written.
+
+        The batch stays buffered while the DB is unreachable (up to
+        MAX_PENDING warns). If the DB rejects it, the warns are inserted one
+        by one and those it still rejects are logged and dropped, so one bad
+        row never blocks the rest.
+        """
+
+        if self.pool is None or not self._pending:
+            return 0
+
+        async with self._lock:
+            batch = self._pending[:]
+            if not batch:
+                return 0
+
+            try:
+                await self.pool.executemany(_INSERT, batch)
+            except _TRANSIENT as e:
+                logger.warning(f"Failed to flush {len(batch)} warn(s): {e}")
+                self._trim()
+                return 0
+            except asyncpg.PostgresError as e:
+                logger.warning(f"Warn batch rejected, inserting one by one: {e}")
+                return await self._flush_each(batch)
+
+            del self._pending[: len(batch)]
+            return len(batch)
+
+    async def _flush_each(self, batch: list[PendingWarn]) -> int:
+        written = done = 0
+        try:
+            for warn in batch:
+                try:
+                    await self.pool.execute(_INSERT, *warn)  # type: ignore
+                    written += 1
+                except _TRANSIENT:
+                    raise
+                except asyncpg.PostgresError as e:
+                    logger.warning(
+                        f"Dropping warn for user {warn[1]} in guild {warn[0]}: {e}"
+                    )
+                done += 1
+        except _TRANSIENT as e:
+            logger.warning(f"Failed to flush {len(batch) - done} warn(s): {e}")
+        del self._pending[:done]
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
@@ -0,0 +1,170 @@
+"""
+Check that the bot's queries stay on indexes once tables are large.
+
+Builds the schema from core/migrations.py in a throwaway Postgres schema,
+seeds the busy tables with SEED_ROWS rows, collects every parameterised
+SELECT/UPDATE/DELETE string literal in the bot and EXPLAINs its generic plan.
+Any sequential scan over a seeded table fails the test, so it gates a
+migration or a new query.
+
+Seeding, ANALYZE and the EXPLAINs run in one transaction that is rolled
+back, so the config triggers' NOTIFYs never reach running bots.
+
+Needs Postgres 16+ (EXPLAIN GENERIC_PLAN) and QUERY_PLANS_URL pointing at a
+scratch database; skipped without it. Run from the PizzaHat directory:
+    QUERY_PLANS_URL=postgres://... python -m pytest tests/test_query_plans.py
+"""
+
+import ast
+import asyncio
+import json
+import os
+import pathlib
+import re
+
+import pytest
+
+DSN = os.getenv("QUERY_PLANS_URL")
+if not DSN:
+    pytest.skip("QUERY_PLANS_URL is not set", allow_module_level=True)
+
+import asyncpg  # noqa: E402
+
+from core.database import _ssl_context  # noqa: E402
+from core.migrations import migrate  # noqa: E402
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+SCHEMA = "query_plans_check"
+SEED_ROWS = 200_000
+GUILDS = 2_000
+SOURCE_DIRS = ("cogs", "cogs_hidden", "core", "utils")
+
+# Every row spread over GUILDS guilds, so `guild_id=$1` is selective
+SEED = {
+    "embed_templates": """INSERT INTO embed_templates (guild_id, name, data, created_by)
+        SELECT i % {guilds}, 'tpl' || i, '{{}}', i FROM generate_series(1, {rows}) i""",
+    "warnlogs": """INSERT INTO warnlogs (guild_id, user_id, mod_id, reason, created_at)
+        SELECT i % {guilds}, i % 50000, i % 500, 'seed', NOW() - i * INTERVAL '1 minute'
+        FROM generate_series(1, {rows}) i""",
+    "afk": """INSERT INTO afk (guild_id, user_id, reason)
+        SELECT i % {guilds}, i, 'seed' FROM generate_series(1, {rows}) i""",
+    "tags": """INSERT INTO tags (guild_id, tag_name, content, creator)
+        SELECT i % {guilds}, 'tag' || i, 'seed', i FROM generate_series(1, {rows}) i""",
+    "star_info": """INSERT INTO star_info (guild_id, user_msg_id, bot_msg_id)
+        SELECT i % {guilds}, i, i + {rows} FROM generate_series(1, {rows}) i""",
+    "ticket_panels": """INSERT INTO ticket_panels (guild_id, channel_id, message_id, name)
+        SELECT i % {guilds}, i, i, 'panel' || i FROM generate_series(1, {rows}) i""",
+    "ticket_logs": """INSERT INTO ticket_logs (guild_id, thread_id, creator_id, closed_at, closed_by)
+        SELECT i % {guilds}, i, i, CASE WHEN i % 3 > 0 THEN NOW() END, i % 500
+        FROM generate_series(1, {rows}) i""",
+    "auto_responders": """INSERT INTO auto_responders (guild_id, trigger_text, response, created_by)
+        SELECT i % {guilds}, 'hi' || i, 'hello', i FROM generate_series(1, {rows}) i""",
+    "scheduled_messages": """INSERT INTO scheduled_messages (guild_id, channel_id, message, next_run, enabled, created_by)
+        SELECT i % {guilds}, i, 'seed', NOW() + i * INTERVAL '1 minute', i % 10 = 0, i
+        FROM generate_series(1, {rows}) i""",
+    "event_actions": """INSERT INTO event_actions (guild_id, name, event_type, created_by)
+        SELECT i % {guilds}, 'ev' || i, 'member_join', i FROM generate_series(1, {rows}) i""",
+    "role_menus": """INSERT INTO role_menus (guild_id, channel_id, message_id, name, enabled)
+        SELECT i % {guilds}, i, CASE WHEN i % 20 = 0 THEN i END, 'menu' || i, i % 20 = 0
+        FROM generate_series(1, {rows}) i""",
+    "role_menu_items": """INSERT INTO role_menu_items (menu_id, role_id, label)
+        SELECT id, id, 'item' FROM role_menus""",
+    "timed_actions": """INSERT INTO timed_actions (guild_id, action, target_id, due_at)
+        SELECT i % {guilds}, 'unban', i, NOW() + i * INTERVAL '1 minute'
+        FROM generate_series(1, {rows}) i""",
+}
+
+# Queries that read a whole table on purpose (start-up loads, dev stats)
+ALLOWED = {
+    "SELECT * FROM role_menus WHERE enabled=TRUE AND message_id IS NOT NULL",
+}
+
+_STATEMENT = re.compile(r"^(SELECT|UPDATE|DELETE)\b.*\bWHERE\b.*\$\d", re.I | re.S)
+
+
+def collect_queries() -> dict[str, str]:
+    """Map each SQL literal to the first file:line that uses it."""
+
+    found: dict[str, str] = {}
+    for directory in SOURCE_DIRS:
+        for path in sorted((ROOT / directory).rglob("*.py")):
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+            for node in ast.walk(tree):
+                # f-strings are JoinedStr, so only complete literals get here
+                if not isinstance(node, ast.Constant) or not isinstance(
+                    node.value, str
+                ):
+                    continue
+                sql = " ".join(node.value.split())
+                if _STATEMENT.match(sql):
+                    found.setdefault(
+                        sql, f"{path.relative_to(ROOT)}:{node.lineno}"
+                    )
+    return found
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        scans.extend(_seq_scans(child))
+    return scans
+
+
+async def _check(conn: asyncpg.Connection) -> tuple[list[str], list[str]]:
+    for insert in SEED.values():
+        await conn.execute(insert.format(rows=SEED_ROWS, guilds=GUILDS))
+    await conn.execute(f"ANALYZE {', '.join(SEED)}")
+
+    scans: list[str] = []
+    errors: list[str] = []
+    for sql, where in collect_queries().items():
+        try:
+            # Savepoint, so one bad statement doesn't abort the transaction
+            async with conn.transaction():
+                out = await conn.fetchval(f"EXPLAIN (GENERIC_PLAN, FORMAT JSON) {sql}")
+        except asyncpg.PostgresError as e:
+            errors.append(f"{where}: {type(e).__name__}: {e}")
+            continue
+
+        plan = json.loads(out)[0]["Plan"]
+        tables = [t for t in _seq_scans(plan) if t in SEED]
+        if tables and sql not in ALLOWED:
+            scans.append(f"{where}: {', '.join(tables)}\n    {sql}")
+    return scans, errors
+
+
+async def _run() -> tuple[list[str], list[str]]:
+    admin = await asyncpg.connect(DSN, ssl=_ssl_context())
+    await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await admin.execute(f"CREATE SCHEMA {SCHEMA}")
+
+    pool = await asyncpg.create_pool(
+        DSN,
+        ssl=_ssl_context(),
+        min_size=1,
+        max_size=1,
+        server_settings={"search_path": SCHEMA},
+    )
+    try:
+        await migrate(pool)  # type: ignore[arg-type]
+        async with pool.acquire() as conn:
+            # Never committed: NOTIFY is only delivered on commit
+            tr = conn.transaction()
+            await tr.start()
+            try:
+                return await _check(conn)
+            finally:
+                await tr.rollback()
+    finally:
+        await pool.close()
+        await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await admin.close()
+
+
+def test_queries_use_indexes():
+    scans, errors = asyncio.run(_run())
+    for error in errors:
+        print(f"SKIP  {error}")
+    assert not scans, f"{len(scans)} sequential scan(s):\n" + "\n".join(scans)
@@ -0,0 +1,725 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Callable, Hashable, Iterable, Iterator, Union
+
+import emojis
+import regex
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # Python 3.10
+    import sre_parse  # type: ignore[no-redef]
+
+SCAM_PATTERNS = re.compile(
+    r"(discord[\-\.]gift|nitro[\-\.]free|free[\-\.]nitro|"
+    r"discord[\-\.]com[\-\.]gift|steamcommunity\.ru|"
+    r"discordapp\.io|discord[\-\.]giveaway)",
+    re.IGNORECASE,
+)
+INVITE_REGEX = re.compile(
+    r"((http(s|):\/\/|)(discord)(\.(gg|io|me)\/|app\.com\/invite\/)([0-z]+))"
+)
+# U+0300..U+033F are exactly the code points whose UTF-8 lead byte is 0xCC,
+# i.e. what searching the URL-quoted message for "%CC%" used to find.
+ZALGO_REGEX = re.compile(r"[\u0300-\u033F]")
+CUSTOM_EMOJI_REGEX = re.compile(r"<a?:[^:]+:\d+>")
+
+# Evaluation order of the message modules — first match wins.
+MESSAGE_MODULES = (
+    "banned_words",
+    "scam_links",
+    "all_caps",
+    "message_spam",
+    "invites",
+    "mass_mentions",
+    "emoji_spam",
+    "zalgo_text",
+    "newline_spam",
+    "repeated_chars",
+    "custom_regex",
+)
+
+# Modules that depend on more than the message text (rate state, mentions,
+# invite lookups) and are always handed back to the listener.
+DEFERRED_MODULES = frozenset({"message_spam", "invites", "mass_mentions"})
+
+IMPERSONATION_SIMILARITY = 0.85
+
+MAX_CUSTOM_PATTERNS = 25
+MAX_CUSTOM_PATTERN_LENGTH = 200
+# Seconds one guild-supplied regex may run on one message before it counts
+# as no match.
+CUSTOM_PATTERN_TIMEOUT = 0.05
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_plan_versions = itertools.count(1)
+
+_REPEATS = {
+    sre_parse.MAX_REPEAT,
+    sre_parse.MIN_REPEAT,
+    getattr(sre_parse, "POSSESSIVE_REPEAT", sre_parse.MAX_REPEAT),
+}
+
+
+class GuardedPattern:
+    """
+    A guild-supplied regex, run by the `regex` module with a timeout.
+
+    Stdlib `re` cannot be interrupted, so one catastrophic pattern would stall
+    the event loop (or an AutoMod worker) for every guild. Here a search that
+    runs past CUSTOM_PATTERN_TIMEOUT is abandoned and treated as no match.
+    """
+
+    __slots__ = ("pattern", "_compiled")
+
+    def __init__(self, source: str, flags: int = 0):
+        self.pattern = source
+        self._compiled = regex.compile(source, flags | regex.V0)
+
+    def __reduce__(self):
+        return (GuardedPattern, (self.pattern, self._compiled.flags & ~regex.V0))
+
+    def search(self, text: str) -> regex.Match | None:
+        try:
+            return self._compiled.search(text, timeout=CUSTOM_PATTERN_TIMEOUT)
+        except TimeoutError:
+            return None
+
+
+Pattern = Union[re.Pattern, GuardedPattern]
+
+# (module, cache key, source, flags, *, guarded) -> compiled pattern
+PatternCompiler = Callable[..., Pattern]
+
+
+def _compile(
+    module: str, key: Hashable, source: str, flags: int = 0, *, guarded: bool = False
+) -> Pattern:
+    return GuardedPattern(source, flags) if guarded else re.compile(source, flags)
+
+
+class PatternCache:
+    """
+    Bounded LRU of compiled AutoMod patterns keyed by (guild, module, key).
+
+    Entries for a guild are dropped with `invalidate(guild_id)` whenever its
+    config changes; the size bound keeps rarely used guilds from piling up.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._patterns: OrderedDict[tuple, Pattern] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def compile(
+        self,
+        guild_id: int,
+        module: str,
+        key: Hashable,
+        source: str,
+        flags: int = 0,
+        *,
+        guarded: bool = False,
+    ) -> Pattern:
+        cache_key = (guild_id, module, key)
+        pattern = self._patterns.get(cache_key)
+        if pattern is not None:
+            self._patterns.move_to_end(cache_key)
+            return pattern
+
+        pattern = _compile(module, key, source, flags, guarded=guarded)
+        self._patterns[cache_key] = pattern
+        if len(self._patterns) > self.maxsize:
+            self._patterns.popitem(last=False)
+        return pattern
+
+    def compiler(self, guild_id: int) -> PatternCompiler:
+        """A compile function bound to one guild, for RulePlan."""
+
+        def _bound(
+            module: str,
+            key: Hashable,
+            source: str,
+            flags: int = 0,
+            *,
+            guarded: bool = False,
+        ):
+            return self.compile(guild_id, module, key, source, flags, guarded=guarded)
+
+        return _bound
+
+    def invalidate(self, guild_id: int | None = None) -> None:
+        if guild_id is None:
+            self._patterns.clear()
+            return
+
+        for cache_key in [k for k in self._patterns if k[0] == guild_id]:
+            del self._patterns[cache_key]
+
+
+def validate_custom_pattern(pattern: str) -> str | None:
+    """Return why a user-supplied AutoMod pattern is rejected, or None if it is fine."""
+
+    if len(pattern) > MAX_CUSTOM_PATTERN_LENGTH:
+        return f"Patterns can be at most {MAX_CUSTOM_PATTERN_LENGTH} characters long."
+    if _BACKREFERENCE.search(pattern):
+        return "Backreferences are not supported."
+    try:
+        parsed = sre_parse.parse(pattern)
+        regex.compile(pattern, regex.V0)
+    except (re.error, regex.error) as e:
+        return f"Invalid regex: {e}"
+    return _backtracking_risk(list(parsed))
+
+
+def _subpatterns(op, av) -> Iterator[list]:
+    if op in _REPEATS:
+        yield list(av[2])
+    elif op is sre_parse.SUBPATTERN:
+        yield list(av[-1])
+    elif op is sre_parse.BRANCH:
+        yield from (list(branch) for branch in av[1])
+    elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        yield list(av[1])
+    elif op is sre_parse.GROUPREF_EXISTS:
+        yield from (list(p) for p in av[1:] if p is not None)
+    elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+        yield list(av)
+
+
+def _first_chars(items: list) -> frozenset[int] | None:
+    """Characters a branch can start with, or None when that is not simple."""
+
+    if not items:
+        return None
+    op, av = items[0]
+    if op is sre_parse.LITERAL:
+        return frozenset((av,))
+    if op is sre_parse.IN:
+        chars: set[int] = set()
+        for item_op, item_av in av:
+            if item_op is sre_parse.LITERAL:
+                chars.add(item_av)
+            elif item_op is sre_parse.RANGE and item_av[1] - item_av[0] < 256:
+                chars.update(range(item_av[0], item_av[1] + 1))
+            else:
+                return None
+        return frozenset(chars)
+    if op is sre_parse.SUBPATTERN:
+        return _first_chars(list(av[-1]))
+    return None
+
+
+def _backtracking_risk(items: list, outer: int | None = None) -> str | None:
+    """
+    Why a parsed pattern could backtrack exponentially, or None.
+
+    Rejects the classic shapes: a quantifier inside another quantifier where
+    either is unbounded, like `(a+)+`, and alternatives under an unbounded
+    quantifier that can start with the same character, like `(a|ab)*`.
+    Anything subtler is left to the runtime timeout of GuardedPattern.
+    `outer` is the largest repeat count of the enclosing quantifiers.
+    """
+
+    for op, av in items:
+        if op in _REPEATS and av[1] > 1:
+            if outer is not None and sre_parse.MAXREPEAT in (outer, av[1]):
+                return "Nested quantifiers like `(a+)+` are not allowed."
+            reason = _backtracking_risk(list(av[2]), max(outer or 0, av[1]))
+            if reason:
+                return reason
+            continue
+
+        if op is sre_parse.BRANCH and outer == sre_parse.MAXREPEAT:
+            seen: set[int] = set()
+            for branch in av[1]:
+                chars = _first_chars(list(branch))
+                if chars is None or seen & chars:
+                    return (
+                        "Repeated alternatives must start with different "
+                        "characters (try a character class like `[ab]+`)."
+                    )
+                seen |= chars
+
+        for sub in _subpatterns(op, av):
+            if reason := _backtracking_risk(sub, outer):
+                return reason
+    return None
+
+
+def _trie_pattern(node: dict) -> str:
+    # A word ends here, so any continuation is already a match: prune it.
+    if "" in node:
+        return ""
+
+    singles: list[str] = []
+    branches: list[str] = []
+    for ch in sorted(node):
+        tail = _trie_pattern(node[ch])
+        if tail:
+            branches.append(re.escape(ch) + tail)
+        else:
+            singles.append(re.escape(ch))
+
+    if singles:
+        branches.append(singles[0] if len(singles) == 1 else f"[{''.join(singles)}]")
+
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+
+class WordMatcher:
+    """
+    Substring matcher for a banned word list, compiled into one regex.
+
+    Words are folded into a prefix trie first, so the regex engine walks the
+    shared prefixes once per position instead of trying every word in turn.
+    `find_all` reports which words occur: the same pattern as a lookahead
+    finds every position where some word starts, and only those positions
+    are walked in the trie.
+    """
+
+    __slots__ = ("words", "_trie", "_pattern", "_starts")
+
+    def __init__(self, words: Iterable[str]):
+        self.words: frozenset[str] = frozenset(w.lower() for w in words if w)
+
+        trie: dict = {}
+        for word in self.words:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+        self._trie = trie
+        self._pattern: re.Pattern | None = (
+            re.compile(_trie_pattern(trie)) if trie else None
+        )
+        self._starts: re.Pattern | None = None
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def extend(self, extra: Iterable[str]) -> WordMatcher:
+        """Return a matcher for this list plus *extra* words (e.g. per-guild)."""
+
+        extra = {w.lower() for w in extra if w} - self.words
+        return WordMatcher(self.words | extra) if extra else self
+
+    def search(self, text: str) -> bool:
+        """Whether any word occurs in *text*, which must already be lowercase."""
+
+        return self._pattern is not None and self._pattern.search(text) is not None
+
+    def find_all(self, text: str) -> set[str]:
+        """Every word occurring in *text*, which must already be lowercase."""
+
+        if self._pattern is None:
+            return set()
+        if self._starts is None:
+            self._starts = re.compile(f"(?={self._pattern.pattern})")
+
+        found: set[str] = set()
+        for m in self._starts.finditer(text):
+            found.update(self.prefixes_at(text, m.start()))
+        return found
+
+    def prefixes_at(self, text: str, start: int = 0) -> list[str]:
+        """Words that *text* contains starting exactly at *start*."""
+
+        found: list[str] = []
+        node = self._trie
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if "" in node:
+                found.append(text[start : i + 1])
+        return found
+
+
+def module_enabled(val) -> bool:
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, dict):
+        return bool(val.get("enabled", False))
+    return False
+
+
+def module_config(cfg: dict, module: str) -> dict:
+    val = cfg.get(module, {})
+    return val if isinstance(val, dict) else {}
+
+
+class RulePlan:
+    """
+    AutoMod checks for one guild/channel, compiled once from the JSONB config.
+
+    Thresholds and patterns are resolved up front so that scanning a message
+    only touches the checks that are actually enabled, sharing the derived
+    values (lowercase text, ASCII-ness) between them.
+    """
+
+    __slots__ = (
+        "version",
+        "modules",
+        "settings",
+        "words",
+        "_caps_threshold",
+        "_caps_min_length",
+        "_emoji_threshold",
+        "_newline_threshold",
+        "_repeated_pattern",
+        "_custom_pattern",
+    )
+
+    def __init__(
+        self,
+        cfg: dict,
+        ch_override: dict | None = None,
+        *,
+        words: WordMatcher | None = None,
+        compiler: PatternCompiler = _compile,
+    ):
+        ch_override = ch_override or {}
+        # Unique per compiled plan; worker processes cache plans by it
+        self.version = next(_plan_versions)
+
+        def _active(module: str) -> bool:
+            """Channel override wins; fall back to global cfg."""
+            if module in ch_override:
+                return module_enabled(ch_override[module])
+            return module_enabled(cfg.get(module, {}))
+
+        self.modules: tuple[str, ...] = tuple(m for m in MESSAGE_MODULES if _active(m))
+        self.settings: dict[str, dict] = {
+            m: module_config(cfg, m) for m in self.modules
+        }
+
+        self.words = words or WordMatcher(())
+
+        caps = self.settings.get("all_caps", {})
+        self._caps_threshold = caps.get("threshold", 70)
+        self._caps_min_length = caps.get("min_length", 8)
+        self._emoji_threshold = self.settings.get("emoji_spam", {}).get("threshold", 10)
+        self._newline_threshold = self.settings.get("newline_spam", {}).get(
+            "threshold", 10
+        )
+
+        self._repeated_pattern: re.Pattern | None = None
+        if "repeated_chars" in self.settings:
+            threshold = self.settings["repeated_chars"].get("threshold", 15)
+            self._repeated_pattern = compiler(
+                "repeated_chars",
+                threshold,
+                r"(.)\1{" + str(threshold - 1) + r",}",
+                re.UNICODE,
+            )
+
+        # All of a guild's own patterns are OR-ed into one regex and scanned together.
+        self._custom_pattern: GuardedPattern | None = None
+        # Patterns saved before a validation rule existed are skipped, not run.
+        custom = tuple(
+            p
+            for p in self.settings.get("custom_regex", {}).get("patterns", [])
+            if validate_custom_pattern(p) is None
+        )
+        if custom:
+            try:
+                self._custom_pattern = compiler(
+                    "custom_regex",
+                    custom,
+                    "|".join(f"(?:{p})" for p in custom),
+                    re.IGNORECASE,
+                    guarded=True,
+                )
+            except (re.error, regex.error):
+                pass
+
+    def __bool__(self) -> bool:
+        return bool(self.modules)
+
+    def scan(self, content: str) -> Iterator[str]:
+        """
+        Yield, in evaluation order, every module the listener has to act on.
+
+        Pure content checks are only yielded when they fire; deferred modules
+        are yielded whenever they could fire and are decided by their handler.
+        The generator is lazy, so nothing past the first real hit is computed.
+        """
+
+        is_ascii = content.isascii()
+        lowered: str | None = None
+
+        for module in self.modules:
+            if module == "banned_words":
+                lowered = content.lower()
+                if self.words.search(lowered):
+                    yield module
+
+            elif module == "scam_links":
+                if SCAM_PATTERNS.search(content):
+                    yield module
+
+            elif module == "all_caps":
+                if self._is_caps(content, lowered):
+                    yield module
+
+            elif module == "invites":
+                if "discord" in content and INVITE_REGEX.search(content):
+                    yield module
+
+            elif module in DEFERRED_MODULES:
+                yield module
+
+            elif module == "emoji_spam":
+                count = 0 if is_ascii else emojis.count(content)
+                if "<" in content:
+                    count += len(CUSTOM_EMOJI_REGEX.findall(content))
+                if count > self._emoji_threshold:
+                    yield module
+
+            elif module == "zalgo_text":
+                if not is_ascii and ZALGO_REGEX.search(content):
+                    yield module
+
+            elif module == "newline_spam":
+                if content.count("\n") >= self._newline_threshold:
+                    yield module
+
+            elif module == "repeated_chars":
+                if self._repeated_pattern and self._repeated_pattern.search(content):
+                    yield module
+
+            elif module == "custom_regex":
+                if self._custom_pattern and self._custom_pattern.search(content):
+                    yield module
+
+    def analyze(self, content: str) -> list[str]:
+        """
+        Eager `scan()` for running in a worker: stops at the first pure content
+        hit, since the listener never looks past it.
+        """
+
+        hits: list[str] = []
+        for module in self.scan(content):
+            hits.append(module)
+            if module not in DEFERRED_MODULES:
+                break
+        return hits
+
+    def _is_caps(self, content: str, lowered: str | None) -> bool:
+        if len(content) < self._caps_min_length:
+            return False
+
+        # No uppercase at all is by far the common case and costs one C-level compare.
+        if (lowered if lowered is not None else content.lower()) == content:
+            return self._caps_threshold <= 0 and any(map(str.isalpha, content))
+
+        alpha = sum(map(str.isalpha, content))
+        if not alpha:
+            return False
+
+        upper = sum(map(str.isupper, content))
+        return (upper / alpha) * 100 >= self._caps_threshold
+
+
+class StaffNameIndex:
+    """
+    Lowercase display names of a guild's staff, bucketed by length.
+
+    `SequenceMatcher.ratio()` is 2*M / (len(a) + len(b)) with M <= the shorter
+    length, so names whose lengths are too far apart can never reach the
+    similarity threshold and are not even looked at.
+    """
+
+    __slots__ = ("_names", "_by_length")
+
+    def __init__(self) -> None:
+        self._names: dict[int, str] = {}
+        self._by_length: dict[int, dict[int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def set(self, member_id: int, name: str) -> None:
+        self.discard(member_id)
+        self._names[member_id] = name
+        self._by_length.setdefault(len(name), {})[member_id] = name
+
+    def discard(self, member_id: int) -> None:
+        name = self._names.pop(member_id, None)
+        if name is None:
+            return
+        bucket = self._by_length[len(name)]
+        del bucket[member_id]
+        if not bucket:
+            del self._by_length[len(name)]
+
+    def candidates(
+        self, name: str, threshold: float = IMPERSONATION_SIMILARITY
+    ) -> list[tuple[int, str]]:
+        """Staff names whose length still allows a ratio of at least `threshold`."""
+
+        size = len(name)
+        low = size * threshold / (2 - threshold)
+        high = size * (2 - threshold) / threshold
+        return [
+            item
+            for length, bucket in self._by_length.items()
+            if low <= length <= high
+            for item in bucket.items()
+        ]
+
+
+def best_staff_match(
+    name: str,
+    candidates: list[tuple[int, str]],
+    threshold: float = IMPERSONATION_SIMILARITY,
+) -> tuple[int, float] | None:
+    """First (member_id, similarity) at or above `threshold`, cheapest bounds first."""
+
+    matcher = SequenceMatcher(None)
+    # SequenceMatcher caches its analysis of seq2, so keep the joiner's name there.
+    matcher.set_seq2(name)
+    for member_id, other in candidates:
+        matcher.set_seq1(other)
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+            continue
+        similarity = matcher.ratio()
+        if similarity >= threshold:
+            return member_id, similarity
+    return None
+
+
+# Plans a worker process keeps, most recently used last
+WORKER_PLANS = 512
+_worker_plans: OrderedDict[int, RulePlan] = OrderedDict()
+
+
+def _analyze_in_worker(
+    version: int, plan: RulePlan | None, content: str
+) -> list[str] | None:
+    """
+    Process pool entry point. Runs the plan cached under `version` in this
+    worker, storing `plan` there first when given; None if it isn't cached.
+    """
+
+    if plan is None:
+        plan = _worker_plans.get(version)
+        if plan is None:
+            return None
+        _worker_plans.move_to_end(version)
+    else:
+        _worker_plans[version] = plan
+        while len(_worker_plans) > WORKER_PLANS:
+            _worker_plans.popitem(last=False)
+    return plan.analyze(content)
+
+
+class AnalysisPool:
+    """
+    Runs `RulePlan.analyze` in a thread or process pool instead of inline.
+
+    At most `queue_size` analyses are queued or running at once; further
+    messages wait for a slot, which throttles the listener instead of letting
+    the backlog grow. Short messages are cheaper to scan inline and never
+    leave the event loop.
+
+    Worker processes keep the plans they were sent, so a call only ships the
+    plan version and the message; the plan itself is pickled again only for
+    a worker that doesn't have it yet (or dropped it).
+    """
+
+    MODES = ("inline", "thread", "process")
+
+    def __init__(
+        self,
+        mode: str,
+        *,
+        workers: int = 2,
+        queue_size: int = 256,
+        min_length: int = 256,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown AutoMod executor mode: {mode!r}")
+
+        self.mode = mode
+        self.min_length = min_length
+        self.queue_size = queue_size
+        self._slots = asyncio.Semaphore(queue_size)
+        self._executor: Executor | None = None
+        if mode == "thread":
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="automod")
+        elif mode == "process":
+            self._executor = ProcessPoolExecutor(workers)
+
+        self.depth = 0
+        self.max_depth = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+        self.plan_sends = 0
+
+    def offloads(self, content: str) -> bool:
+        return self._executor is not None and len(content) >= self.min_length
+
+    async def analyze(self, plan: RulePlan, content: str) -> list[str]:
+        queued_at = time.perf_counter()
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            async with self._slots:
+                started_at = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                if self.mode == "process":
+                    hits = await loop.run_in_executor(
+                        self._executor, _analyze_in_worker, plan.version, None, content
+                    )
+                    if hits is None:
+                        self.plan_sends += 1
+                        hits = await loop.run_in_executor(
+                            self._executor,
+                            _analyze_in_worker,
+                            plan.version,
+                            plan,
+                            content,
+                        )
+                else:
+                    hits = await loop.run_in_executor(
+                        self._executor, plan.analyze, content
+                    )
+        finally:
+            self.depth -= 1
+
+        finished_at = time.perf_counter()
+        self.completed += 1
+        self.total_wait += started_at - queued_at
+        self.last_latency = finished_at - queued_at
+        self.total_latency += self.last_latency
+        return hits
+
+    def stats(self) -> dict[str, float]:
+        done = self.completed or 1
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "completed": self.completed,
+            "avg_wait_ms": self.total_wait / done * 1000,
+            "avg_latency_ms": self.total_latency / done * 1000,
+            "last_latency_ms": self.last_latency * 1000,
+            "plan_sends": self.plan_sends,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
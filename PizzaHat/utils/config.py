@@ -36,6 +36,35 @@ DLISTGG_VOTE = "https://discordlist.gg/bot/860889936914677770/vote"
 WUMPUS_VOTE = "https://wumpus.store/bot/860889936914677770/vote"
 
 
+# AUTOMOD
+# "inline" (default), "thread" or "process": where long messages are analysed
+AUTOMOD_EXECUTOR = os.getenv("AUTOMOD_EXECUTOR", "inline")
+AUTOMOD_WORKERS = int(os.getenv("AUTOMOD_WORKERS", "2"))
+AUTOMOD_QUEUE_SIZE = int(os.getenv("AUTOMOD_QUEUE_SIZE", "256"))
+
+
+# DATABASE
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "10"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+# seconds to wait for a free pool connection before counting it as a failure
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))
+# consecutive failures that open the circuit breaker, and seconds it stays open
+DB_BREAKER_THRESHOLD = int(os.getenv("DB_BREAKER_THRESHOLD", "5"))
+DB_BREAKER_COOLDOWN = float(os.getenv("DB_BREAKER_COOLDOWN", "30"))
+
+
+# CACHES
+# per-table guild config caches (core/cache.py); TTL of 0 keeps entries until invalidated
+CONFIG_CACHE_SIZE = int(os.getenv("CONFIG_CACHE_SIZE", "10000"))
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "3600"))
+# bulk-load every guild's config once the bot is ready instead of on first use
+CACHE_WARMUP = os.getenv("CACHE_WARMUP", "false").lower() == "true"
+# members whose warn count / decay window is kept in memory (core/warns.py)
+WARN_CACHE_SIZE = int(os.getenv("WARN_CACHE_SIZE", "50000"))
+
+
 # OTHERS
 ANTIHOIST_CHARS = "!@#$%^&*()_+-=.,/?;:[]{}`~\"'\\|<>"
 DEFAULT_PREFIX = "p!"
@@ -2,13 +2,17 @@ from discord.ext import commands
 from discord.ext.commands import Context
 
 from core.bot import Tier
+from core.cache import tiers
 
 
 class PremiumCheck(commands.CheckFailure):
     pass
 
 
-_tier_cache = {}
+async def get_guild_tier(pool, guild_id: int) -> Tier:
+    """A guild's premium tier, cached per guild."""
+    tier = await tiers.get(pool, guild_id)
+    return Tier(tier) if tier else Tier.FREE
 
 
 def premium(tier: Tier = Tier.BASIC):
@@ -31,17 +35,7 @@ def premium(tier: Tier = Tier.BASIC):
 
         guild_id = ctx.guild.id
 
-        cached_tier = _tier_cache.get(guild_id)
-        if cached_tier is None:
-            row = await ctx.bot.db.fetchrow(
-                "SELECT tier FROM premium WHERE guild_id=$1", guild_id
-            )
-            if row:
-                cached_tier = Tier(row["tier"])
-                _tier_cache[guild_id] = cached_tier
-            else:
-                cached_tier = Tier.FREE
-                _tier_cache[guild_id] = Tier.FREE
+        cached_tier = await get_guild_tier(ctx.bot.db, guild_id)
 
         if cached_tier >= required_tier:
             return True
@@ -63,24 +57,10 @@ async def is_premium_guild(pool, guild_id: int) -> bool:
     if pool is None:
         return False
 
-    cached_tier = _tier_cache.get(guild_id)
-    if cached_tier is None:
-        row = await pool.fetchrow(
-            "SELECT tier FROM premium WHERE guild_id=$1", guild_id
-        )
-        if row:
-            cached_tier = Tier(row["tier"])
-            _tier_cache[guild_id] = cached_tier
-        else:
-            cached_tier = Tier.FREE
-            _tier_cache[guild_id] = Tier.FREE
-
+    cached_tier = await get_guild_tier(pool, guild_id)
     return cached_tier >= Tier.BASIC
 
 
 def clear_tier_cache(guild_id: int | None = None):
     """Clear the premium tier cache."""
-    if guild_id:
-        _tier_cache.pop(guild_id, None)
-    else:
-        _tier_cache.clear()
+    tiers.invalidate(guild_id or None)
@@ -1,32 +1,20 @@
 import datetime
-from typing import Any, Optional
+import re
+from typing import Any, Mapping, Optional, Union
 
 from discord import Color, Embed
 
-theme_cache: dict[int, int] = {}
+from core.cache import GuildCache, themes
 
 
 async def get_guild_theme(pool, guild_id: int) -> int:
-    if guild_id in theme_cache:
-        return theme_cache[guild_id]
-
-    accent_color = await pool.fetchval(
-        "SELECT accent_color FROM guild_themes WHERE guild_id = $1", guild_id
-    )
-
-    color = accent_color if accent_color else 0x456DD4
-
-    theme_cache[guild_id] = color
-    return color
+    return await themes.get(pool, guild_id) or 0x456DD4
 
 
 def invalidate_theme_cache(guild_id: int | None = None):
     """Invalidate the theme cache for a guild or all guilds."""
 
-    if guild_id:
-        theme_cache.pop(guild_id, None)
-    else:
-        theme_cache.clear()
+    themes.invalidate(guild_id or None)
 
 
 def green_embed(
@@ -162,79 +150,180 @@ async def guild_embed(
     )
 
 
-def embed_from_data(data: dict) -> Embed:
-    """Build a discord.Embed from stored template JSONB data.
+# {user}, {user.mention}, {guild.id}, ...
+_PLACEHOLDER = re.compile(r"\{([\w.]+)\}")
+
+# Text with placeholders, pre-split: literals at even indexes, names at odd ones
+_Text = Union[str, tuple[str, ...], None]
+
+
+def _compile_text(text: Optional[str]) -> _Text:
+    if not text:
+        return text
+    parts = tuple(_PLACEHOLDER.split(text))
+    return parts if len(parts) > 1 else text
+
+
+def _render_text(text: _Text, values: Mapping[str, str]) -> Optional[str]:
+    if not isinstance(text, tuple):
+        return text
+    return "".join(
+        part if i % 2 == 0 else values.get(part, f"{{{part}}}")
+        for i, part in enumerate(text)
+    )
+
+
+def render_placeholders(text: str, values: Mapping[str, str]) -> str:
+    """Substitute {key} placeholders in one pass; unknown keys are left as-is."""
+
+    return _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), text)
+
+
+class CompiledTemplate:
+    """An embed template parsed once from its stored JSONB data.
 
     Supported keys: title, description, color (int or #hex), url,
     footer {text, icon_url}, author {name, url, icon_url},
     image {url} or "url", thumbnail {url} or "url",
     fields [{name, value, inline}].
-    """
 
-    raw_color = data.get("color")
-    if isinstance(raw_color, str) and raw_color.startswith("#"):
-        color = int(raw_color.lstrip("#"), 16)
-    elif isinstance(raw_color, (int, float)):
-        color = int(raw_color)
-    else:
-        color = 0x456DD4
+    Title, description, footer text and field names/values are split around
+    their placeholders up front, so `render` fills them in a single pass and
+    builds a fresh Embed each time; the compiled template is never mutated.
+    """
 
-    em = Embed(
-        title=data.get("title"),
-        description=data.get("description"),
-        color=color,
-        url=data.get("url"),
+    __slots__ = (
+        "title",
+        "description",
+        "color",
+        "url",
+        "footer",
+        "author",
+        "image",
+        "thumbnail",
+        "fields",
     )
 
-    if footer := data.get("footer"):
-        em.set_footer(
-            text=footer.get("text") if isinstance(footer, dict) else str(footer),
-            icon_url=footer.get("icon_url") if isinstance(footer, dict) else None,
-        )
-    if author := data.get("author"):
-        em.set_author(
-            name=author.get("name", "") if isinstance(author, dict) else str(author),
-            url=author.get("url") if isinstance(author, dict) else None,
-            icon_url=author.get("icon_url") if isinstance(author, dict) else None,
+    def __init__(self, data: dict):
+        raw_color = data.get("color")
+        if isinstance(raw_color, str) and raw_color.startswith("#"):
+            self.color = int(raw_color.lstrip("#"), 16)
+        elif isinstance(raw_color, (int, float)):
+            self.color = int(raw_color)
+        else:
+            self.color = 0x456DD4
+
+        self.title = _compile_text(data.get("title"))
+        self.description = _compile_text(data.get("description"))
+        self.url = data.get("url")
+
+        # (text, icon_url) / (name, url, icon_url)
+        self.footer: tuple[_Text, Optional[str]] | None = None
+        if footer := data.get("footer"):
+            self.footer = (
+                _compile_text(
+                    footer.get("text") if isinstance(footer, dict) else str(footer)
+                ),
+                footer.get("icon_url") if isinstance(footer, dict) else None,
+            )
+        self.author: tuple[str, Optional[str], Optional[str]] | None = None
+        if author := data.get("author"):
+            self.author = (
+                author.get("name", "") if isinstance(author, dict) else str(author),
+                author.get("url") if isinstance(author, dict) else None,
+                author.get("icon_url") if isinstance(author, dict) else None,
+            )
+
+        self.image: Optional[str] = None
+        if image := data.get("image"):
+            self.image = image.get("url") if isinstance(image, dict) else image
+        self.thumbnail: Optional[str] = None
+        if thumbnail := data.get("thumbnail"):
+            self.thumbnail = (
+                thumbnail.get("url") if isinstance(thumbnail, dict) else thumbnail
+            )
+
+        self.fields: list[tuple[_Text, _Text, bool]] = [
+            (
+                _compile_text(field.get("name", "")),
+                _compile_text(field.get("value", "")),
+                bool(field.get("inline", False)),
+            )
+            for field in data.get("fields", [])
+        ]
+
+    def render(self, values: Optional[Mapping[str, str]] = None) -> Embed:
+        values = values or {}
+        em = Embed(
+            title=_render_text(self.title, values),
+            description=_render_text(self.description, values),
+            color=self.color,
+            url=self.url,
         )
-    if image := data.get("image"):
-        url = image.get("url") if isinstance(image, dict) else image
-        if url:
-            em.set_image(url=url)
-    if thumbnail := data.get("thumbnail"):
-        url = thumbnail.get("url") if isinstance(thumbnail, dict) else thumbnail
-        if url:
-            em.set_thumbnail(url=url)
-    for field in data.get("fields", []):
-        em.add_field(
-            name=field.get("name", ""),
-            value=field.get("value", ""),
-            inline=bool(field.get("inline", False)),
-        )
-    return em
+
+        if self.footer is not None:
+            text, icon_url = self.footer
+            em.set_footer(text=_render_text(text, values), icon_url=icon_url)
+        if self.author is not None:
+            name, url, icon_url = self.author
+            em.set_author(name=name, url=url, icon_url=icon_url)
+        if self.image:
+            em.set_image(url=self.image)
+        if self.thumbnail:
+            em.set_thumbnail(url=self.thumbnail)
+        for name, value, inline in self.fields:
+            em.add_field(
+                name=_render_text(name, values) or "",
+                value=_render_text(value, values) or "",
+                inline=inline,
+            )
+        return em
+
+
+def embed_from_data(data: dict) -> Embed:
+    """Build a discord.Embed from stored template JSONB data (see CompiledTemplate)."""
+
+    return CompiledTemplate(data).render()
 
 
 def render_template_vars(em: Embed, **kwargs: str) -> Embed:
     """Substitute {key} placeholders in an embed's text fields (modifies in-place)."""
 
     def sub(text: Optional[str]) -> Optional[str]:
-        if not text:
-            return text
-        for k, v in kwargs.items():
-            text = text.replace(f"{{{k}}}", v)
-        return text
+        return render_placeholders(text, kwargs) if text else text
 
     em.title = sub(em.title)
     em.description = sub(em.description)
     if em.footer.text:
         em.set_footer(text=sub(em.footer.text), icon_url=em.footer.icon_url)
-    old_fields = [(f.name, f.value, f.inline) for f in em.fields]
-    em.clear_fields()
-    for name, value, inline in old_fields:
-        em.add_field(name=sub(name) or "", value=sub(value) or "", inline=inline)
+    for i, f in enumerate(em.fields):
+        em.set_field_at(
+            i, name=sub(f.name) or "", value=sub(f.value) or "", inline=f.inline
+        )
     return em
 
 
+async def _load_template(pool, template_id: int) -> CompiledTemplate | None:
+    data = await pool.fetchval(
+        "SELECT data FROM embed_templates WHERE id=$1", template_id
+    )
+    return CompiledTemplate(dict(data)) if data else None
+
+
+# Keyed by template id rather than guild id. A template is only used in its own
+# guild, which lives on one shard process, so `invalidate_template` from the
+# template commands keeps it exact.
+templates: GuildCache[CompiledTemplate | None] = GuildCache(
+    "templates", _load_template, tables=()
+)
+
+
+def invalidate_template(template_id: int | None = None) -> None:
+    """Drop a compiled template (or all of them) after it was edited or deleted."""
+
+    templates.invalidate(template_id)
+
+
 async def resolve_template(
     pool: Any,
     template_id: Optional[int],
@@ -249,15 +338,10 @@ async def resolve_template(
 
     if not pool or not template_id:
         return fallback
-    row = await pool.fetchrow(
-        "SELECT data FROM embed_templates WHERE id=$1", template_id
-    )
-    if not row or not row["data"]:
+    template = await templates.get(pool, template_id)
+    if template is None:
         return fallback
-    em = embed_from_data(dict(row["data"]))
-    if render_vars:
-        render_template_vars(em, **render_vars)
-    return em
+    return template.render(render_vars)
 
 
 async def resolve_template_or_none(
@@ -269,12 +353,7 @@ async def resolve_template_or_none(
 
     if not pool or not template_id:
         return None
-    row = await pool.fetchrow(
-        "SELECT data FROM embed_templates WHERE id=$1", template_id
-    )
-    if not row or not row["data"]:
+    template = await templates.get(pool, template_id)
+    if template is None:
         return None
-    em = embed_from_data(dict(row["data"]))
-    if render_vars:
-        render_template_vars(em, **render_vars)
-    return em
+    return template.render(render_vars)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Hashable, Optional
+
+
+class SlidingWindow:
+    """
+    Per-key sliding-window event counter with idle eviction.
+
+    Each key keeps the timestamps of its events inside the window; expired
+    ones are popped from the front. Keys are dropped once their newest event
+    is older than their own window: an expiry heap finds them whatever their
+    window length, so keys with short windows never wait behind long ones
+    and the map only holds recently active keys. An update costs one
+    O(log n) heap push.
+    """
+
+    def __init__(self) -> None:
+        # key -> (window seconds, event timestamps oldest first)
+        self._entries: dict[Hashable, tuple[float, deque[float]]] = {}
+        # (expires at, tiebreak, key); checked against the key's last event
+        self._expiries: list[tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _bucket(self, key: Hashable, window: float, now: float) -> deque[float]:
+        self._evict(now)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = (window, deque())
+            self._expire_at(key, now)
+        elif entry[0] != window:
+            entry = self._entries[key] = (window, entry[1])
+            self._expire_at(key, now)
+
+        bucket = entry[1]
+        while bucket and now - bucket[0] >= window:
+            bucket.popleft()
+        return bucket
+
+    def _expire_at(self, key: Hashable, when: float) -> None:
+        heapq.heappush(self._expiries, (when, next(self._seq), key))
+
+    def _record(self, key: Hashable, bucket: deque[float], now: float) -> None:
+        bucket.append(now)
+        self._expire_at(key, now + self._entries[key][0])
+
+    def _evict(self, now: float) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            _, _, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            window, bucket = entry
+            if bucket and bucket[-1] + window > now:
+                # Used again since this expiry was queued
+                self._expire_at(key, bucket[-1] + window)
+                continue
+            del self._entries[key]
+
+    def hit(self, key: Hashable, window: float, now: Optional[float] = None) -> int:
+        """Record an event and return how many fall inside the window."""
+
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, window, now)
+        self._record(key, bucket, now)
+        return len(bucket)
+
+    def allow(
+        self, key: Hashable, limit: int, window: float, now: Optional[float] = None
+    ) -> bool:
+        """Record an event only if fewer than `limit` happened within the window."""
+
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, window, now)
+        if len(bucket) >= limit:
+            return False
+        self._record(key, bucket, now)
+        return True
+
+    def reset(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
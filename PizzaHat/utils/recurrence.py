@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import calendar
+import datetime
+
+import pytz
+
+LOOKAHEAD_DAYS = 366 * 5  # an expression that never matches within this fails
+MIN_CRON_GAP = datetime.timedelta(minutes=15)
+
+_MONTH_NAMES = {
+    name.lower(): i for i, name in enumerate(calendar.month_abbr) if name
+}
+# cron counts weekdays from Sunday = 0 (7 is accepted as Sunday too)
+_DAY_NAMES = {"sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6}
+
+# field name, lowest value, highest value, accepted names
+_FIELDS: tuple[tuple[str, int, int, dict[str, int]], ...] = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("day of week", 0, 7, _DAY_NAMES),
+)
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+def _parse_field(text: str, name: str, low: int, high: int, names: dict) -> set[int]:
+    def value(token: str) -> int:
+        if token in names:
+            return names[token]
+        if not token.isdigit():
+            raise RecurrenceError(f"`{token}` is not a valid {name}.")
+        return int(token)
+
+    values: set[int] = set()
+    for part in text.lower().split(","):
+        span, _, step_text = part.partition("/")
+        if step_text and (not step_text.isdigit() or int(step_text) == 0):
+            raise RecurrenceError(f"`{part}` has an invalid step.")
+        step = int(step_text or 1)
+
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            first, _, last = span.partition("-")
+            start, end = value(first), value(last)
+        else:
+            start = value(span)
+            end = high if step_text else start
+
+        if not low <= start <= end <= high:
+            raise RecurrenceError(
+                f"`{part}` is out of range for {name} ({low}-{high})."
+            )
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _localize(tz: pytz.BaseTzInfo, naive: datetime.datetime) -> datetime.datetime:
+    # A wall time repeated by a DST change runs on its first occurrence; one
+    # skipped by it runs at the same offset after the gap (02:30 -> 03:30).
+    try:
+        return tz.localize(naive, is_dst=None)
+    except pytz.AmbiguousTimeError:
+        return tz.localize(naive, is_dst=True)
+    except pytz.NonExistentTimeError:
+        return tz.normalize(tz.localize(naive, is_dst=False))
+
+
+class Recurrence:
+    """
+    A repeating schedule: a five-field cron expression read in a timezone.
+
+    `minute hour day-of-month month day-of-week` takes `*`, lists, ranges,
+    `/step` and month/day names, and a day matches the usual cron way (either
+    day field when both are restricted). With `clamp`, a day of month past the
+    end of a shorter month falls on its last day, so "monthly on the 31st"
+    still runs in February. Occurrences are computed on the local wall clock,
+    so 09:00 stays 09:00 across DST changes.
+    """
+
+    __slots__ = (
+        "expression",
+        "timezone",
+        "clamp",
+        "_tz",
+        "_minutes",
+        "_hours",
+        "_days",
+        "_months",
+        "_weekdays",
+        "_any_day",
+        "_any_weekday",
+    )
+
+    def __init__(
+        self, expression: str, timezone: str = "UTC", *, clamp: bool = False
+    ):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise RecurrenceError(
+                "A schedule needs 5 fields: `minute hour day month weekday`."
+            )
+        try:
+            self._tz = pytz.timezone(timezone)
+        except pytz.UnknownTimeZoneError:
+            raise RecurrenceError(f"Unknown timezone `{timezone}`.") from None
+
+        self.expression = " ".join(fields)
+        self.timezone = timezone
+        self.clamp = clamp
+
+        minutes, hours, days, months, weekdays = (
+            _parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)
+        )
+        self._minutes = sorted(minutes)
+        self._hours = sorted(hours)
+        self._days = frozenset(days)
+        self._months = frozenset(months)
+        self._weekdays = frozenset(d % 7 for d in weekdays)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"<Recurrence {self.expression!r} {self.timezone}>"
+
+    @classmethod
+    def daily(cls, time: datetime.time, timezone: str = "UTC") -> Recurrence:
+        return cls(f"{time.minute} {time.hour} * * *", timezone)
+
+    @classmethod
+    def weekly(
+        cls, weekday: int, time: datetime.time, timezone: str = "UTC"
+    ) -> Recurrence:
+        """`weekday` counts from Monday = 0, like `datetime.weekday()`."""
+
+        return cls(f"{time.minute} {time.hour} * * {(weekday + 1) % 7}", timezone)
+
+    @classmethod
+    def monthly(
+        cls, day: int, time: datetime.time, timezone: str = "UTC"
+    ) -> Recurrence:
+        return cls(f"{time.minute} {time.hour} {day} * *", timezone, clamp=True)
+
+    @classmethod
+    def from_row(cls, row) -> Recurrence | None:
+        """
+        The recurrence of a `scheduled_messages` row; None for one-time rows.
+
+        Rows saved before the `cron` column existed only have an interval, so
+        their time (and weekday or day) is taken from the stored next run.
+        """
+
+        if row["schedule_type"] != "recurring":
+            return None
+
+        interval = row["interval_type"] or "daily"
+        timezone = row["timezone"] or "UTC"
+        if row["cron"]:
+            return cls(row["cron"], timezone, clamp=interval == "monthly")
+
+        try:
+            local = row["next_run"].astimezone(pytz.timezone(timezone))
+        except pytz.UnknownTimeZoneError:
+            raise RecurrenceError(f"Unknown timezone `{timezone}`.") from None
+        if interval == "weekly":
+            return cls.weekly(local.weekday(), local.time(), timezone)
+        if interval == "monthly":
+            return cls.monthly(local.day, local.time(), timezone)
+        return cls.daily(local.time(), timezone)
+
+    def _runs_on(self, day: datetime.date) -> bool:
+        if day.month not in self._months:
+            return False
+
+        day_ok = day.day in self._days
+        if self.clamp and not day_ok:
+            last = calendar.monthrange(day.year, day.month)[1]
+            day_ok = day.day == last and any(d > last for d in self._days)
+        weekday_ok = (day.weekday() + 1) % 7 in self._weekdays
+
+        if self._any_day:
+            return weekday_ok
+        if self._any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def after(self, moment: datetime.datetime) -> datetime.datetime:
+        """The first occurrence strictly after `moment`, as an aware UTC datetime."""
+
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        start = moment.astimezone(self._tz).replace(tzinfo=None)
+        day = start.date()
+
+        for _ in range(LOOKAHEAD_DAYS):
+            if self._runs_on(day):
+                for hour in self._hours:
+                    for minute in self._minutes:
+                        naive = datetime.datetime.combine(
+                            day, datetime.time(hour, minute)
+                        )
+                        if naive < start.replace(second=0, microsecond=0):
+                            continue
+                        when = _localize(self._tz, naive)
+                        if when > moment:
+                            return when.astimezone(datetime.timezone.utc)
+            day += datetime.timedelta(days=1)
+
+        raise RecurrenceError(f"`{self.expression}` never runs.")
+
+    def upcoming(
+        self, moment: datetime.datetime, count: int
+    ) -> list[datetime.datetime]:
+        """The next `count` occurrences after `moment`."""
+
+        runs: list[datetime.datetime] = []
+        for _ in range(count):
+            moment = self.after(moment)
+            runs.append(moment)
+        return runs
+
+
+def validate_cron(expression: str, timezone: str = "UTC") -> str | None:
+    """Return why a cron schedule is rejected, or None if it is fine."""
+
+    try:
+        runs = Recurrence(expression, timezone).upcoming(
+            datetime.datetime.now(datetime.timezone.utc), 6
+        )
+    except RecurrenceError as e:
+        return str(e)
+    if any(b - a < MIN_CRON_GAP for a, b in zip(runs, runs[1:])):
+        minutes = int(MIN_CRON_GAP.total_seconds() // 60)
+        return f"Schedules can run at most once every {minutes} minutes."
+    return None
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, NamedTuple
+
+import regex
+
+from utils.automod import GuardedPattern, WordMatcher, validate_custom_pattern
+
+TRIGGER_TYPES: dict[str, str] = {
+    "contains": "Message contains the trigger anywhere",
+    "exact": "Message is exactly the trigger",
+    "startswith": "Message starts with the trigger",
+    "regex": "Message matches a regular expression (Basic+)",
+}
+
+
+class Responder(NamedTuple):
+    id: int
+    trigger: str
+    response: str
+    template_id: int | None
+    channel_ids: frozenset[int]
+    role_ids: frozenset[int]
+    cooldown: int
+
+
+def validate_trigger(trigger_type: str, trigger: str) -> str | None:
+    """Return why a trigger is rejected for its type, or None if it is fine."""
+
+    if trigger_type not in TRIGGER_TYPES:
+        return f"Unknown trigger type `{trigger_type}`."
+    if trigger_type == "regex":
+        return validate_custom_pattern(trigger)
+    return None
+
+
+class ResponderIndex:
+    """
+    A guild's enabled auto responders, compiled for matching one message.
+
+    `exact` triggers are a dict lookup, `contains` and `startswith` triggers
+    share one WordMatcher trie each, and `regex` triggers are compiled once as
+    GuardedPatterns, so a slow one times out instead of stalling the bot.
+    Channel and role restrictions become frozensets. `candidates` returns
+    every responder whose trigger matches, in id order, so the first one that
+    passes its restrictions wins as before.
+    """
+
+    __slots__ = ("_exact", "_contains", "_startswith", "_by_text", "_regex")
+
+    def __init__(self, rows: Iterable[dict]):
+        self._exact: dict[str, list[Responder]] = {}
+        # (trigger type, lowercase trigger) -> responders
+        self._by_text: dict[tuple[str, str], list[Responder]] = {}
+        self._regex: list[tuple[GuardedPattern, Responder]] = []
+
+        for r in rows:
+            responder = Responder(
+                r["id"],
+                r["trigger_text"],
+                r["response"],
+                r.get("template_id"),
+                frozenset(r.get("channel_ids") or ()),
+                frozenset(r.get("role_ids") or ()),
+                r.get("cooldown_seconds") or 0,
+            )
+            ttype = r.get("trigger_type") or "contains"
+
+            if ttype == "regex":
+                # Validated on save; skip rows saved before a rule existed
+                if validate_custom_pattern(responder.trigger) is not None:
+                    continue
+                try:
+                    pattern = GuardedPattern(responder.trigger, re.IGNORECASE)
+                except regex.error:
+                    continue
+                self._regex.append((pattern, responder))
+            elif ttype == "exact":
+                self._exact.setdefault(responder.trigger.lower(), []).append(responder)
+            else:
+                if ttype != "startswith":
+                    ttype = "contains"
+                key = (ttype, responder.trigger.lower())
+                self._by_text.setdefault(key, []).append(responder)
+
+        self._contains = WordMatcher(t for k, t in self._by_text if k == "contains")
+        self._startswith = WordMatcher(t for k, t in self._by_text if k == "startswith")
+
+    def __bool__(self) -> bool:
+        return bool(self._exact or self._by_text or self._regex)
+
+    def candidates(self, content: str, content_lower: str) -> list[Responder]:
+        matched: list[Responder] = list(self._exact.get(content_lower, ()))
+        for trigger in self._contains.find_all(content_lower):
+            matched.extend(self._by_text[("contains", trigger)])
+        for trigger in self._startswith.prefixes_at(content_lower):
+            matched.extend(self._by_text[("startswith", trigger)])
+        matched.extend(r for p, r in self._regex if p.search(content))
+
+        matched.sort(key=lambda r: r.id)
+        return matched
@@ -7,7 +7,7 @@ from discord.ext import commands
 from discord.ext.commands import Context
 
 from core.bot import PizzaHat, Tier
-from utils.custom_checks import _tier_cache
+from utils.custom_checks import get_guild_tier
 
 
 # credits to Nirlep's EpicBot paginator system!
@@ -242,19 +242,9 @@ class TicketSettings(ui.View):
         super().__init__(timeout=None)
 
     async def check_premium(self, guild_id: int) -> bool:
-        cached_tier = _tier_cache.get(guild_id)
-        if cached_tier is None and self.bot.db is not None:
-            row = await self.bot.db.fetchrow(
-                "SELECT tier FROM premium WHERE guild_id=$1", guild_id
-            )
-            if row:
-                cached_tier = Tier(row["tier"])
-                _tier_cache[guild_id] = cached_tier
-            else:
-                cached_tier = Tier.FREE
-                _tier_cache[guild_id] = Tier.FREE
-
-        return cached_tier is not None and cached_tier >= Tier.BASIC
+        if self.bot.db is None:
+            return False
+        return await get_guild_tier(self.bot.db, guild_id) >= Tier.BASIC
 
     @ui.button(
         label="Close Ticket",